@@ -52,6 +52,7 @@ DEFAULT_CONFIG_FILE = os.path.join(QTPYVCP_DIR, 'yaml_lib/default_config.yml')
 CONFIG = {}
 OPTIONS = DotDict()
 DIALOGS = {}
+LAZY_DIALOGS = {}  # dialog id -> factory, for dialogs constructed on first use
 WINDOWS = {}
 SETTINGS = {}
 
@@ -1,6 +1,8 @@
 import linuxcnc
+from qtpy.QtCore import QObject, QTimer
 from qtpyvcp.utilities import logger
 from qtpyvcp.utilities.info import Info
+from qtpyvcp.utilities.command_dispatcher import CommandDispatcher
 from qtpyvcp.plugins import getPlugin
 
 STATUS = getPlugin('status')
@@ -8,29 +10,79 @@ STAT = STATUS.stat
 
 INFO = Info()
 CMD = linuxcnc.command()
+DISPATCHER = CommandDispatcher()
 
 
 # Set up logging
 LOG = logger.getLogger(__name__)
 
+# target modes of the mode changes queued on the dispatcher, oldest first
+_QUEUED_MODES = []
+
 def setTaskMode(new_mode):
     """Sets task mode, if possible
 
+    The mode change is queued on the command dispatcher and waited for on
+    its worker thread, like AXIS does, so the GUI is not blocked. Commands
+    queued on ``DISPATCHER`` after this are only sent once the mode change
+    has completed.
+
     Args:
         new_mode (int) : linuxcnc.MODE_MANUAL, linuxcnc.MODE_MDI or linuxcnc.MODE_AUTO
 
     Returns:
-        bool : True if successful
+        bool : True if the mode change was queued
     """
     if isRunning():
         LOG.error("Can't set mode while machine is running")
         return False
     else:
-        CMD.mode(new_mode)
-        CMD.wait_complete()  # Wait for mode change to complete, like AXIS does
-        STAT.poll()  # Update status after mode change
+        def run(cmd):
+            cmd.mode(new_mode)
+            return cmd.wait_complete(DISPATCHER.timeout)
+
+        run.__name__ = 'mode'
+        submitModeChange(new_mode, run)
         return True
 
+def submitModeChange(new_mode, func, callback=None):
+    """Queue `func(cmd)` on the dispatcher as a job that sets the task mode.
+
+    Until the job has finished :func:`queuedTaskMode` returns `new_mode`,
+    so later callers can tell which mode their commands will run in.
+
+    Args:
+        new_mode (int) : The task mode the job leaves the machine in.
+        func (callable) : Job to run on the dispatcher worker.
+        callback (callable, optional) : Called with the future on the GUI
+            thread once the job has finished.
+
+    Returns:
+        Future
+    """
+    # a cancelled job can finish before the ones queued ahead of it,
+    # so each job removes its own entry
+    entry = [new_mode]
+    _QUEUED_MODES.append(entry)
+
+    def done(future):
+        # STAT must show the new mode before it is used again
+        STAT.poll()
+        for i, queued in enumerate(_QUEUED_MODES):
+            if queued is entry:
+                del _QUEUED_MODES[i]
+                break
+        if callback is not None:
+            callback(future)
+
+    return DISPATCHER.call(func, callback=done)
+
+def queuedTaskMode():
+    """The task mode once all mode changes queued on the dispatcher have run."""
+    if _QUEUED_MODES:
+        return _QUEUED_MODES[-1][0]
+    return STAT.task_mode
+
 def isRunning():
     """Returns TRUE if machine is moving due to MDI, program execution, etc."""
     if STAT.state == linuxcnc.RCS_EXEC:
@@ -38,3 +90,124 @@ def isRunning():
     else:
         return STAT.task_mode == linuxcnc.MODE_AUTO \
             and STAT.interp_state != linuxcnc.INTERP_IDLE
+
+
+class EnableState(QObject):
+    """Shared enable state engine for action ``ok`` predicates.
+
+    Widgets bound to the same predicate with the same arguments share one
+    binding, so the predicate is evaluated once per status change no matter
+    how many widgets use it. Changes are collected and evaluated together on
+    the next event loop pass, the result is only pushed to the widgets when
+    the predicate inputs or its result actually changed.
+    """
+
+    def __init__(self):
+        super(EnableState, self).__init__()
+
+        self._bindings = {}
+        self._chan_bindings = {}
+        self._dirty = set()
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.update)
+
+    def bind(self, ok, widget, channels, *args, **kwargs):
+        """Keep `widget` enabled according to the `ok` predicate.
+
+        Args:
+            ok (function) : An action ``_*_ok`` predicate. It is called with
+                ``widget=None`` and must set ``ok.msg``.
+            widget (QWidget) : The widget to enable/disable.
+            channels (tuple) : Status DataChannels for every STAT item the
+                predicate reads, it is only re-evaluated when one changes.
+            *args, **kwargs : Passed to the predicate.
+        """
+        key = (ok, args, tuple(sorted(kwargs.items())))
+        binding = self._bindings.get(key)
+        if binding is None:
+            binding = _OkBinding(ok, args, kwargs)
+            self._bindings[key] = binding
+
+        for chan in channels:
+            if chan in binding.channels:
+                continue
+            binding.channels.append(chan)
+            if chan not in self._chan_bindings:
+                self._chan_bindings[chan] = []
+                chan.signal.connect(lambda *a, chan=chan: self._channelChanged(chan))
+            self._chan_bindings[chan].append(binding)
+
+        binding.widgets.append(widget)
+        if binding.evaluate(force=True):
+            binding.push()
+        else:
+            binding.apply(widget)
+
+    def _channelChanged(self, chan):
+        self._dirty.update(self._chan_bindings[chan])
+        if not self._timer.isActive():
+            self._timer.start(0)
+
+    def update(self):
+        """Evaluate all bindings whose inputs changed and push the results."""
+        dirty = self._dirty
+        self._dirty = set()
+        for binding in dirty:
+            if binding.evaluate():
+                binding.push()
+
+
+class _OkBinding(object):
+    def __init__(self, ok, args, kwargs):
+        self.ok = ok
+        self.args = args
+        self.kwargs = kwargs
+        self.channels = []
+        self.widgets = []
+        self.inputs = None
+        self.result = None
+
+    def evaluate(self, force=False):
+        """Re-run the predicate if its inputs changed.
+
+        Returns:
+            bool : True if the result changed.
+        """
+        inputs = tuple(chan.value for chan in self.channels)
+        if inputs == self.inputs and not force:
+            return False
+        self.inputs = inputs
+
+        ok = self.ok(*self.args, widget=None, **self.kwargs)
+        result = (ok, getattr(self.ok, 'msg', ''))
+        if result == self.result:
+            return False
+        self.result = result
+        return True
+
+    def push(self):
+        for widget in self.widgets[:]:
+            try:
+                self.apply(widget)
+            except RuntimeError:
+                # underlying C++ widget has been deleted
+                self.widgets.remove(widget)
+
+    def apply(self, widget):
+        ok, msg = self.result
+        widget.setEnabled(ok)
+        widget.setStatusTip(msg)
+        widget.setToolTip(msg)
+
+
+ENABLE_STATE = EnableState()
+
+
+def bindOkState(ok, widget, channels, *args, **kwargs):
+    """Bind `widget` enable state to an action ``ok`` predicate.
+
+    See :class:`EnableState` for details.
+    """
+    ENABLE_STATE.bind(ok, widget, channels, *args, **kwargs)
@@ -11,6 +11,8 @@ STAT = STATUS.stat
 
 CMD = linuxcnc.command()
 
+from qtpyvcp.actions.base_actions import bindOkState
+
 #==============================================================================
 # Coolent actions
 #==============================================================================
@@ -118,15 +120,13 @@ def _coolant_ok(widget=None):
     return ok
 
 def _flood_bindOk(widget):
-    _coolant_ok(widget)
     widget.setChecked(STAT.flood == linuxcnc.FLOOD_ON)
-    STATUS.task_state.onValueChanged(lambda: _coolant_ok(widget))
+    bindOkState(_coolant_ok, widget, (STATUS.task_state,))
     STATUS.flood.onValueChanged(lambda s: widget.setChecked(s == linuxcnc.FLOOD_ON))
 
 def _mist_bindOk(widget):
-    _coolant_ok(widget)
     widget.setChecked(STAT.mist == linuxcnc.MIST_ON)
-    STATUS.task_state.onValueChanged(lambda: _coolant_ok(widget))
+    bindOkState(_coolant_ok, widget, (STATUS.task_state,))
     STATUS.mist.onValueChanged(lambda s: widget.setChecked(s == linuxcnc.MIST_ON))
 
 flood.on.ok = flood.off.ok = flood.toggle.ok = _coolant_ok
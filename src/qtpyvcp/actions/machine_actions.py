@@ -9,7 +9,8 @@ from qtpyvcp.utilities import logger
 from abc import abstractstaticmethod
 LOG = logger.getLogger(__name__)
 
-from qtpyvcp.actions.base_actions import setTaskMode
+from qtpyvcp.actions.base_actions import (setTaskMode, bindOkState, DISPATCHER,
+                                         submitModeChange, queuedTaskMode, isRunning)
 from qtpyvcp.plugins import getPlugin
 
 STATUS = getPlugin('status')
@@ -149,9 +150,8 @@ def _power_ok(widget=None):
     return ok
 
 def _power_bindOk(widget):
-    _power_ok(widget)
     widget.setChecked(STAT.task_state == linuxcnc.STATE_ON)
-    STATUS.estop.onValueChanged(lambda: _power_ok(widget))
+    bindOkState(_power_ok, widget, (STATUS.estop, STATUS.task_state))
     STATUS.on.notify(lambda v: widget.setChecked(v))
 
 power.on.ok = power.off.ok = power.toggle.ok = _power_ok
@@ -166,9 +166,15 @@ G96_MAX_RPM = None  # Track the last G96 D value (max RPM limit)
 G96_SURFACE_SPEED = None  # Track the last G96 S value (surface speed in ft/min or m/min)
 G97_SPINDLE_RPM = None  # Track the last G97 S value (spindle RPM)
 
+# modes to return to after each queued MDI job, oldest first
+_PENDING_MDI = []
+
 def _resetMode(interp_state):
     global PREVIOUS_MODE
-    if  PREVIOUS_MODE is not None and interp_state == linuxcnc.INTERP_IDLE:
+    # a queued MDI job would be aborted by the mode change, its completion
+    # callback sets PREVIOUS_MODE again once it has been sent
+    if  PREVIOUS_MODE is not None and interp_state == linuxcnc.INTERP_IDLE \
+            and not _PENDING_MDI:
         if setTaskMode(PREVIOUS_MODE):
             LOG.debug("Successfully reset task_mode after MDI")
         PREVIOUS_MODE = None
@@ -256,33 +262,77 @@ def issue_mdi(command, reset=True):
         # Keep users in sync with their original mode when issuing MDI from
         # MANUAL/AUTO, but preserve the no-reset optimization when already in MDI.
         # This avoids leaving manual users stranded in MDI after subroutine/tool commands.
-        if 'G10' not in cmd_upper and 'G92' not in cmd_upper and STAT.task_mode == linuxcnc.MODE_MDI:
+        if 'G10' not in cmd_upper and 'G92' not in cmd_upper and queuedTaskMode() == linuxcnc.MODE_MDI:
             reset = False
     
     global PREVIOUS_MODE
-    if reset:
-        # save the previous mode
-        PREVIOUS_MODE = STAT.task_mode
-        # Force `interp_state` update on next status cycle. This is needed because
-        # some commands might take less than `cycle_time` (50ms) to complete,
-        # so status would not even notice that the interp_state had changed and the
-        # reset mode method would not be called.
-        STATUS.old['interp_state'] = -1
-    else:
+    if not reset:
+        return_mode = None
         # Clear PREVIOUS_MODE to prevent any automatic reset
         PREVIOUS_MODE = None
+    elif _PENDING_MDI:
+        # return to the mode from before the first of the queued MDI jobs
+        return_mode = _PENDING_MDI[-1][0]
+    elif PREVIOUS_MODE is not None:
+        # the last MDI has not been reset yet
+        return_mode = PREVIOUS_MODE
+    else:
+        # the mode the machine is in once the queued commands have run,
+        # STAT is stale while mode changes are queued
+        return_mode = queuedTaskMode()
+
+    switch_mode = queuedTaskMode() != linuxcnc.MODE_MDI
+    if switch_mode and isRunning():
+        LOG.error("Can't set mode while machine is running")
+        LOG.error("Failed to issue MDI command: {}".format(command))
+        return False
 
-    mode_ready = STAT.task_mode == linuxcnc.MODE_MDI or setTaskMode(linuxcnc.MODE_MDI)
+    commands = command.strip().split(';')
 
-    if mode_ready:
+    # the mode change and the MDI commands are sent as one job, so no
+    # other queued command can change the mode in between
+    def run(cmd):
+        if switch_mode:
+            cmd.mode(linuxcnc.MODE_MDI)
+            cmd.wait_complete(DISPATCHER.timeout)
         # issue multiple MDI commands separated by ';'
-        for cmd in command.strip().split(';'):
-            LOG.info("Issuing MDI command: %s", cmd)
-            CMD.mdi(cmd)
-        return True
+        for mdi_cmd in commands:
+            LOG.info("Issuing MDI command: %s", mdi_cmd)
+            cmd.mdi(mdi_cmd)
+        # task has taken the commands once this returns, so interp_state
+        # is no longer IDLE unless they have already finished
+        return cmd.wait_complete(DISPATCHER.timeout)
+
+    run.__name__ = 'mdi'
+
+    # a cancelled job can finish before the ones queued ahead of it,
+    # so each job removes its own entry
+    entry = [return_mode]
+
+    def done(future):
+        global PREVIOUS_MODE
+        for i, pending in enumerate(_PENDING_MDI):
+            if pending is entry:
+                del _PENDING_MDI[i]
+                break
+        if future.cancelled() or future.exception() is not None:
+            return
+
+        # save the previous mode
+        PREVIOUS_MODE = return_mode
+        if return_mode is not None:
+            # Force `interp_state` update on next status cycle. This is needed because
+            # some commands might take less than `cycle_time` (50ms) to complete,
+            # so status would not even notice that the interp_state had changed and the
+            # reset mode method would not be called.
+            STATUS.old['interp_state'] = -1
+
+    _PENDING_MDI.append(entry)
+    if switch_mode:
+        submitModeChange(linuxcnc.MODE_MDI, run, callback=done)
     else:
-        LOG.error("Failed to issue MDI command: {}".format(command))
-        return False
+        DISPATCHER.call(run, callback=done)
+    return True
 
 def _issue_mdi_ok(mdi_cmd='', widget=None):
     if STAT.task_state == linuxcnc.STATE_ON \
@@ -306,10 +356,9 @@ def _issue_mdi_ok(mdi_cmd='', widget=None):
     return ok
 
 def _issue_mdi_bindOk(mdi_cmd='', widget=None):
-    _issue_mdi_ok(mdi_cmd=mdi_cmd, widget=widget)
-    STATUS.task_state.onValueChanged(lambda: _issue_mdi_ok(mdi_cmd=mdi_cmd, widget=widget))
-    STATUS.interp_state.onValueChanged(lambda: _issue_mdi_ok(mdi_cmd=mdi_cmd, widget=widget))
-    STATUS.homed.onValueChanged(lambda: _issue_mdi_ok(mdi_cmd=mdi_cmd, widget=widget))
+    # the predicate does not depend on the command, so all MDI widgets share it
+    bindOkState(_issue_mdi_ok, widget,
+                (STATUS.task_state, STATUS.interp_state, STATUS.homed))
 
 issue_mdi.ok = _issue_mdi_ok
 issue_mdi.bindOk = _issue_mdi_bindOk
@@ -429,8 +478,7 @@ def _feed_override_enable_ok(widget=None):
     return ok
 
 def _feed_override_enable_bindOk(widget):
-    STATUS.task_state.onValueChanged(lambda: _feed_override_enable_ok(widget))
-    STATUS.interp_state.onValueChanged(lambda: _feed_override_enable_ok(widget))
+    bindOkState(_feed_override_enable_ok, widget, (STATUS.task_state, STATUS.interp_state))
     STATUS.feed_override_enabled.onValueChanged(widget.setChecked)
 
 def _feed_override_ok(value=100, widget=None):
@@ -459,8 +507,7 @@ def _feed_override_ok(value=100, widget=None):
 def _feed_override_bindOk(value=100, widget=None):
 
     # This will work for any widget
-    STATUS.task_state.onValueChanged(lambda: _feed_override_ok(widget=widget))
-    STATUS.feed_override_enabled.onValueChanged(lambda: _feed_override_ok(widget=widget))
+    bindOkState(_feed_override_ok, widget, (STATUS.task_state, STATUS.feed_override_enabled))
 
     try:
         # these will only work for QSlider or QSpinBox
@@ -523,7 +570,7 @@ def _rapid_override_ok(value=100, widget=None):
 def _rapid_override_bindOk(value=100, widget=None):
 
     # This will work for any widget
-    STATUS.task_state.onValueChanged(lambda: _rapid_override_ok(widget=widget))
+    bindOkState(_rapid_override_ok, widget, (STATUS.task_state,))
 
     try:
         # these will only work for QSlider or QSpinBox
@@ -586,7 +633,7 @@ def _max_velocity_ok(value=100, widget=None):
 def _max_velocity_bindOk(value=100, widget=None):
 
     # This will work for any widget
-    STATUS.task_state.onValueChanged(lambda: _max_velocity_ok(widget=widget))
+    bindOkState(_max_velocity_ok, widget, (STATUS.task_state,))
 
     try:
         # these will only work for QSlider or QSpinBox
@@ -673,8 +720,7 @@ def _mode_ok(widget=None):
 
 def _manual_bindOk(widget):
     widget.setChecked(STAT.task_mode == linuxcnc.MODE_MANUAL)
-    STATUS.task_state.onValueChanged(lambda: _mode_ok(widget))
-    STATUS.interp_state.onValueChanged(lambda: _mode_ok(widget))
+    bindOkState(_mode_ok, widget, (STATUS.task_state, STATUS.interp_state))
     STATUS.task_mode.onValueChanged(lambda m: widget.setChecked(m == linuxcnc.MODE_MANUAL))
 
 mode.manual.ok = _mode_ok
@@ -682,8 +728,7 @@ mode.manual.bindOk = _manual_bindOk
 
 def _auto_bindOk(widget):
     widget.setChecked(STAT.task_mode == linuxcnc.MODE_AUTO)
-    STATUS.task_state.onValueChanged(lambda: _mode_ok(widget))
-    STATUS.interp_state.onValueChanged(lambda: _mode_ok(widget))
+    bindOkState(_mode_ok, widget, (STATUS.task_state, STATUS.interp_state))
     STATUS.task_mode.onValueChanged(lambda m: widget.setChecked(m == linuxcnc.MODE_AUTO))
 
 mode.auto.ok = _mode_ok
@@ -691,8 +736,7 @@ mode.auto.bindOk = _auto_bindOk
 
 def _mdi_bindOk(widget):
     widget.setChecked(STAT.task_mode == linuxcnc.MODE_MDI)
-    STATUS.task_state.onValueChanged(lambda: _mode_ok(widget))
-    STATUS.interp_state.onValueChanged(lambda: _mode_ok(widget))
+    bindOkState(_mode_ok, widget, (STATUS.task_state, STATUS.interp_state))
     STATUS.task_mode.onValueChanged(lambda m: widget.setChecked(m == linuxcnc.MODE_MDI))
 
 mode.mdi.ok = _mode_ok
@@ -766,15 +810,13 @@ def _home_ok(jnum=-1, widget=None):
     return ok
 
 def _home_all_bindOk(widget):
-    STATUS.on.notify(lambda: _home_ok(widget=widget))
-    STATUS.homed.notify(lambda: _home_ok(widget=widget))
+    bindOkState(_home_ok, widget, (STATUS.on, STATUS.homed))
 
 home.all.ok = _home_ok
 home.all.bindOk = _home_all_bindOk
 
 def _home_joint_bindOk(jnum, widget):
-    STATUS.on.notify(lambda: _home_ok(jnum, widget=widget))
-    STATUS.homed.notify(lambda: _home_ok(jnum, widget=widget))
+    bindOkState(_home_ok, widget, (STATUS.on, STATUS.homed), jnum)
 
 home.joint.ok = _home_ok
 home.joint.bindOk = _home_joint_bindOk
@@ -789,7 +831,7 @@ def _home_axis_bindOk(axis, widget):
         return
 
     jnum = INFO.AXIS_LETTER_LIST.index(axis)
-    STATUS.on.notify(lambda: _home_ok(jnum, widget=widget))
+    bindOkState(_home_ok, widget, (STATUS.on,), jnum)
 
 home.axis.ok = _home_ok
 home.axis.bindOk = _home_axis_bindOk
@@ -846,13 +888,13 @@ class unhome:
 
 def _home_joint(jnum):
     setTaskMode(linuxcnc.MODE_MANUAL)
-    CMD.teleop_enable(False)
-    CMD.home(jnum)
+    DISPATCHER.submit('teleop_enable', False)
+    DISPATCHER.submit('home', jnum)
 
 def _unhome_joint(jnum):
     setTaskMode(linuxcnc.MODE_MANUAL)
-    CMD.teleop_enable(False)
-    CMD.unhome(jnum)
+    DISPATCHER.submit('teleop_enable', False)
+    DISPATCHER.submit('unhome', jnum)
 
 # Homing helper functions
 
@@ -913,7 +955,7 @@ def _override_limits_ok(widget=None):
     return ok
 
 def _override_limits_bindOk(widget):
-    STATUS.limit.onValueChanged(lambda: _override_limits_ok(widget))
+    bindOkState(_override_limits_ok, widget, (STATUS.limit,))
 
 override_limits.ok = _override_limits_ok
 override_limits.bindOk = _override_limits_bindOk
@@ -1223,10 +1265,12 @@ def _jog_axis_bindOk(axis, direction, widget):
         widget.setStatusTip(msg)
         return
 
-    STATUS.limit.onValueChanged(lambda: _jog_axis_ok(aletter, direction, widget))
-    STATUS.homed.onValueChanged(lambda: _jog_axis_ok(aletter, direction, widget))
-    STATUS.task_state.onValueChanged(lambda: _jog_axis_ok(aletter, direction, widget))
-    STATUS.interp_state.onValueChanged(lambda: _jog_axis_ok(aletter, direction, widget))
+    # direction does not affect the predicate, so both jog buttons share it
+    jnum = INFO.COORDINATES.index(aletter)
+    bindOkState(_jog_axis_ok, widget,
+                (STATUS.limit, STATUS.homed, STATUS.task_state, STATUS.interp_state,
+                 STATUS.joint[jnum].override_limits),
+                aletter)
 
 jog.axis.ok = _jog_axis_ok
 jog.axis.bindOk = _jog_axis_bindOk
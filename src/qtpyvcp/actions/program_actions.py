@@ -15,7 +15,7 @@ STAT = STATUS.stat
 INFO = Info()
 CMD = linuxcnc.command()
 
-from qtpyvcp.actions.base_actions import setTaskMode
+from qtpyvcp.actions.base_actions import setTaskMode, bindOkState, DISPATCHER
 
 
 #==============================================================================
@@ -31,19 +31,21 @@ def load(fname, add_to_recents=True, isreload=False):
     if not isreload:
         STATUS.addLock()
     
+    # the open is queued, so only start the unlock delay once it was sent
+    def opened(future):
+        QTimer.singleShot(300, STATUS.removeLock)
+
     filter_prog = INFO.getFilterProgram(fname)
     if not filter_prog:
         LOG.debug('Loading NC program: %s', fname)
-        CMD.program_open(fname.encode('utf-8'))
-        CMD.wait_complete()
+        DISPATCHER.submit('program_open', fname.encode('utf-8'), wait=True,
+                          callback=opened)
     else:
         LOG.debug('Loading file with filter program: %s', fname)
-        openFilterProgram(fname, filter_prog)
+        openFilterProgram(fname, filter_prog, callback=opened)
 
     if add_to_recents:
         addToRecents(fname)
-    
-    QTimer.singleShot(300, STATUS.removeLock)
 
 load.ok = lambda *args, **kwargs: True
 load.bindOk = lambda *args, **kwargs: True
@@ -133,7 +135,7 @@ def run(start_line=0):
         LOG.warning("program.run: no file loaded, skipping AUTO start")
     elif setTaskMode(linuxcnc.MODE_AUTO):
         LOG.debug("program.run: starting AUTO run at line %s", start_line)
-        CMD.auto(linuxcnc.AUTO_RUN, start_line)
+        DISPATCHER.submit('auto', linuxcnc.AUTO_RUN, start_line)
     else:
         LOG.warning(
             "program.run: no action taken; state=%s mode=%s interp=%s paused=%s feed_hold=%s",
@@ -193,11 +195,9 @@ def _run_ok(widget=None):
     return ok
 
 def _run_bindOk(widget):
-    STATUS.estop.onValueChanged(lambda: _run_ok(widget))
-    STATUS.enabled.onValueChanged(lambda: _run_ok(widget))
-    STATUS.all_axes_homed.onValueChanged(lambda: _run_ok(widget))
-    STATUS.interp_state.onValueChanged(lambda: _run_ok(widget))
-    STATUS.file.onValueChanged(lambda: _run_ok(widget))
+    bindOkState(_run_ok, widget, (STATUS.estop, STATUS.enabled, STATUS.all_axes_homed,
+                                  STATUS.interp_state, STATUS.file, STATUS.task_mode,
+                                  STATUS.feed_hold_enabled, STATUS.paused))
 
 run.ok = _run_ok
 run.bindOk = _run_bindOk
@@ -229,7 +229,7 @@ def step():
     if STAT.state == linuxcnc.RCS_EXEC and STAT.paused:
         CMD.auto(linuxcnc.AUTO_STEP)
     elif setTaskMode(linuxcnc.MODE_AUTO):
-        CMD.auto(linuxcnc.AUTO_STEP)
+        DISPATCHER.submit('auto', linuxcnc.AUTO_STEP)
 
 step.ok = _run_ok
 step.bindOk = _run_bindOk
@@ -287,8 +287,7 @@ def _pause_ok(widget=None):
     return ok
 
 def _pause_bindOk(widget):
-    STATUS.state.onValueChanged(lambda: _pause_ok(widget))
-    STATUS.paused.onValueChanged(lambda: _pause_ok(widget))
+    bindOkState(_pause_ok, widget, (STATUS.state, STATUS.paused))
 
 pause.ok = _pause_ok
 pause.bindOk = _pause_bindOk
@@ -342,8 +341,7 @@ def _resume_ok(widget):
     return ok
 
 def _resume_bindOk(widget):
-    STATUS.paused.onValueChanged(lambda: _resume_ok(widget))
-    STATUS.state.onValueChanged(lambda: _resume_ok(widget))
+    bindOkState(_resume_ok, widget, (STATUS.paused, STATUS.state))
 
 resume.ok = _resume_ok
 resume.bindOk = _resume_bindOk
@@ -361,6 +359,8 @@ def abort():
     """
 
     LOG.debug("Aborting program")
+    # abort is sent straight away, anything still queued is dropped
+    DISPATCHER.cancelPending()
     CMD.abort()
 
 def _abort_ok(widget=None):
@@ -391,7 +391,7 @@ def _abort_ok(widget=None):
     return ok
 
 def _abort_bindOk(widget):
-    STATUS.state.onValueChanged(lambda: _abort_ok(widget))
+    bindOkState(_abort_ok, widget, (STATUS.state,))
 
 abort.ok = _abort_ok
 abort.bindOk = _abort_bindOk
@@ -471,7 +471,7 @@ def _block_delete_ok(widget=None):
 
 def _block_delete_bindOk(widget):
     widget.setChecked(STAT.block_delete)
-    STATUS.task_state.onValueChanged(lambda: _block_delete_ok(widget))
+    bindOkState(_block_delete_ok, widget, (STATUS.task_state,))
     STATUS.block_delete.onValueChanged(lambda s: widget.setChecked(s))
 
 block_delete.on.ok = block_delete.off.ok = block_delete.toggle.ok = _block_delete_ok
@@ -552,7 +552,7 @@ def _optional_stop_ok(widget=None):
 
 def _optional_stop_bindOk(widget):
     widget.setChecked(STAT.block_delete)
-    STATUS.task_state.onValueChanged(lambda: _optional_stop_ok(widget))
+    bindOkState(_optional_stop_ok, widget, (STATUS.task_state,))
     STATUS.optional_stop.onValueChanged(lambda s: widget.setChecked(s))
 
 optional_stop.on.ok = optional_stop.off.ok = optional_stop.toggle.ok = _optional_stop_ok
@@ -568,12 +568,12 @@ import tempfile, atexit, shutil
 
 FILTER_TEMP = None
 
-def openFilterProgram(infile, prog_name):
+def openFilterProgram(infile, prog_name, callback=None):
     temp_dir = _mktemp()
     outfile = os.path.join(temp_dir, os.path.basename(infile))
     #FilterProgram(prog_name, infile, outfile, lambda r: r or _loadFilterResult(outfile))
     FilterProgram(prog_name, infile, outfile, None)
-    CMD.program_open(outfile)
+    DISPATCHER.submit('program_open', outfile, callback=callback)
     LOG.debug('Linuxcnc Command - program_open')
 
 def _loadFilterResult(fname):
@@ -16,7 +16,7 @@ DEFAULT_SPEED = INFO.defaultSpindleSpeed()
 
 CMD = linuxcnc.command()
 
-from qtpyvcp.actions.base_actions import setTaskMode
+from qtpyvcp.actions.base_actions import setTaskMode, bindOkState
 
 
 def _spindle_exists(spindle):
@@ -339,8 +339,8 @@ def _or_bindOk(value=100, spindle=0, widget=None):
         return
 
     # This will work for any widget
-    STATUS.task_state.onValueChanged(lambda: _or_ok(widget=widget))
-    STATUS.spindle[spindle].override_enabled.onValueChanged(lambda: _or_ok(widget=widget))
+    # _or_ok checks the override of spindle 0
+    bindOkState(_or_ok, widget, (STATUS.task_state, STATUS.spindle[0].override_enabled))
 
     try:
         # these will only work for QSlider or QSpinBox
@@ -394,8 +394,7 @@ def _or_enable_bindOk(spindle=0, widget=None):
     if not _spindle_exists(spindle):
         return
 
-    STATUS.task_state.onValueChanged(lambda: _or_enable_ok(spindle, widget))
-    STATUS.interp_state.onValueChanged(lambda: _or_enable_ok(spindle, widget))
+    bindOkState(_or_enable_ok, widget, (STATUS.task_state, STATUS.interp_state), spindle)
     STATUS.spindle[spindle].override_enabled.onValueChanged(widget.setChecked)
 
 override.enable.ok = override.disable.ok = override.toggle_enable.ok = _or_enable_ok
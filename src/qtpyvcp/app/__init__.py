@@ -37,6 +37,8 @@ Application Options:
   --qt-api (pyqt5 | pyqt | pyside2 | pyside)
                        Specify the Qt Python binding to use.
   --perfmon            Monitor and log system performance.
+  --profile-startup    Record startup times and write a report next to
+                       the log file.
   --develop            Development mode. Enables live reloading of QSS styles.
   --command_line_args <args>...
                        Additional args passed to the QtApplication.
@@ -16,6 +16,7 @@ from qtpy.QtWidgets import QApplication, QStyleFactory
 import qtpyvcp
 
 from qtpyvcp.utilities.logger import initBaseLogger
+from qtpyvcp.utilities.startup_profiler import PROFILER
 from qtpyvcp.plugins import initialisePlugins, terminatePlugins, getPlugin
 from qtpyvcp.widgets.base_widgets.base_widget import VCPPrimitiveWidget
 from qtpyvcp.widgets.form_widgets.main_window import VCPMainWindow
@@ -266,7 +267,9 @@ class VCPApplication(QApplication):
     def initialiseWidgets(self):
         for w in self.allWidgets():
             if isinstance(w, VCPPrimitiveWidget):
-                w.initialize()
+                with PROFILER.measure('widget initialize', '{} {}'.format(
+                        w.__class__.__name__, w.objectName())):
+                    w.initialize()
                 
     def postInitialiseWidgets(self):
         for w in self.allWidgets():
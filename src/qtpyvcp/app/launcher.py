@@ -2,15 +2,18 @@ import os
 import sys
 import time
 import importlib
+from functools import partial
 from pkg_resources import iter_entry_points
 
-from qtpy.QtCore import Qt
+from qtpy.QtCore import Qt, QTimer
 from qtpy.QtWidgets import QApplication
 
 import qtpyvcp
 from qtpyvcp import hal
 from qtpyvcp.utilities.logger import getLogger
+from qtpyvcp.utilities.startup_profiler import PROFILER
 from qtpyvcp.plugins import registerPluginFromClass, postGuiInitialisePlugins
+from qtpyvcp.widgets.base_widgets.base_widget import VCPPrimitiveWidget
 from qtpyvcp.widgets.dialogs.error_dialog import ErrorDialog, IGNORE_LIST
 
 from qtpyvcp.utilities.info import Info
@@ -51,6 +54,7 @@ def log_time(task, times=[time.time(), time.time()]):
     now = time.time()
     LOG.debug("yellow<Time:> {:.3f} (green<{:+.3f}>) - {}"
               .format(now - times[0], now - times[1], task))
+    PROFILER.record('phase', task, now - times[1])
     times[1] = now
 
 log_time("in script")
@@ -83,6 +87,7 @@ def launch_application(opts, config):
     log_time('done initializing widgets')
 
     app.postInitialiseWidgets()
+    log_time('done post initializing widgets')
     
     hal_comp.ready()
 
@@ -105,6 +110,9 @@ def launch_application(opts, config):
     # suppress QtQuick warnings
     app.setAttribute(Qt.AA_DontCreateNativeWidgetSiblings)
 
+    # write the startup report once the event loop is running
+    QTimer.singleShot(0, lambda: PROFILER.writeReport(opts.log_file))
+
     sys.exit(app.exec_())
 
 
@@ -227,7 +235,8 @@ def loadPlugins(plugins):
 def loadWindows(windows):
     for window_id, window_dict in list(windows.items()):
 
-        window = _initialize_object_from_dict(window_dict)
+        with PROFILER.measure('window', window_id):
+            window = _initialize_object_from_dict(window_dict)
         qtpyvcp.WINDOWS[window_id] = window
 
         if window_id == 'mainwindow':
@@ -239,7 +248,47 @@ def loadWindows(windows):
 
 
 def loadDialogs(dialogs):
+    """Load the dialogs defined in the YAML config.
+
+    Dialogs with ``lazy: true`` are not constructed until first requested,
+    only use this for dialogs that do not need to exist at startup, e.g.
+    ones that do not create HAL pins.
+
+    .. code-block:: yaml
+
+        dialogs:
+          my_dialog:
+            provider: qtpyvcp.widgets.dialogs.base_dialog:BaseDialog
+            lazy: true
+            kwargs:
+              ui_file: {{ file.dir }}/my_dialog.ui
+    """
     for dialogs_id, dialogs_dict in list(dialogs.items()):
 
-        inst = _initialize_object_from_dict(dialogs_dict)
+        if dialogs_dict.get('lazy', False):
+            qtpyvcp.LAZY_DIALOGS[dialogs_id] = partial(_loadLazyDialog, dialogs_id, dialogs_dict)
+            continue
+
+        with PROFILER.measure('dialog', dialogs_id):
+            inst = _initialize_object_from_dict(dialogs_dict)
         qtpyvcp.DIALOGS[dialogs_id] = inst
+
+
+def _loadLazyDialog(dialog_id, dialog_dict):
+    """Construct a lazy dialog and initialize its widgets."""
+    LOG.debug("Loading lazy dialog: %s", dialog_id)
+    with PROFILER.measure('lazy dialog', dialog_id):
+        inst = _initialize_object_from_dict(dialog_dict)
+
+    qtpyvcp.DIALOGS[dialog_id] = inst
+
+    # the app initialized all widgets at startup, do the same for these
+    widgets = [w for w in [inst] + inst.findChildren(VCPPrimitiveWidget)
+               if isinstance(w, VCPPrimitiveWidget)]
+    for w in widgets:
+        w.initialize()
+    for w in widgets:
+        if hasattr(w, 'postInitialize') and callable(w.postInitialize):
+            w.postInitialize()
+
+    return inst
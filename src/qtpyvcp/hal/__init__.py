@@ -27,11 +27,23 @@ Example:
     # connect the listener to the input pin
     comp.addListener('in', onInChanged)
 
+Pins are polled for changes every 100 ms. Pins that need to update faster or
+can update slower can be given a rate class, `fast` (20 ms), `normal` or
+`slow` (500 ms):
+
+.. code-block:: python
+
+    comp.addPin("arc-voltage", "float", "in", rate="fast")
+    comp.setScanRate("fast", 10)
+
 """
 
 from qtpyvcp.utilities.logger import getLogger
 
-from .hal_qlib import QComponent, QPin, QParam
+from .hal_qlib import QComponent, QPin, QParam, HalScanner
+
+__all__ = ['component', 'getComponent', 'QComponent', 'QPin', 'QParam',
+           'HalScanner']
 
 COMPONENTS = {}
 LOG = getLogger(__name__)
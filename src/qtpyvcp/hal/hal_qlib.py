@@ -4,6 +4,8 @@ import signal
 import _hal
 import hal
 
+from functools import partial
+
 from qtpy.QtCore import QObject, Signal, QTimer
 
 import qtpyvcp
@@ -13,6 +15,73 @@ LOG = getLogger(__name__)
 
 MAIN_WINDOW = qtpyvcp.WINDOWS.get("mainwindow")
 
+# default scan periods (ms) of the pin rate classes
+SCAN_RATES = {
+    'fast': 20,
+    'normal': 100,
+    'slow': 500,
+}
+
+
+class HalScanner(QObject):
+    """HalScanner
+
+    Reads the pins and params of a component in one pass per rate class and
+    emits `valueChanged` for the ones whose value changed. One timer per rate
+    class replaces a timer per pin.
+
+    Args:
+        parent (QObject) : The owner, usually a QComponent.
+        rates (dict, optional) : Scan periods in ms by rate class name, to
+            override or add to ``SCAN_RATES``.
+    """
+
+    def __init__(self, parent=None, rates=None):
+        super(HalScanner, self).__init__(parent)
+
+        self.rates = dict(SCAN_RATES)
+        self.rates.update(rates or {})
+
+        self._items = {}
+        self._timers = {}
+
+    def add(self, item, rate='normal'):
+        """Scan a QPin or QParam at a rate class."""
+        try:
+            period = self.rates[rate]
+        except KeyError:
+            raise ValueError("Unknown HAL scan rate '%s', must be one of %s"
+                             % (rate, ', '.join(self.rates)))
+
+        self.remove(item)
+        self._items.setdefault(rate, []).append(item)
+
+        if rate not in self._timers:
+            timer = QTimer(self)
+            timer.timeout.connect(partial(self.scan, rate))
+            timer.start(period)
+            self._timers[rate] = timer
+
+    def remove(self, item):
+        """Stop scanning a QPin or QParam."""
+        for items in self._items.values():
+            if item in items:
+                items.remove(item)
+
+    def setRate(self, rate, period):
+        """Set the scan period in ms of a rate class."""
+        self.rates[rate] = period
+        if rate in self._timers:
+            self._timers[rate].setInterval(period)
+
+    def scan(self, rate='normal'):
+        """Read all the items of a rate class and emit the changed values."""
+        for item in self._items.get(rate, ()):
+            value = item._get()
+            if value != item._val:
+                item._val = value
+                item.valueChanged.emit(value)
+
 
 class QPin(QObject):
     """QPin
@@ -25,6 +94,9 @@ class QPin(QObject):
         name (str) : The name of the HAL pin to create.
         typ (str) : The type of the HAL pin, one of `BOOL`, `FLOAT`, `U32` or `S32`.
         dir (str) : the direction of the HAL pin, one of `IN` or `OUT`.
+        cycle_time (int) : Poll interval in ms, if no scanner is given.
+        scanner (HalScanner, optional) : Scanner to poll the pin with.
+        rate (str) : The scanner rate class, one of `fast`, `normal` or `slow`.
 
     Properties:
         value (float | int | bool) : The the current value of the HAL pin.
@@ -33,13 +105,18 @@ class QPin(QObject):
 
     valueChanged = Signal(object)
 
-    def __init__(self, comp, name, typ, dir, cycle_time=100):
+    def __init__(self, comp, name, typ, dir, cycle_time=100, scanner=None, rate='normal'):
         super(QPin, self).__init__(MAIN_WINDOW)
 
         self._pin = _hal.component.newpin(comp, name, typ, dir)
+        self._get = self._pin.get
         self._val = self._pin.get()
 
-        self.startTimer(cycle_time)
+        if scanner is None:
+            self.startTimer(cycle_time)
+        elif dir != hal.HAL_OUT:
+            # only this component can change an OUT pin, so no need to scan it
+            scanner.add(self, rate)
 
     def timerEvent(self, timer):
         tmp = self._pin.get()
@@ -69,6 +146,9 @@ class QParam(QObject):
         name (str) : The name of the HAL pin to create.
         typ (str) : The type of the HAL pin, one of `BOOL`, `FLOAT`, `U32` or `S32`.
         dir (str) : the direction of the HAL pin, one of `IN` or `OUT`.
+        cycle_time (int) : Poll interval in ms, if no scanner is given.
+        scanner (HalScanner, optional) : Scanner to poll the param with.
+        rate (str) : The scanner rate class, one of `fast`, `normal` or `slow`.
 
     Properties:
         value (float | int | bool) : The the current value of the HAL pin.
@@ -77,13 +157,19 @@ class QParam(QObject):
 
     valueChanged = Signal(object)
 
-    def __init__(self, comp, name, pin_type=hal.HAL_BIT, access_mode=hal.HAL_RW, cycle_time=100):
+    def __init__(self, comp, name, pin_type=hal.HAL_BIT, access_mode=hal.HAL_RW, cycle_time=100,
+                 scanner=None, rate='normal'):
         super(QParam, self).__init__(MAIN_WINDOW)
 
         self._param = _hal.component.newparam(comp, name, pin_type, access_mode)
+        self._get = self._param.get
         self._val = self._param.get()
 
-        self.startTimer(cycle_time)
+        if scanner is None:
+            self.startTimer(cycle_time)
+        elif access_mode != hal.HAL_RO:
+            # a RO param can only be changed by this component
+            scanner.add(self, rate)
 
     def timerEvent(self, timer):
         tmp = self._param.get()
@@ -104,11 +190,22 @@ class QParam(QObject):
 
 
 class QComponent(QObject):
-    """QComponent"""
-    def __init__(self, comp_name, ):
+    """QComponent
+
+    The pins and params of the component are polled by a single HalScanner.
+    Each is scanned at a rate class, `fast`, `normal` or `slow`, so pins
+    that need to update quickly, like THC pins, don't make all the others
+    poll at the same rate.
+
+    Args:
+        comp_name (str) : The name of the HAL component.
+        scan_rates (dict, optional) : Scan periods in ms by rate class name.
+    """
+    def __init__(self, comp_name, scan_rates=None):
         super(QComponent, self).__init__(MAIN_WINDOW)
 
         self.name = comp_name
+        self.scanner = HalScanner(self, scan_rates)
 
         signal.signal(signal.SIGTERM, self.signal_handler)
         signal.signal(signal.SIGINT, self.signal_handler)
@@ -135,27 +232,31 @@ class QComponent(QObject):
         self._pins = {}
         self._params = {}
 
-    def addPin(self, name, pin_type, direction):
+    def addPin(self, name, pin_type, direction, rate='normal'):
 
         pin_type = self.type_map.get(pin_type.lower())
         pin_dir = self.dir_map.get(direction.lower())
 
         LOG.debug("Adding HAL pin: %s.%s (%s %s)", self.name, name, type, direction)
 
-        pin = QPin(self._comp, name, pin_type, pin_dir)
+        pin = QPin(self._comp, name, pin_type, pin_dir, scanner=self.scanner, rate=rate)
         self._pins[name] = pin
         return pin
 
-    def addParam(self, name, param_type, access_mode):
+    def addParam(self, name, param_type, access_mode, rate='normal'):
 
         param_type = self.type_map.get(param_type.lower())
         access_mode = self.mode_map.get(access_mode.lower())
         LOG.debug("Adding PARAM params: %s %s", self.name, name)
 
-        param = QParam(self._comp, name, param_type, access_mode)
+        param = QParam(self._comp, name, param_type, access_mode, scanner=self.scanner, rate=rate)
         self._params[name] = param
         return param
 
+    def setScanRate(self, rate, period):
+        """Set the scan period in ms of a pin rate class."""
+        self.scanner.setRate(rate, period)
+
     def getParam(self, param_name):
         return self._params[param_name]
 
@@ -153,6 +153,21 @@ class DBusNotification(object):
     def setNotify(self, title, message):
         self.show(title, message)
 
+    def setNotifyBatch(self, notifications):
+        """Show several notifications as one.
+
+        Notifications reuse the same id, so each one would replace the one
+        before it. Show them all in a single body instead.
+        """
+        if not notifications:
+            return
+        if len(notifications) == 1:
+            self.show(*notifications[0])
+            return
+        body = "\n".join("{}: {}".format(title, message)
+                         for title, message in notifications)
+        self.show("{} notifications".format(len(notifications)), body)
+
     def close(self):
         """Ask the notification server to close the notification"""
         if self.id != 0:
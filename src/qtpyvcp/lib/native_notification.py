@@ -105,11 +105,36 @@ class NativeNotification(BaseDialog):
         self.mainLayout = QVBoxLayout(self)
 
     def setNotify(self, title, message):
-                
+        self.setNotifyBatch([(title, message)])
+
+    def setNotifyBatch(self, notifications):
+        """Show several notifications with a single relayout.
+
+        Args:
+            notifications (list) : (title, message) tuples, oldest first.
+        """
+        # only the newest maxMessages would survive, don't build the others
+        for title, message in notifications[-self.maxMessages:]:
+            self._addMessage(title, message)
+
+        if not notifications:
+            return
+
+        self.setMinimumSize(self.sizeHint())
+        self.adjustSize()
+        self.setMinimumSize(self.minimumSizeHint())
+
+        w_size = self.frameSize()
+        self.move(self.screenWidth - w_size.width(), 0)
+
+        self.show()
+        self.raise_()
+
+    def _addMessage(self, title, message):
         m = Message(title, message, self)
         self.mainLayout.insertWidget(0, m)
         self.mainLayout.setAlignment(Qt.AlignRight)
-        
+
         m.buttonClose.clicked.connect(self.onClicked)
         self.nMessages += 1
 
@@ -120,16 +145,6 @@ class NativeNotification(BaseDialog):
             self.nMessages -= 1
 
         self.activeMessages.append(m)
-        
-        self.setMinimumSize(self.sizeHint())
-        self.adjustSize()
-        self.setMinimumSize(self.minimumSizeHint())
-
-        w_size = self.frameSize()
-        self.move(self.screenWidth - w_size.width(), 0)
-        
-        self.show()
-        self.raise_()
 
     def onClicked(self):
         m = self.sender().parent()
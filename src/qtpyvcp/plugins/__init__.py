@@ -11,6 +11,7 @@ import importlib
 from collections import OrderedDict
 
 from qtpyvcp.utilities.logger import getLogger
+from qtpyvcp.utilities.startup_profiler import PROFILER
 from qtpyvcp.plugins.base_plugins import Plugin, DataPlugin, DataChannel
 
 LOG = getLogger(__name__)
@@ -68,7 +69,8 @@ def registerPluginFromClass(plugin_id, plugin_cls, args=[], kwargs={}):
         modname, sep, clsname = plugin_cls.partition(':')
 
         try:
-            plugin_cls = getattr(importlib.import_module(modname), clsname)
+            with PROFILER.measure('plugin import', modname):
+                plugin_cls = getattr(importlib.import_module(modname), clsname)
         except Exception:
             LOG.critical("Failed to import data plugin.")
             raise
@@ -76,7 +78,8 @@ def registerPluginFromClass(plugin_id, plugin_cls, args=[], kwargs={}):
     assert issubclass(plugin_cls, Plugin), "Not a valid plugin, must be a qtpyvcp.plugins.Plugin subclass."
 
     try:
-        inst = plugin_cls(*args, **kwargs)
+        with PROFILER.measure('plugin constructor', plugin_id):
+            inst = plugin_cls(*args, **kwargs)
         registerPlugin(plugin_id, inst)
         return inst
     except TypeError:
@@ -114,7 +117,8 @@ def initialisePlugins():
     """
     for plugin_id, plugin_inst in list(_PLUGINS.items()):
         LOG.debug("Initializing '%s' plugin", plugin_id)
-        plugin_inst.initialise()
+        with PROFILER.measure('plugin initialise', plugin_id):
+            plugin_inst.initialise()
 
 
 def postGuiInitialisePlugins(main_window):
@@ -126,7 +130,8 @@ def postGuiInitialisePlugins(main_window):
     """
     for plugin_id, plugin_inst in list(_PLUGINS.items()):
         LOG.debug("Post GUI Initializing '%s' plugin", plugin_id)
-        plugin_inst.postGuiInitialise(main_window)
+        with PROFILER.measure('plugin postGuiInitialise', plugin_id):
+            plugin_inst.postGuiInitialise(main_window)
 
 
 def terminatePlugins():
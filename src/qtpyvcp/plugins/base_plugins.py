@@ -93,6 +93,9 @@ class DataPlugin(Plugin):
 
         try:
             chan_obj = self.channels[chan]
+            # the expression may be read without connecting to the signal,
+            # e.g. by non-trigger rule channels, so keep the channel updated
+            chan_obj.addReader()
             if len(args) > 0 and args[0] in ('string', 'text', 'str'):
                 chan_exp = lambda: chan_obj.getString(*args[1:], **kwargs)
             else:
@@ -119,6 +122,10 @@ class DataChannel(QObject):
 
     signal = Signal(object)
 
+    # incremented whenever any channel gains or loses a subscriber, so
+    # pollers can cheaply tell when their watch lists need to be rebuilt
+    subscription_serial = 0
+
     def __init__(self, fget=None, fset=None, fstr=None, data=None, settable=False,
                  doc = None):
         super(DataChannel, self).__init__()
@@ -128,6 +135,7 @@ class DataChannel(QObject):
         self.fstr = fstr
 
         self.value = data
+        self.subscribers = 0
 
         self.settable = settable
         self.instance = None
@@ -190,6 +198,25 @@ class DataChannel(QObject):
     # fixme
     onValueChanged = notify
 
+    def hasSubscribers(self):
+        """True if anything is connected to the channel signal or reads it."""
+        return self.subscribers > 0
+
+    def addReader(self):
+        """Count a consumer that reads the value without connecting to it."""
+        self.subscribers += 1
+        DataChannel.subscription_serial += 1
+
+    def connectNotify(self, signal):
+        self.subscribers += 1
+        DataChannel.subscription_serial += 1
+        super(DataChannel, self).connectNotify(signal)
+
+    def disconnectNotify(self, signal):
+        self.subscribers = max(0, self.subscribers - 1)
+        DataChannel.subscription_serial += 1
+        super(DataChannel, self).disconnectNotify(signal)
+
     def __get__(self, instance, owner):
         self.instance = instance
         return self
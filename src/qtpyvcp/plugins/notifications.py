@@ -22,6 +22,8 @@ Supports evaluating arbitrary python expressions placed in gcode DEBUG statement
 import time
 import linuxcnc
 
+from collections import deque, OrderedDict
+
 from qtpy.QtWidgets import QApplication
 
 from qtpyvcp.utilities.logger import getLogger
@@ -32,6 +34,14 @@ from qtpyvcp.lib.dbus_notification import DBusNotification
 LOG = getLogger(__name__)
 STATUS = getPlugin('status')
 
+# safety limit on messages read from the error channel per timer tick, a
+# runaway producer should not be able to lock up the GUI
+MAX_DRAIN = 1000
+
+ERROR_KINDS = (linuxcnc.NML_ERROR, linuxcnc.OPERATOR_ERROR)
+TEXT_KINDS = (linuxcnc.NML_TEXT, linuxcnc.OPERATOR_TEXT)
+DISPLAY_KINDS = (linuxcnc.NML_DISPLAY, linuxcnc.OPERATOR_DISPLAY)
+
 
 class Notifications(DataPlugin):
     """
@@ -41,19 +51,22 @@ class Notifications(DataPlugin):
         enabled (bool, optional):                      Enable or disable notification popups (Default = True)
         mode (str, optional):                          native or dbus (Default = 'native')
         max_messages (int, optional)                   Max number of notification popups to show.
-        persistent (bool, optional):                   Save notifications on shutdown (Default = True)
+        persistent (bool, optional):                   Keep the message history between sessions (Default = True)
+        max_history (int, optional):                   Max number of messages kept in the history,
+                                                       the oldest are dropped first (Default = 1000)
     """
     def __init__(self, enabled=True, mode="native", max_messages=5,
-                 persistent=True, **kwargs):
+                 persistent=True, max_history=1000, **kwargs):
         super(Notifications, self).__init__()
 
         self.enabled = enabled
         self.mode = mode
         self.max_messages = max_messages
+        self.max_history = max_history
 
         self.error_channel = linuxcnc.error_channel()
 
-        self.messages = []
+        self.messages = deque(maxlen=max_history)
         self.notification_dispatcher = None
 
         self.persistent = persistent
@@ -88,32 +101,38 @@ class Notifications(DataPlugin):
         """
         return chan.value or ''
 
-    def captureMessage(self, m_type, msg):
-
-        if self.enabled:
-            self.notification_dispatcher.setNotify(m_type, msg)
-
-        self.messages.append({'timestamp': time.time(),
-                              'message_type': m_type,
-                              'message_text': msg,
-                              'operator_id': '',
-                              'loaded_file': STATUS.file.getValue(),
-                              'task_mode': STATUS.task_mode.getString(),
-                              'task_state': STATUS.task_state.getString(),
-                              'interp_mode': STATUS.interp_state.getString(),
-                              }
-                             )
-
-    def timerEvent(self, event):
-        """Called every 200ms to poll error channel"""
-        error = self.error_channel.poll()
+    def captureMessage(self, m_type, msg, count=1, notify=True):
+        """Add a message to the history and optionally show it.
 
-        if not error:
-            return
+        Args:
+            m_type (str) : 'error', 'debug' or 'info'.
+            msg (str) : The message text.
+            count (int, optional) : Number of times the message was received.
+            notify (bool, optional) : Show a notification popup.
+        """
+        if notify and self.enabled:
+            self.notification_dispatcher.setNotify(m_type, self.repeatText(msg, count))
+
+        message = {'timestamp': time.time(),
+                   'message_type': m_type,
+                   'message_text': msg,
+                   'count': count,
+                   'operator_id': '',
+                   'loaded_file': STATUS.file.getValue(),
+                   'task_mode': STATUS.task_mode.getString(),
+                   'task_state': STATUS.task_state.getString(),
+                   'interp_mode': STATUS.interp_state.getString(),
+                   }
+
+        self.messages.append(message)
 
-        kind, msg_text = error
-        msg_text = msg_text.strip()
+        if self.persistent:
+            # journal the new message now
+            self.data_manager.appendData('messages', message, self.max_history)
 
+    @staticmethod
+    def formatMessage(msg_text):
+        """Wrap the message text every 5 words."""
         message_words = msg_text.split(' ')
 
         index = 1
@@ -133,44 +152,91 @@ class Notifications(DataPlugin):
         if msg == "" or msg is None:
             msg = "No message text set."
 
-        if kind in [linuxcnc.NML_ERROR, linuxcnc.OPERATOR_ERROR]:
-            self.error_message.setValue(msg)
-            self.captureMessage('error', msg)
-            LOG.error(msg)
+        return msg
 
-        elif kind in [linuxcnc.NML_TEXT, linuxcnc.OPERATOR_TEXT]:
-            self.debug_message.setValue(msg)
-            self.captureMessage('debug', msg)
-            LOG.debug(msg)
+    @staticmethod
+    def repeatText(msg, count):
+        if count > 1:
+            return "{}\n(repeated {} times)".format(msg, count)
+        return msg
 
-        elif kind in [linuxcnc.NML_DISPLAY, linuxcnc.OPERATOR_DISPLAY]:
+    def evalExpression(self, msg_text):
+        exp = msg_text[5:].strip(']')
+        exp = exp.replace('{', '(').replace('}', ')')
 
-            if msg_text.lower().startswith('eval['):
-                exp = msg_text[5:].strip(']')
-                exp = exp.replace('{', '(').replace('}', ')')
+        LOG.debug("Evaluating gcode DEBUG expression: '%s'", exp)
 
-                LOG.debug("Evaluating gcode DEBUG expression: '%s'", exp)
+        try:
+            app = QApplication.instance()
+            eval(exp, {"vcp": app})
+        except Exception:
+            LOG.exception("Error evaluating DEBUG expression: '%s'", exp)
 
-                try:
-                    app = QApplication.instance()
-                    eval(exp, {"vcp": app})
-                except Exception:
-                    LOG.exception("Error evaluating DEBUG expression: '%s'", exp)
+    def timerEvent(self, event):
+        """Called every 200ms to drain the error channel"""
 
-            else:
-                self.info_message.setValue(msg)
-                self.captureMessage('info', msg)
-                LOG.info(msg)
+        # identical messages received in this tick, in order of first arrival
+        batch = OrderedDict()
+
+        for _ in range(MAX_DRAIN):
+            error = self.error_channel.poll()
+            if not error:
+                break
+
+            kind, msg_text = error
+            msg_text = msg_text.strip()
+
+            if kind in DISPLAY_KINDS and msg_text.lower().startswith('eval['):
+                # expressions have side effects, so run every one in order
+                self.evalExpression(msg_text)
+                continue
+
+            key = (kind, msg_text)
+            batch[key] = batch.get(key, 0) + 1
 
         else:
-            self.info_message.setValue(msg)
-            self.captureMessage('info', msg)
-            LOG.error(msg)
+            LOG.warning("More than %d messages on the error channel, "
+                        "reading the rest on the next update", MAX_DRAIN)
+
+        if not batch:
+            return
+
+        notifications = []
+        for (kind, msg_text), count in batch.items():
+            msg = self.formatMessage(msg_text)
+            text = self.repeatText(msg, count)
+
+            if kind in ERROR_KINDS:
+                m_type = 'error'
+                self.error_message.setValue(text)
+                LOG.error(text)
+
+            elif kind in TEXT_KINDS:
+                m_type = 'debug'
+                self.debug_message.setValue(text)
+                LOG.debug(text)
+
+            elif kind in DISPLAY_KINDS:
+                m_type = 'info'
+                self.info_message.setValue(text)
+                LOG.info(text)
+
+            else:
+                m_type = 'info'
+                self.info_message.setValue(text)
+                LOG.error(text)
+
+            self.captureMessage(m_type, msg, count, notify=False)
+            notifications.append((m_type, text))
+
+        if self.enabled:
+            self.notification_dispatcher.setNotifyBatch(notifications)
 
     def initialise(self):
 
         if self.persistent:
-            self.messages = self.data_manager.getData('messages', [])
+            self.messages = deque(self.data_manager.getData('messages', []),
+                                  maxlen=self.max_history)
         
         # Enable notifications before there is a main window, captureMessage wins postGuiInitialise.
         # Initalice later with a main window set as parent in postGuiInitilise ( FIXME )
@@ -195,7 +261,3 @@ class Notifications(DataPlugin):
                 self.notification_dispatcher = DBusNotification("qtpyvcp")
             else:
                 raise Exception("error notification mode {}".format(self.mode))
-
-    def terminate(self):
-        if self.persistent:
-            self.data_manager.setData('messages', self.messages)
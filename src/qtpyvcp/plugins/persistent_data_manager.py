@@ -1,4 +1,32 @@
+"""
+Persistent Data Manager
+-----------------------
+
+Stores data that should be kept between sessions, like settings, the tool in
+the spindle and the message history.
+
+The data is kept in a snapshot file, written with pickle or json, and an
+append-only journal next to it (``<persistence_file>.journal``). Each
+``setData`` or ``appendData`` call adds one record to the journal, and the
+journal is flushed and fsynced in batches every ``sync_interval`` ms, so data
+set during a session survives a crash or power cut and nothing depends on a
+clean shutdown. On startup the journal is replayed over the snapshot.
+
+When the journal grows larger than ``compact_size`` bytes the full data is
+written to a new snapshot and the journal is started over. On exit only the
+records not yet synced are written.
+
+Each journal record is a 4 byte length and a 4 byte CRC32, followed by the
+record serialized with the configured method. A record that was only partly
+written when the machine went down fails the check and is dropped together
+with anything after it.
+"""
+
 import os
+import zlib
+import struct
+
+from qtpy.QtCore import QTimer
 
 from qtpyvcp.utilities.misc import normalizePath
 from qtpyvcp.utilities.logger import getLogger
@@ -6,9 +34,27 @@ from qtpyvcp.plugins import Plugin
 
 LOG = getLogger(__name__)
 
+# journal record header, payload length and CRC32 of the payload
+RECORD_HEADER = struct.Struct('<II')
+
+# snapshot key holding the id of the journal that continues the snapshot
+JOURNAL_KEY = '__journal__'
+
 
 class PersistentDataManager(Plugin):
-    def __init__(self, serialization_method='pickle', persistence_file=None):
+    """
+    Persistent data manager plugin
+
+    Args:
+        serialization_method (str, optional):         json or pickle (Default = 'pickle')
+        persistence_file (str, optional):              Snapshot file path, relative to the config dir.
+        sync_interval (int, optional):                 Max time in ms before data set is written to
+                                                       disk (Default = 1000)
+        compact_size (int, optional):                  Journal size in bytes at which a new snapshot
+                                                       is written (Default = 1048576)
+    """
+    def __init__(self, serialization_method='pickle', persistence_file=None,
+                 sync_interval=1000, compact_size=1024 * 1024):
         super(PersistentDataManager, self).__init__()
 
         self.serialization_method = serialization_method
@@ -26,12 +72,186 @@ class PersistentDataManager(Plugin):
         self.data = {}
         self.persistence_file = normalizePath(path=persistence_file,
                                               base=os.getenv('CONFIG_DIR', '~/'))
+        self.journal_file = self.persistence_file + '.journal'
+
+        self.sync_interval = sync_interval
+        self.compact_size = compact_size
+
+        # id of the current snapshot, None for files written without a journal
+        self._snapshot_id = None
+        self._journal = None
+        self._journal_size = 0
+        self._pending = []
+
+        self._sync_timer = None
 
     def getData(self, name, default=None):
         return self.data.get(name, default)
 
     def setData(self, name, data):
         self.data[name] = data
+        self._journalRecord(('set', name, data))
+
+    def appendData(self, name, item, max_length=None):
+        """Append an item to a list, journaling only the new item.
+
+        Args:
+            name (str) : Name of the list.
+            item : Item to append.
+            max_length (int, optional) : Drop the oldest items above this length.
+        """
+        self._append(name, item, max_length)
+        self._journalRecord(('append', name, item, max_length))
+
+    def _append(self, name, item, max_length):
+        items = self.data.get(name)
+        if not isinstance(items, list):
+            items = self.data[name] = list(items or [])
+
+        items.append(item)
+        if max_length and len(items) > max_length:
+            del items[:len(items) - max_length]
+
+    def _dumps(self, obj):
+        if self.serialization_method == 'json':
+            return self.serializer.dumps(obj).encode('utf-8')
+        return self.serializer.dumps(obj, protocol=self.serializer.HIGHEST_PROTOCOL)
+
+    def _loads(self, payload):
+        if self.serialization_method == 'json':
+            return self.serializer.loads(payload.decode('utf-8'))
+        return self.serializer.loads(payload)
+
+    def _record(self, record):
+        payload = self._dumps(record)
+        return RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+    def _journalRecord(self, record):
+        try:
+            self._pending.append(self._record(record))
+        except Exception:
+            LOG.exception("Can't serialize persistent data '%s'", record[1])
+            return
+
+        if self._sync_timer is not None and not self._sync_timer.isActive():
+            self._sync_timer.start()
+
+    def _readJournal(self):
+        """Replay the journal over the snapshot.
+
+        Returns:
+            int : Size of the valid part of the journal, None if the journal
+                does not continue the current snapshot.
+        """
+        with open(self.journal_file, 'rb') as fh:
+            content = fh.read()
+
+        pos = 0
+        first = True
+        while pos + RECORD_HEADER.size <= len(content):
+            length, crc = RECORD_HEADER.unpack_from(content, pos)
+            start = pos + RECORD_HEADER.size
+            payload = content[start:start + length]
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                break
+
+            try:
+                record = self._loads(payload)
+            except Exception:
+                break
+
+            if first:
+                # the journal was started after a later snapshot was written
+                if record[0] != 'base' or record[1] != self._snapshot_id:
+                    return None
+                first = False
+
+            elif record[0] == 'set':
+                self.data[record[1]] = record[2]
+
+            elif record[0] == 'append':
+                self._append(*record[1:])
+
+            pos = start + length
+
+        if first:
+            return None
+
+        if pos < len(content):
+            LOG.warning("Dropped %d bytes of incomplete data at the end of %s",
+                        len(content) - pos, self.journal_file)
+
+        return pos
+
+    def _openJournal(self, size=None):
+        if size is None:
+            # start a new journal for the current snapshot
+            self._journal = open(self.journal_file, 'wb')
+            self._journal_size = 0
+            self._pending.insert(0, self._record(('base', self._snapshot_id)))
+        else:
+            # continue after the last valid record
+            self._journal = open(self.journal_file, 'r+b')
+            self._journal.truncate(size)
+            self._journal.seek(size)
+            self._journal_size = size
+
+        self.sync()
+
+    def sync(self):
+        """Write data that has been set to the journal and fsync it."""
+        if self._journal is None or not self._pending:
+            return
+
+        data = b''.join(self._pending)
+        self._pending = []
+
+        try:
+            self._journal.write(data)
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+        except OSError:
+            LOG.exception("Error writing persistent data to file: %s", self.journal_file)
+            return
+
+        self._journal_size += len(data)
+        if self._journal_size > self.compact_size:
+            self.compact()
+
+    def compact(self):
+        """Write all data to a new snapshot and start a new journal."""
+        LOG.debug("Writing persistent data to file: %s", self.persistence_file)
+
+        data = dict(self.data)
+        data[JOURNAL_KEY] = (self._snapshot_id or 0) + 1
+
+        if self.serialization_method == 'json':
+            str_data = self.serializer.dumps(data, indent=4, sort_keys=True)
+            write_method = "w"
+        else:
+            str_data = self.serializer.dumps(data,
+                                             protocol=self.serializer.HIGHEST_PROTOCOL)
+            write_method = "wb"
+
+        tmp_file = self.persistence_file + '.tmp'
+        try:
+            with open(tmp_file, write_method) as fh:
+                fh.write(str_data)
+                fh.flush()
+                os.fsync(fh.fileno())
+            os.replace(tmp_file, self.persistence_file)
+        except OSError:
+            LOG.exception("Error writing persistent data to file: %s",
+                          self.persistence_file)
+            return
+
+        # a crash before the new journal is written leaves the old one,
+        # which is ignored because its id no longer matches the snapshot
+        self._snapshot_id = data[JOURNAL_KEY]
+        self._pending = []
+        if self._journal is not None:
+            self._journal.close()
+        self._openJournal()
 
     def initialise(self):
         if os.path.isfile(self.persistence_file):
@@ -42,15 +262,36 @@ class PersistentDataManager(Plugin):
                     LOG.exception("Error reading persistent data from file: %s",
                                   self.persistence_file)
 
+        self._snapshot_id = self.data.pop(JOURNAL_KEY, None)
+
+        size = None
+        if os.path.isfile(self.journal_file):
+            try:
+                size = self._readJournal()
+            except OSError:
+                LOG.exception("Error reading persistent data from file: %s",
+                              self.journal_file)
+
+        try:
+            self._openJournal(size)
+        except OSError:
+            LOG.exception("Can't open persistent data journal: %s", self.journal_file)
+            self._journal = None
+            return
+
+        self._sync_timer = QTimer(self)
+        self._sync_timer.setSingleShot(True)
+        self._sync_timer.setInterval(self.sync_interval)
+        self._sync_timer.timeout.connect(self.sync)
+
     def terminate(self):
-        LOG.debug("Writing persistent data to file: %s", self.persistence_file)
-        if self.serialization_method == 'json':
-            str_data = self.serializer.dumps(self.data, indent=4, sort_keys=True)
-            write_method = "w"
-        else:
-            str_data = self.serializer.dumps(self.data,
-                                             protocol=self.serializer.HIGHEST_PROTOCOL)
-            write_method = "wb"
+        if self._sync_timer is not None:
+            self._sync_timer.stop()
+
+        self.sync()
+        if self._journal is not None and self._journal_size > self.compact_size:
+            self.compact()
 
-        with open(self.persistence_file, write_method) as fh:
-            fh.write(str_data)
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
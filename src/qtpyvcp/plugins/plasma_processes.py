@@ -22,9 +22,11 @@ import csv
 from qtpyvcp.utilities.logger import getLogger
 from qtpyvcp.utilities.info import Info
 from qtpyvcp.utilities.misc import normalizePath
+from qtpyvcp.utilities.plasma_snapshot import write_snapshot
 from qtpyvcp.plugins import Plugin
 
 from sqlalchemy import create_engine
+from sqlalchemy import event
 from sqlalchemy import Column, ForeignKey
 from sqlalchemy import Integer, String, Float, LargeBinary, Boolean
 from sqlalchemy import and_
@@ -322,9 +324,16 @@ class Cutchart(crudMixin,BASE):
         LOG.debug(f"Got filtered result set of tool_id. List length = {len(result_set)}")
         return result_set
 
+# models copied into the cut chart snapshot, see utilities/plasma_snapshot.py
+SNAPSHOT_MODELS = (Machine, Material, LinearSystem, PressureSystem,
+                   Thickness, Cutchart, HoleCut)
+
+
 class PlasmaProcesses(Plugin):
     def __init__(self, **kwargs):
         super(PlasmaProcesses, self).__init__()
+        self._persistence_file = None
+        self._snapshot_suspended = False
         # determine what database to connect to.  Support types are:
         
         # stop data load processing if in designer
@@ -347,6 +356,8 @@ class PlasmaProcesses(Plugin):
         # create and hold session for use of transactions
         self._session_maker = sessionmaker(bind=self._engine)
         self._session = self._session_maker()
+        # keep the cut chart snapshot in step with the DB
+        event.listen(self._session, 'after_commit', self._on_commit)
         # Build base filter items, get the IDs and store for later use
         if INFO.getIsMachineMetric():
             linear_setting = 'mm'
@@ -362,6 +373,33 @@ class PlasmaProcesses(Plugin):
         self._machine_name = machine
     
     
+    def _on_commit(self, session):
+        if not self._snapshot_suspended:
+            self.export_snapshot()
+
+    def export_snapshot(self):
+        """Write the cut chart snapshot used by the gcode preprocessor.
+
+        Only done for SQLite as the snapshot is keyed by the DB file revision.
+        """
+        if self._persistence_file is None:
+            return
+
+        # the committing session can not be used from inside after_commit
+        session = self._session_maker()
+        try:
+            tables = {}
+            for model in SNAPSHOT_MODELS:
+                columns = [c.name for c in model.__table__.columns]
+                tables[model.__tablename__] = [{c: getattr(row, c) for c in columns}
+                                               for row in session.query(model).all()]
+            write_snapshot(self._persistence_file, tables)
+            LOG.debug("Exported cut chart snapshot.")
+        except Exception as e:
+            LOG.warning(f"Could not export cut chart snapshot: {e}")
+        finally:
+            session.close()
+
     def drop_all(self):
         BASE.metadata.drop_all(self._engine)
     
@@ -574,6 +612,9 @@ class PlasmaProcesses(Plugin):
         # This method tears down the DB and loads net new from a source file
         # ToDO: Possible initial load/import routines below here - for OEM type use
         
+        # export the snapshot once at the end, not on every row added
+        self._snapshot_suspended = True
+
         # tear down the whole DB
         self.drop_all()
         self.build_all()
@@ -749,9 +790,12 @@ class PlasmaProcesses(Plugin):
                  pause_at_end=float(pause_at_end))
         
         # finish up
+        self._snapshot_suspended = False
+        self.export_snapshot()
     
     def initialise(self):
         LOG.debug('Initialising Plasma Processes plugin')
+        self.export_snapshot()
         self._initialized = True
 
     def terminate(self):
@@ -11,6 +11,11 @@ Usage:
         position:rel?string&axis=x        # returns X axis relative position
         position:dtg?string&axis=x        # returns X axis DTG value
 
+Each axis also has its own channel, named ``<ref>.<axis letter>``, which only
+fires when that axis changes::
+
+        position:rel.x?string             # X axis relative position
+
 
 YAML configuration:
 
@@ -59,6 +64,36 @@ else:
     # List of factors for converting from inches to mm
     CONVERSION_FACTORS = [25.4] * 3 + [1] * 3 + [25.4] * 3
 
+AXIS_LETTERS = 'xyzabcuvw'
+
+
+class AxisChannel(DataChannel):
+    """Position of a single axis.
+
+    Only emits when the value of the axis changes. Formatted strings are
+    cached per format spec until the value changes, so any number of DROs
+    showing the same axis format it once.
+    """
+    def __init__(self, anum, doc=None):
+        super(AxisChannel, self).__init__(data=0.0, doc=doc)
+        self.anum = anum
+        self._strings = {}
+
+    def setValue(self, value):
+        self._strings = {}
+        super(AxisChannel, self).setValue(value)
+
+    def format(self, fmt):
+        """The value formatted with `fmt`, e.g. ``'%9.3f'``."""
+        try:
+            return self._strings[fmt]
+        except KeyError:
+            text = self._strings[fmt] = fmt % self.value
+            return text
+
+    def getString(self, *args, **kwargs):
+        return self.format(self.instance._current_format)
+
 
 class Position(DataPlugin):
     """Positions Plugin"""
@@ -73,17 +108,49 @@ class Position(DataPlugin):
 
         self._current_format = self._imperial_format
 
+        # per axis channels, by the channel holding all the axes
+        self._axis_channels = {}
+        for ref in ('abs', 'rel', 'dtg'):
+            chan = self.channels[ref]
+            axis_chans = tuple(AxisChannel(anum, doc='{} {} position'.format(letter.upper(), ref))
+                               for anum, letter in enumerate(AXIS_LETTERS))
+            for axis_chan in axis_chans:
+                axis_chan.instance = self
+                self.channels['{}.{}'.format(ref, AXIS_LETTERS[axis_chan.anum])] = axis_chan
+            self._axis_channels[chan] = axis_chans
+
+        # (rotation_xy, cos, sin) of the last used rotation
+        self._rotation = (0, 1.0, 0.0)
+
         self._update()
 
-        # all these should cause the positions to update
-        STATUS.position.signal.connect(self._update)
-        STATUS.g5x_offset.signal.connect(self._update)
-        STATUS.g92_offset.signal.connect(self._update)
-        STATUS.tool_offset.signal.connect(self._update)
+        # all these should cause the positions to update, they only mark the
+        # positions as stale so they are computed once at the end of the
+        # status cycle, no matter how many of them changed
+        self._dirty = False
+        STATUS.position.signal.connect(self._markDirty)
+        STATUS.dtg.signal.connect(self._markDirty)
+        STATUS.g5x_offset.signal.connect(self._markDirty)
+        STATUS.g92_offset.signal.connect(self._markDirty)
+        STATUS.tool_offset.signal.connect(self._markDirty)
+        STATUS.rotation_xy.signal.connect(self._markDirty)
         STATUS.program_units.signal.connect(self.updateUnits)
+        STATUS.cycleChanged.connect(self._onStatusCycle)
 
         self.report_actual_pos = report_actual_pos
 
+    def axisChannel(self, ref, anum):
+        """Get the channel of a single axis.
+
+        Args:
+            ref (str) : Channel name, e.g. ``rel`` or ``Relative``.
+            anum (int) : Axis number.
+
+        Returns:
+            AxisChannel
+        """
+        return self._axis_channels[self.channels[ref]][anum]
+
     def getChannel(self, url):
         """Get data channel from URL.
 
@@ -112,9 +179,12 @@ class Position(DataPlugin):
             if 'axis' in kwargs:
                 axis = kwargs.pop('axis')
                 try:
-                    kwargs['anum'] = int(axis)
+                    anum = int(axis)
                 except ValueError:
-                    kwargs['anum'] = 'xyzabcuvw'.index(str(axis).lower())
+                    anum = AXIS_LETTERS.index(str(axis).lower())
+
+                # use the axis channel so only changes of this axis fire
+                chan_obj = self.axisChannel(chan, anum)
 
             if len(args) > 0 and args[0] in ('string', 'text', 'str'):
                 chan_exp = lambda: chan_obj.getString(*args[1:], **kwargs)
@@ -128,7 +198,7 @@ class Position(DataPlugin):
         return chan_obj, chan_exp
 
     def updateUnits(self, canon_units):
-        print(('updating units', canon_units))
+        LOG.debug("Updating units: %s", canon_units)
         if canon_units == 2:
             self._current_format = self._metric_format
         else:
@@ -136,6 +206,12 @@ class Position(DataPlugin):
 
         self._update()
 
+        # the string format changed, so refresh axes that did not move too
+        for chan, axis_chans in list(self._axis_channels.items()):
+            chan.signal.emit(chan.value)
+            for axis_chan in axis_chans:
+                axis_chan.signal.emit(axis_chan.value)
+
     @DataChannel
     def rel(self, chan, anum=-1):
         """The current relative axis positions including all offsets
@@ -231,20 +307,39 @@ class Position(DataPlugin):
 
         if self._report_actual_pos:
             # disconnect commanded pos update signals
-            STATUS.position.signal.disconnect(self._update)
+            STATUS.position.signal.disconnect(self._markDirty)
             # STATUS.joint_position.signal.disconnect(self._update)
             # connect actual pos update signals
-            STATUS.actual_position.signal.connect(self._update)
+            STATUS.actual_position.signal.connect(self._markDirty)
             # STATUS.joint_actual_position.signal.connect(self.joint._update)
         else:
             # disconnect actual pos update signals
-            STATUS.actual_position.signal.disconnect(self._update)
+            STATUS.actual_position.signal.disconnect(self._markDirty)
             # STATUS.joint_actual_position.signal.disconnect(self._update)
             # connect commanded pos update signals
-            STATUS.position.signal.connect(self._update)
+            STATUS.position.signal.connect(self._markDirty)
             # STATUS.joint_position.signal.connect(self._update)
 
+        self._update()
+
+    def _markDirty(self, *args):
+        self._dirty = True
+
+    def _onStatusCycle(self, changed):
+        if self._dirty:
+            self._update()
+
+    def _publish(self, chan, values):
+        if values == chan.value:
+            return
+
+        chan.setValue(values)
+        for axis_chan, value in zip(self._axis_channels[chan], values):
+            if axis_chan.value != value:
+                axis_chan.setValue(value)
+
     def _update(self):
+        self._dirty = False
 
         if self._report_actual_pos:
             pos = STAT.actual_position
@@ -256,14 +351,18 @@ class Position(DataPlugin):
         g92_offset = STAT.g92_offset
         tool_offset = STAT.tool_offset
 
-        rel = [0] * 9
+        rel = [0.0] * 9
         for axis in INFO.AXIS_NUMBER_LIST:
             rel[axis] = pos[axis] - g5x_offset[axis] - tool_offset[axis]
 
-        if STAT.rotation_xy != 0:
-            t = math.radians(-STAT.rotation_xy)
-            xr = rel[0] * math.cos(t) - rel[1] * math.sin(t)
-            yr = rel[0] * math.sin(t) + rel[1] * math.cos(t)
+        rotation_xy = STAT.rotation_xy
+        if rotation_xy != 0:
+            if rotation_xy != self._rotation[0]:
+                t = math.radians(-rotation_xy)
+                self._rotation = (rotation_xy, math.cos(t), math.sin(t))
+            cos_t, sin_t = self._rotation[1:]
+            xr = rel[0] * cos_t - rel[1] * sin_t
+            yr = rel[0] * sin_t + rel[1] * cos_t
             rel[0] = xr
             rel[1] = yr
 
@@ -271,10 +370,10 @@ class Position(DataPlugin):
             rel[axis] -= g92_offset[axis]
 
         if STAT.program_units != MACHINE_UNITS and self._use_program_units:
-            pos = [pos[anum] * CONVERSION_FACTORS[anum] for anum in range(9)]
-            rel = [rel[anum] * CONVERSION_FACTORS[anum] for anum in range(9)]
-            dtg = [dtg[anum] * CONVERSION_FACTORS[anum] for anum in range(9)]
+            pos = [p * f for p, f in zip(pos, CONVERSION_FACTORS)]
+            rel = [r * f for r, f in zip(rel, CONVERSION_FACTORS)]
+            dtg = [d * f for d, f in zip(dtg, CONVERSION_FACTORS)]
 
-        self.rel.setValue(tuple(rel))
-        self.abs.setValue(tuple(pos))
-        self.dtg.setValue(tuple(dtg))
+        self._publish(self.rel, tuple(rel))
+        self._publish(self.abs, tuple(pos))
+        self._publish(self.dtg, tuple(dtg))
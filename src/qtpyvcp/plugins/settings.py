@@ -1,5 +1,7 @@
 """Settings Plugin"""
 
+from qtpy.QtCore import QTimer
+
 from qtpyvcp import SETTINGS, CONFIG
 from qtpyvcp.utilities.logger import getLogger
 from qtpyvcp.utilities.settings import addSetting
@@ -39,12 +41,36 @@ class Settings(DataPlugin):
             except KeyError:
                 pass
 
-    def terminate(self):
+        self._saved_settings = self.persistentSettings()
+
+        # save changed settings right away so they survive a crash,
+        # changes made in the same event loop pass are saved once
+        self._save_timer = QTimer(self)
+        self._save_timer.setSingleShot(True)
+        self._save_timer.setInterval(0)
+        self._save_timer.timeout.connect(self.saveSettings)
+
+        for obj in list(SETTINGS.values()):
+            if obj.persistent == True:
+                obj.signal.connect(self._onSettingChanged)
+
+    def _onSettingChanged(self, value):
+        self._save_timer.start()
+
+    def persistentSettings(self):
         settings = {}
         for key, obj in list(SETTINGS.items()):
             if obj.persistent == True:
                 value = obj.getValue()
                 if obj.default_value != value:
                     settings[key] = value
+        return settings
 
-        self.data_manager.setData('settings', settings)
+    def saveSettings(self):
+        settings = self.persistentSettings()
+        if settings != self._saved_settings:
+            self._saved_settings = settings
+            self.data_manager.setData('settings', settings)
+
+    def terminate(self):
+        self.data_manager.setData('settings', self.persistentSettings())
@@ -1,7 +1,7 @@
 import os
 import linuxcnc
 
-from qtpy.QtCore import QTimer, QFileSystemWatcher, Qt
+from qtpy.QtCore import QTimer, QFileSystemWatcher, Qt, Signal
 from qtpy.QtWidgets import QApplication
 
 from qtpyvcp.utilities.logger import getLogger
@@ -18,11 +18,35 @@ CMD = linuxcnc.command()
 
 IN_DESIGNER = os.getenv('DESIGNER', False)
 
+# STAT items that are read directly through the channel attributes or cached
+# by a setter, so they must stay current even when nothing is subscribed.
+ALWAYS_WATCHED = ('file', 'gcodes', 'mcodes', 'enabled', 'homed',
+                  'task_state', 'task_mode', 'interp_state', 'call_level',
+                  'tool_in_spindle', 'g5x_index')
+
+
 class Status(DataPlugin):
+    """LinuxCNC status plugin.
+
+    Only STAT items whose channels are subscribed to or have been looked up
+    with :meth:`getChannel` (plus :data:`ALWAYS_WATCHED`) are compared each
+    cycle, and only the joints and spindles configured in the INI are
+    polled. After each cycle the names of all the channels that changed are
+    emitted together via :attr:`cycleChanged`.
+
+    Args:
+        cycle_time (int) : Status poll interval in ms.
+        watch_all (bool) : Compare every STAT item every cycle, regardless
+            of subscriptions. Useful if external code reads ``chan.value``
+            of channels it never connects to.
+    """
 
     stat = STAT
 
-    def __init__(self, cycle_time=100):
+    # emitted once per poll cycle with a frozenset of changed channel names
+    cycleChanged = Signal(object)
+
+    def __init__(self, cycle_time=100, watch_all=False):
         super(Status, self).__init__()
 
 
@@ -82,6 +106,16 @@ class Status(DataPlugin):
             for chan, obj in list(spindle.channels.items()):
                 self.channels['spindle.{}.{}'.format(spindle.snum, chan)] = obj
 
+        # only joints and spindles present in the INI are polled
+        self._num_joints = min(INFO.getNumberJoints(), len(self.joint))
+        self._num_spindles = min(INFO.spindles(), len(self.spindle))
+
+        self._watch_all = watch_all
+        self._watch_serial = -1
+        self._watched = []
+        self._watched_joints = []
+        self._watched_spindles = []
+
         self.all_axes_homed.value = False
         self.homed.notify(self.all_axes_homed.setValue)
         self.enabled.notify(self.all_axes_homed.setValue)
@@ -739,6 +773,8 @@ class Status(DataPlugin):
             self.file_watcher.addPath(self.file.value)
         self.file_watcher.fileChanged.connect(self.updateFile)
 
+        self._updateWatchList()
+
         LOG.debug("Starting periodic updates with %ims cycle time",
                   self._cycle_time)
         self.timer.start(self._cycle_time)
@@ -755,6 +791,29 @@ class Status(DataPlugin):
         # save MDI history
         self.saveMdiHistory(self._mdi_history_file)
 
+    def _updateWatchList(self):
+        """Rebuild the lists of items compared each cycle.
+
+        Called whenever a channel subscription has been added or removed.
+        Items that drop out of the list keep their last value in ``self.old``
+        so they are caught up on the first cycle after being re-watched.
+        """
+        self._watch_serial = DataChannel.subscription_serial
+
+        self._watched = [(item, self.channels[item]) for item in self.old
+                         if self._watch_all or item in ALWAYS_WATCHED
+                         or self.channels[item].hasSubscribers()]
+
+        self._watched_joints = [joint for joint in self.joint[:self._num_joints]
+                                if self._watch_all or joint.hasSubscribers()]
+
+        self._watched_spindles = [spindle for spindle in self.spindle[:self._num_spindles]
+                                  if self._watch_all or spindle.hasSubscribers()]
+
+        LOG.debug("Watching %i status items, %i joints and %i spindles",
+                  len(self._watched), len(self._watched_joints),
+                  len(self._watched_spindles))
+
     def _periodic(self):
 
         # s = time.time()
@@ -766,20 +825,30 @@ class Status(DataPlugin):
             self.timer.stop()
             return
 
+        if self._watch_serial != DataChannel.subscription_serial:
+            self._updateWatchList()
+
+        changed = []
+        old = self.old
+
         # status updates
-        for item, old_val in self.old.items():
+        for item, chan in self._watched:
             new_val = getattr(STAT, item)
-            if new_val != old_val:
-                self.old[item] = new_val
-                self.channels[item].setValue(new_val)
+            if new_val != old[item]:
+                old[item] = new_val
+                chan.setValue(new_val)
+                changed.append(item)
 
         # joint status updates
-        for joint in self.joint:
-            joint._update()
+        for joint in self._watched_joints:
+            joint._update(changed)
 
         # spindle status updates
-        for spindle in self.spindle:
-            spindle._update()
+        for spindle in self._watched_spindles:
+            spindle._update(changed)
+
+        if changed:
+            self.cycleChanged.emit(frozenset(changed))
 
         # print(time.time() - s)
 
@@ -796,16 +865,23 @@ class JointStatus(DataPlugin):
             self.channels[key] = chan
             setattr(self, key, chan)
 
-    def _update(self):
-        """Periodic joint item updates."""
+    def hasSubscribers(self):
+        return any(chan.hasSubscribers() for chan in self.channels.values())
 
-        jstat = list(STAT.joint[self.jnum].items())
-        changed_items = tuple(set(jstat) - set(self.jstat.items()))
-        for item in changed_items:
-            LOG.debug('JOINT_{0} {1}: {2}'.format(self.jnum, item[0], item[1]))
-            self.channels[item[0]].setValue(item[1])
+    def _update(self, changed=None):
+        """Periodic joint item updates.
 
-        self.jstat.update(jstat)
+        Args:
+            changed (list, optional) : list to append changed channel names to.
+        """
+        old = self.jstat
+        for key, value in STAT.joint[self.jnum].items():
+            if old[key] != value:
+                old[key] = value
+                LOG.debug('JOINT_{0} {1}: {2}'.format(self.jnum, key, value))
+                self.channels[key].setValue(value)
+                if changed is not None:
+                    changed.append('joint.{}.{}'.format(self.jnum, key))
 
 
 class SpindleStatus(DataPlugin):
@@ -820,13 +896,20 @@ class SpindleStatus(DataPlugin):
             self.channels[key] = chan
             setattr(self, key, chan)
 
-    def _update(self):
-        """Periodic spindle item updates."""
+    def hasSubscribers(self):
+        return any(chan.hasSubscribers() for chan in self.channels.values())
 
-        sstat = list(STAT.spindle[self.snum].items())
-        changed_items = tuple(set(sstat) - set(self.sstat.items()))
-        for item in changed_items:
-            LOG.debug('Spindle_{0} {1}: {2}'.format(self.snum, item[0], item[1]))
-            self.channels[item[0]].setValue(item[1])
+    def _update(self, changed=None):
+        """Periodic spindle item updates.
 
-        self.sstat.update(sstat)
+        Args:
+            changed (list, optional) : list to append changed channel names to.
+        """
+        old = self.sstat
+        for key, value in STAT.spindle[self.snum].items():
+            if old[key] != value:
+                old[key] = value
+                LOG.debug('Spindle_{0} {1}: {2}'.format(self.snum, key, value))
+                self.channels[key].setValue(value)
+                if changed is not None:
+                    changed.append('spindle.{}.{}'.format(self.snum, key))
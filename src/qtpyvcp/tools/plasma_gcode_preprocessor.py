@@ -20,17 +20,19 @@ Usage:
 import os
 import sys
 import re
+import shutil
 # import math
 from math import sqrt, radians, degrees, pi, fabs, cos, sin, atan2
 import logging
 # import time
 from enum import Enum, auto
+from collections import deque
 # from typing import List, Dict, Tuple, Union
 
 import hal
 import linuxcnc
-from qtpyvcp.plugins.plasma_processes import PlasmaProcesses
 from qtpyvcp.utilities.misc import normalizePath
+from qtpyvcp.utilities.plasma_snapshot import load_snapshot, CutChartSnapshot
 from qtpyvcp.utilities.config_loader import load_config_files
 
 # import pydevd;pydevd.settrace()
@@ -101,6 +103,17 @@ M_MODAL_GROUPS = {
     7: ('M3','M4','M5'),
     9: ('M48','M49')}
 
+# reverse lookup of G code -> modal group
+G_MODAL_LOOKUP = {code: grp for grp, codes in G_MODAL_GROUPS.items() for code in codes}
+
+# per line debug logging is very expensive on large files so it is only
+# done when [PLASMAC]PREPROCESSOR_TRACE is set
+TRACE_LINES = bool(INI.find('PLASMAC', 'PREPROCESSOR_TRACE'))
+
+MULTI_CODE_RE = re.compile(r"G\d+|T\s*\d+|M\d+")
+XY_TOKEN_RE = re.compile(r"X[\d\+\.-]*|Y[\d\+\.-]*")
+XY_PARAM_RE = re.compile(r"X|Y|[\d\+\.-]+")
+
 
 # Enum for line type
 class Commands(Enum):
@@ -174,6 +187,79 @@ class Commands(Enum):
 class CodeLine:
 # Class to represent a single line of gcode
 
+    # token mapping for line commands, checked in order against the start of
+    # the line: (token, line type, parser method name)
+    TOKENS = (
+        ('G0', Commands.MOVE_LINEAR, 'parse_linear'),
+        ('G10', Commands.PASSTHROUGH, 'parse_raw'),
+        ('G1', Commands.MOVE_LINEAR, 'parse_linear'),
+        ('G20', Commands.UNITS, 'set_inches'),
+        ('G21', Commands.UNITS, 'set_mms'),
+        ('G2', Commands.MOVE_ARC, 'parse_arc'),
+        ('G3', Commands.MOVE_ARC, 'parse_arc'),
+        #('M3$0', Commands.BEGIN_CUT),
+        #('M5$0', Commands.END_CUT),
+        #('M3$1', Commands.BEGIN_SCRIBE),
+        #('M5$1', Commands.END_SCRIBE),
+        #('M3$2', Commands.BEGIN_SPOT),
+        #('M5$2', Commands.END_SPOT),
+        #('M5$-1', Commands.END_ALL),
+        #('M190', Commands.SELECT_PROCESS, 'placeholder'),
+        #('M66P3L3', Commands.WAIT_PROCESS, 'placeholder'),
+        #('F#<_hal[plasmac.cut-feed-rate]>', Commands.FEEDRATE_MATERIAL),
+        #('M62P1', Commands.ENABLE_IGNORE_ARC_OK_SYNCH),
+        #('M64P1', Commands.ENABLE_IGNORE_ARC_OK_IMMED),
+        #('M63P1', Commands.DISABLE_IGNORE_ARC_OK_SYNCH),
+        #('M65P1', Commands.DISABLE_IGNORE_ARC_OK_IMMED),
+        #('M62P2', Commands.DISABLE_THC_SYNCH),
+        #('M64P2', Commands.DISABLE_THC_IMMED),
+        #('M63P2', Commands.ENABLE_THC_SYNCH),
+        #('M65P2', Commands.ENABLE_THC_IMMED),
+        #('M62P3', Commands.DISABLE_TORCH_SYNCH),
+        #('M64P3', Commands.DISABLE_TORCH_IMMED),
+        #('M63P3', Commands.ENABLE_TORCH_SYNCH),
+        #('M65P3', Commands.ENABLE_TORCH_IMMED),
+        #('M67E3', Commands.FEED_VEL_PERCENT_SYNCH),
+        #('M68E3', Commands.FEED_VEL_PERCENT_IMMED),
+        ('G41', Commands.CUTTER_COMP_LEFT, 'cutter_comp_error'),
+        ('G42', Commands.CUTTER_COMP_RIGHT, 'cutter_comp_error'),
+        ('G41.1', Commands.CUTTER_COMP_LEFT, 'cutter_comp_error'),
+        ('G42.1', Commands.CUTTER_COMP_RIGHT, 'cutter_comp_error'),
+        ('G40', Commands.CUTTER_COMP_OFF, 'parse_passthrough'),
+        ('G64', Commands.PATH_BLENDING, 'parse_passthrough'),
+        ('M52', Commands.ADAPTIVE_FEED, 'parse_passthrough'),
+        ('M2', Commands.PROGRAM_END, 'parse_passthrough'),
+        ('M30', Commands.PROGRAM_END, 'parse_passthrough'),
+        ('M3', Commands.SPINDLE_ON, 'parse_spindle_on'),
+        ('M5', Commands.SPINDLE_OFF, 'parse_spindle_off'),
+        ('M190', Commands.MATERIAL_CHANGE, 'parse_passthrough'),
+        ('M62', Commands.DIGITAL_OUT, 'parse_passthrough'),
+        ('M63', Commands.DIGITAL_OUT, 'parse_passthrough'),
+        ('M64', Commands.DIGITAL_OUT, 'parse_passthrough'),
+        ('M65', Commands.DIGITAL_OUT, 'parse_passthrough'),
+        ('M66', Commands.WAIT_PROCESS, 'parse_passthrough'),
+        ('M67', Commands.ANALOG_OUT, 'parse_passthrough'),
+        ('M68', Commands.ANALOG_OUT, 'parse_passthrough'),
+        ('G90', Commands.ABSOLUTE, 'parse_passthrough'),
+        ('G91', Commands.RELATIVE, 'parse_passthrough'),
+        ('G91.1', Commands.ARC_RELATIVE, 'parse_passthrough'),
+        ('G90.1', Commands.ARC_ABSOLUTE, 'parse_passthrough'),
+        ('F#', Commands.FEEDRATE_MATERIAL, 'parse_passthrough'),
+        ('F', Commands.FEEDRATE_LINE, 'parse_feedrate'),
+        ('O', Commands.OWORD, 'parse_raw'),
+        ('#<holes>', Commands.HOLE_MODE, 'placeholder'),
+        ('#<h_diameter>', Commands.HOLE_DIAM, 'placeholder'),
+        ('#<h_velocity>', Commands.HOLE_VEL, 'placeholder'),
+        ('#<oclength>', Commands.HOLE_OVERCUT, 'placeholder'),
+        ('#<pierce-only>', Commands.PIERCE_MODE, 'placeholder'),
+        #('#<keep-z-motion>', Commands.KEEP_Z),
+        ('#<', Commands.VARIABLE, 'parse_raw'),
+        (';', Commands.COMMENT, 'parse_comment'),
+        ('(o=', Commands.MAGIC_MATERIAL, 'parse_material'),
+        ('(', Commands.COMMENT, 'parse_comment'),
+        ('T', Commands.TOOLCHANGE, 'parse_toolchange'),
+    )
+
     def __init__(self, line, parent = None, g2g3flip = False):
         """args:
         line:  the gcode line to be parsed
@@ -196,78 +282,6 @@ class CodeLine:
         self.pierce_builder = None
 
 
-        # token mapping for line commands
-        tokens = {
-            'G0':(Commands.MOVE_LINEAR, self.parse_linear),
-            'G10':(Commands.PASSTHROUGH, self.parse_raw),
-            'G1':(Commands.MOVE_LINEAR, self.parse_linear),
-            'G20':(Commands.UNITS, self.set_inches),
-            'G21':(Commands.UNITS, self.set_mms),
-            'G2':(Commands.MOVE_ARC, self.parse_arc),
-            'G3':(Commands.MOVE_ARC, self.parse_arc),
-            #'M3$0':Commands.BEGIN_CUT,
-            #'M5$0':Commands.END_CUT,
-            #'M3$1':Commands.BEGIN_SCRIBE,
-            #'M5$1':Commands.END_SCRIBE,
-            #'M3$2':Commands.BEGIN_SPOT,
-            #'M5$2':Commands.END_SPOT,
-            #'M5$-1':Commands.END_ALL,
-            #'M190':(Commands.SELECT_PROCESS, self.placeholder),
-            #'M66P3L3':(Commands.WAIT_PROCESS, self.placeholder),
-            #'F#<_hal[plasmac.cut-feed-rate]>':Commands.FEEDRATE_MATERIAL,
-            #'M62P1':Commands.ENABLE_IGNORE_ARC_OK_SYNCH,
-            #'M64P1':Commands.ENABLE_IGNORE_ARC_OK_IMMED,
-            #'M63P1':Commands.DISABLE_IGNORE_ARC_OK_SYNCH,
-            #'M65P1':Commands.DISABLE_IGNORE_ARC_OK_IMMED,
-            #'M62P2':Commands.DISABLE_THC_SYNCH,
-            #'M64P2':Commands.DISABLE_THC_IMMED,
-            #'M63P2':Commands.ENABLE_THC_SYNCH,
-            #'M65P2':Commands.ENABLE_THC_IMMED,
-            #'M62P3':Commands.DISABLE_TORCH_SYNCH,
-            #'M64P3':Commands.DISABLE_TORCH_IMMED,
-            #'M63P3':Commands.ENABLE_TORCH_SYNCH,
-            #'M65P3':Commands.ENABLE_TORCH_IMMED,
-            #'M67E3':Commands.FEED_VEL_PERCENT_SYNCH,
-            #'M68E3':Commands.FEED_VEL_PERCENT_IMMED,
-            'G41':(Commands.CUTTER_COMP_LEFT, self.cutter_comp_error),
-            'G42':(Commands.CUTTER_COMP_RIGHT, self.cutter_comp_error),
-            'G41.1':(Commands.CUTTER_COMP_LEFT, self.cutter_comp_error),
-            'G42.1':(Commands.CUTTER_COMP_RIGHT, self.cutter_comp_error),
-            'G40':(Commands.CUTTER_COMP_OFF, self.parse_passthrough),
-            'G64':(Commands.PATH_BLENDING, self.parse_passthrough),
-            'M52':(Commands.ADAPTIVE_FEED, self.parse_passthrough),
-            'M2':(Commands.PROGRAM_END, self.parse_passthrough),
-            'M30':(Commands.PROGRAM_END, self.parse_passthrough),
-            'M3':(Commands.SPINDLE_ON, self.parse_spindle_on),
-            'M5':(Commands.SPINDLE_OFF, self.parse_spindle_off),
-            'M190':(Commands.MATERIAL_CHANGE, self.parse_passthrough),
-            'M62':(Commands.DIGITAL_OUT, self.parse_passthrough),
-            'M63':(Commands.DIGITAL_OUT, self.parse_passthrough),
-            'M64':(Commands.DIGITAL_OUT, self.parse_passthrough),
-            'M65':(Commands.DIGITAL_OUT, self.parse_passthrough),
-            'M66':(Commands.WAIT_PROCESS, self.parse_passthrough),
-            'M67':(Commands.ANALOG_OUT, self.parse_passthrough),
-            'M68':(Commands.ANALOG_OUT, self.parse_passthrough),
-            'G90':(Commands.ABSOLUTE, self.parse_passthrough),
-            'G91':(Commands.RELATIVE, self.parse_passthrough),
-            'G91.1':(Commands.ARC_RELATIVE, self.parse_passthrough),
-            'G90.1':(Commands.ARC_ABSOLUTE, self.parse_passthrough),
-            'F#':(Commands.FEEDRATE_MATERIAL, self.parse_passthrough),
-            'F':(Commands.FEEDRATE_LINE, self.parse_feedrate),
-            'O':(Commands.OWORD, self.parse_raw),
-            '#<holes>':(Commands.HOLE_MODE, self.placeholder),
-            '#<h_diameter>':(Commands.HOLE_DIAM, self.placeholder),
-            '#<h_velocity>':(Commands.HOLE_VEL, self.placeholder),
-            '#<oclength>':(Commands.HOLE_OVERCUT, self.placeholder),
-            '#<pierce-only>':(Commands.PIERCE_MODE, self.placeholder),
-            #'#<keep-z-motion>':Commands.KEEP_Z,
-            '#<':(Commands.VARIABLE, self.parse_raw),
-            ';':(Commands.COMMENT, self.parse_comment),
-            '(o=':(Commands.MAGIC_MATERIAL, self.parse_material),
-            '(':(Commands.COMMENT, self.parse_comment),
-            'T':(Commands.TOOLCHANGE, self.parse_toolchange)
-            }
-
         # a line could have multiple Gcodes on it. This is typical of the
         # preamble set by many CAM packages.  The processor should not need
         # to change any of this. It should be 'correct'.  So all we need
@@ -275,9 +289,11 @@ class CodeLine:
         # [1] Recognise it is there
         # [2] Scan for any illegal codes, set any error codes if needed
         # [3] Mark line for pass through
-        multi_codes = re.findall(r"G\d+|T\s*\d+|M\d+", line.upper().strip())
+        upper_line = line.upper().strip()
+        multi_codes = MULTI_CODE_RE.findall(upper_line)
         if len(multi_codes) > 1:
-            LOG.debug(f'Codeline: Multi codes on line detected: {line}')
+            if TRACE_LINES:
+                LOG.debug(f'Codeline: Multi codes on line detected: {line}')
             # we have multiple codes on the line
             self.type = Commands.PASSTHROUGH
             # scan for possible 'bad' codes
@@ -292,62 +308,52 @@ class CodeLine:
                 if code == 'G91':
                     self._parent.set_active_g_modal('G91')
             # look for Tx M6 combo
-            f = re.findall(r"T\s*\d+|M6", line.upper().strip())
+            f = re.findall(r"T\s*\d+|M6", upper_line)
             if len(f) == 2:
                 # we have a tool change combo. Assume in form Tx M6
                 self.parse_toolchange(combo=True)
         else:
             # not a multi code on single line situation so process line
             # to set line type
-            LOG.debug(f'Codeline: Non-Multi code: Scan tokens on line. {line}')
-            for k in tokens:
-                # do regex searches to find exact matches of the token patterns
-                # magic = False
-                if k == '(':
-                    # deal with escaping the '(' which is special char in regex
-                    pattern = r"^\({1}"
-                    r = re.search(pattern, line.upper().strip())
-                elif k == '(o=':
-                    pattern = r"^\(o={1}"
-                    # magic = True
-                    r = re.search(pattern, line.lower().strip())
-                else:
-                    pattern = r"^"+k + r"{1}"
-                    r = re.search(pattern, line.upper().strip())
-                
-                # we need to do an over ride check for a line that has gcode
-                # variables in it.  These lines need to be passed through with
-                # no further processing else the intent of the gcode progam
-                # could be ruined.
-                override = re.search('#<', line.upper().strip())
-                if override is not None:
-                    # found gcode variables, force r to None
-                    r = None
-                
-                if r is not None:
-                    # since r is NOT None we must have found something
-                    self.type = tokens[k][0]
-                    self.token = k
-                    LOG.debug(f'Non-Multi: token type = {self.type} token = {self.token}')
-                    # call the parser method bound to this key
-                    tokens[k][1]()
-                    # check for an inline comment if the entire line is not a comment
-                    if self.type not in [Commands.COMMENT, Commands.MAGIC_MATERIAL]:
-                        self.parse_inline_comment()
-                    # break out of the loop, we found a match
-                    break
-                else:
-                    # nothing of interest just mark the line for pass through processing
-                    self.type = Commands.PASSTHROUGH
+            if TRACE_LINES:
+                LOG.debug(f'Codeline: Non-Multi code: Scan tokens on line. {line}')
+            # nothing of interest just mark the line for pass through processing
+            self.type = Commands.PASSTHROUGH
+
+            # we need to do an over ride check for a line that has gcode
+            # variables in it.  These lines need to be passed through with
+            # no further processing else the intent of the gcode progam
+            # could be ruined.
+            override = '#<' in upper_line
+            if not override:
+                for k, line_type, parser in self.TOKENS:
+                    # find exact matches of the token patterns at the start of the line
+                    if k == '(o=':
+                        found = line.lower().strip().startswith(k)
+                    else:
+                        found = upper_line.startswith(k)
+
+                    if found:
+                        self.type = line_type
+                        self.token = k
+                        if TRACE_LINES:
+                            LOG.debug(f'Non-Multi: token type = {self.type} token = {self.token}')
+                        # call the parser method bound to this key
+                        getattr(self, parser)()
+                        # check for an inline comment if the entire line is not a comment
+                        if self.type not in [Commands.COMMENT, Commands.MAGIC_MATERIAL]:
+                            self.parse_inline_comment()
+                        # break out of the loop, we found a match
+                        break
+
             if self.type is Commands.PASSTHROUGH:
-                LOG.debug('Codeline: Command type = PASSTHROUGH: Do further checks, e.g. XY line/')
+                if TRACE_LINES:
+                    LOG.debug('Codeline: Command type = PASSTHROUGH: Do further checks, e.g. XY line/')
                 # If the result was seen as 'OTHER' do some further checks
                 # As soon as we shift off being type OTHER, exit the method
                 # 1. is it an XY line
-                override = re.search('#<', line.upper().strip())
-                if override is None:
+                if not override:
                     self.parse_XY_line()
-                #if self.type is not Commands.OTHER: return
 
 
     def strip_inline_comment(self, line):
@@ -401,9 +407,9 @@ class CodeLine:
         self.command = ('G',int(self.token[1:]))
         # split the raw line at the token and then look for X/Y existence
         line = self.raw.upper().split(self.token,1)[1].strip()
-        tokens = re.finditer(r"X[\d\+\.-]*|Y[\d\+\.-]*", line)
+        tokens = XY_TOKEN_RE.finditer(line)
         for token in tokens:
-            params = re.findall(r"X|Y|[\d\+\.-]+", token.group())
+            params = XY_PARAM_RE.findall(token.group())
             # this is now a list which can be added to the params dictionary
             if len(params) == 2:
                 self.params[params[0]] = float(params[1])
@@ -411,9 +417,9 @@ class CodeLine:
 
     def parse_XY_line(self):
         line = self.strip_inline_comment(self.raw.upper().strip())
-        tokens = re.finditer(r"X[\d\+\.-]*|Y[\d\+\.-]*", line)
+        tokens = XY_TOKEN_RE.finditer(line)
         for token in tokens:
-            params = re.findall(r"X|Y|[\d\+\.-]+", token.group())
+            params = XY_PARAM_RE.findall(token.group())
             # this is now a list which can be added to the params dictionary
             if len(params) == 2:
                 self.params[params[0]] = float(params[1])
@@ -1097,7 +1103,6 @@ class HoleBuilder:
         for e in self.elements:
             if e['code'] is not None:
                 print(self.element_to_gcode_line(e), file=sys.stdout)
-                sys.stdout.flush()
 
 
 class PierceBuilder:
@@ -1112,7 +1117,6 @@ class PierceBuilder:
             # shift back to absolute
             print('G90', file=sys.stdout)
         print('M5 $0', file=sys.stdout)
-        sys.stdout.flush()
 
 
 class HiDefHole:
@@ -1249,13 +1253,20 @@ class HiDefHole:
 
 class PreProcessor:
     def __init__(self, inCode):
-        self._new_gcode = []
-        self._parsed = []
+        # lines parsed but not yet written, a hole found later may still
+        # remove some of them
+        self._pending = deque()
         self.preparsed = False
         self._line = ''
         self._line_num = 0
         self._line_type = 0
-        self._orig_gcode = None
+        self._in_code = inCode
+        self._do_holes = False
+        self._do_pierce = False
+        self._hole_settings = None
+        self._remove_until_m5 = False
+        self._last_x = None
+        self._last_y = None
         self.active_g_modal_grps = {}
         self.active_m_modal_grps = {}
         self.active_cutchart = None
@@ -1291,14 +1302,11 @@ class PreProcessor:
             if machine.name == machine_name:
                 self.active_machineid = machine.id
 
-        openfile= open(inCode, 'r')
-        self._orig_gcode = openfile.readlines()
-        openfile.close()
-        
         # Test to see if the file has been previously parsed by this processor
         # This test is agnostic of the version of the preprocessor
-        line1 = self._orig_gcode[0]
-        line2 = self._orig_gcode[1]
+        with open(inCode, 'r') as openfile:
+            line1 = openfile.readline()
+            line2 = openfile.readline()
         
         if line1 == '(--------------------------------------------------)\n':
             LOG.debug("Line1 HAS pre parse match")
@@ -1314,10 +1322,9 @@ class PreProcessor:
     def set_active_g_modal(self, gcode):
         # get the modal grp for the code and set things
         # if a code is not found then nothing will be set
-        for g_modal_grp in G_MODAL_GROUPS:
-            if gcode in G_MODAL_GROUPS[g_modal_grp]:
-                self.active_g_modal_grps[g_modal_grp] = gcode
-                break
+        g_modal_grp = G_MODAL_LOOKUP.get(gcode)
+        if g_modal_grp is not None:
+            self.active_g_modal_grps[g_modal_grp] = gcode
 
 
     def active_motion_code(self):
@@ -1328,7 +1335,7 @@ class PreProcessor:
             return None
 
 
-    def flag_holes(self):
+    def read_hole_settings(self):
         LOG.debug("Start Gather info from HAL pins")
         # connect to HAL and collect the data we need to determine what holes
         # should be processes and what are too large
@@ -1369,372 +1376,349 @@ class PreProcessor:
         
         # only look for hidef if qtpyvcp.plasma-use-hidef.checked is true
         use_hidef = hal.get_value('qtpyvcp.plasma-use-hidef.checked')
-        
         LOG.debug("Got all info from HAL pins")
-        
-        # old school loop so we can easily peek forward or back of the current
-        # record being processed.
-        LOG.debug("Start scanning loop")
-        i = 0
-        while i < len(self._parsed):
-            line = self._parsed[i]
-            if len(line.command) == 2:
-                if line.command[0] == 'G' and line.command[1] == 3:
-                    # this could be a hole, test for it.
-                    # NB: Only circles that are defined as cww are deemed to be
-                    # a hole.  cw (G2) cuts are deemed as an outer edge not inner.
-                                        
-                    #[1] find the last X and Y position while grp 1 was either G0 or G1
-                    j = i-1
-                    for j in range(j, -1, -1):
-                        prev = self._parsed[j]
-                        # is there an X or Y in the line
-                        if 'X' in prev.params.keys() and prev.active_g_modal_groups[1] in ('G0','G1','G2','G3'):
-                            lastx = prev.params['X']
-                            break
-                    j = i-1
-                    for j in range(j, -1, -1):
-                        prev = self._parsed[j]
-                        # is there an X or Y in the line
-                        if 'Y' in prev.params.keys() and prev.active_g_modal_groups[1] in ('G0','G1','G2','G3'):
-                            lasty = prev.params['Y']
-                            break
-                    endx = line.params['X'] if 'X' in line.params.keys() else lastx
-                    endy = line.params['Y'] if 'Y' in line.params.keys() else lasty
-                    if endx == lastx and endy == lasty:
-                        line.is_hole = True
-                    else:
-                        line.is_hole = False
-
-                    # if line is a hole then prepare to replace
-                    # with "smart" holes IF it is within the upper params of a
-                    # hole definition.  Nomally <= 5 * thickness
-                    if line.is_hole:
-                        LOG.debug("Found a Hole. Start HoleBuilder")
-                        line.hole_builder = HoleBuilder()
-                        arc_i = line.params.get('I', 0)
-                        arc_j = line.params.get('J', 0)
-                        centre_x = endx + arc_i
-                        centre_y = endy + arc_j
-                        radius = line.hole_builder.line_length(centre_x, centre_y,endx, endy)
-                        diameter = 2 * fabs(radius)
-                        circumferance = diameter * pi
-                        
-                        # see if can find hidef data for this hole scenario
-                        if self.active_materialid is not None and use_hidef:
-                            LOG.debug(f"Look for HiDef data on this machine/material/thickness {(self.active_machineid, self.active_materialid, self.active_thicknessid)}")
-                            hidef_data = PLASMADB.hidef_holes(self.active_machineid, self.active_materialid, self.active_thicknessid)
-                        else:
-                            hidef_data = []
-                        hidef = False
-                        LOG.debug(f"Finished hidef data look. Found {len(hidef_data)}")
-                        if len(hidef_data) > 0:
-                            LOG.debug("Building up hidef hole defintion")
-                            # leadin_radius = Column(Float)
-                            # kerf = Column(Float)
-                            # cut_height = Column(Float)
-                            # leadin_speed = Column(Float)
-                            # speed1 = Column(Float)
-                            # speed2 = Column(Float)
-                            # speed3 = Column(Float)
-                            # overburn_speed = Column(Float)
-                            # overburn_adjust = Column(Float)
-                            # straight_leadin = Column(Boolean)
-
-                            hidef_hole = HiDefHole(hidef_data)
-                            hidef_leadin_radius = hidef_hole.leadin_radius(diameter)
-                            hidef_kerf = hidef_hole.kerf(diameter)
-                            hidef_cutheight = hidef_hole.cut_height(diameter)
-                            hidef_leadin_speed = hidef_hole.leadin_speed(diameter)
-                            hidef_speed1 = hidef_hole.speed1(diameter)
-                            hidef_speed2 = hidef_hole.speed2(diameter)
-                            hidef_speed3 = hidef_hole.speed3(diameter)
-                            hidef_overburn_speed = hidef_hole.overburn_speed(diameter)
-                            hidef_overburn_adjust = hidef_hole.overburn_adjust(diameter)
-                            hidef_straight_leadin = hidef_hole.straight_leadin(diameter)
-                            if None not in (hidef_leadin_radius, hidef_kerf, \
-                                            hidef_cutheight, hidef_leadin_speed, hidef_speed1, \
-                                            hidef_speed2, hidef_speed3, \
-                                            hidef_overburn_speed, hidef_overburn_adjust, \
-                                            hidef_straight_leadin):
-                                hidef = True
-                            LOG.debug(f"HiDef status is {hidef}")
-                        
-                        if diameter < small_hole_size and small_hole_detect:
-                            # removde the hole and replace with a pulse
-                            LOG.debug("Hole diamter smaller the small-hole.  Remove hole and replace with pulse")
-                            line.hole_builder.\
-                                plasma_mark(line, centre_x, centre_y, marking_delay)
-                            # scan forward and back to mark the M3 and M5 as Coammands.REMOVE
-                            j = i-1
-                            found_m3 = False
-                            for j in range(j, -1, -1):
-                                prev = self._parsed[j]
-                                # mark for removal any lines until find the M3
-                                if prev.token.startswith('M3'):
-                                    found_m3 = True
-                                    prev.type = Commands.REMOVE
-                                if not found_m3:
-                                    prev.type = Commands.REMOVE
-                                try:
-                                    if prev.active_g_modal_groups[1] != 'G0' and found_m3:
-                                        break
-                                    elif prev.active_g_modal_groups[1] == 'G0':
-                                        prev.type = Commands.REMOVE
-                                except KeyError:
-                                    # access to the dictionary index failed,
-                                    # so no longer in a g0 mode
-                                    break
-                            j = i+1
-                            for j in range(j, len(self._parsed)):
-                                next = self._parsed[j]
-                                # mark all lines for removal until find M5
-                                next.type = Commands.REMOVE
-                                if next.token.startswith('M5'):
-                                    next.type = Commands.REMOVE
-                                    break
-                        elif hidef:
-                            LOG.debug("Build a hole using hidef data")
-                            #TODO: fix for 3 segments and overburn
-                            # hidef_leadin_radius = hidef_hole.leadin_radius(diameter)
-                            # hidef_kerf = hidef_hole.kerf(diameter)
-                            # hidef_cutheight = hidef_hole.cut_height(diameter)
-                            # hidef_leadin_speed = hidef_hole.leadin_speed(diameter)
-                            # hidef_speed1 = hidef_hole.speed1(diameter)
-                            # hidef_speed2 = hidef_hole.speed2(diameter)
-                            # hidef_speed3 = hidef_hole.speed3(diameter)
-                            # hidef_overburn_speed = hidef_hole.overburn_speed(diameter)
-                            # hidef_overburn_adjust = hidef_hole.overburn_adjust(diameter)
-                            # hidef_straight_leadin = hidef_hole.straight_leadin(diameter)
-                            hidef_settings = {
-                                "hidef_leadin_radius": hidef_leadin_radius,
-                                "hidef_kerf": hidef_kerf,
-                                "hidef_cutheight": hidef_cutheight,
-                                "hidef_leadin_speed": hidef_leadin_speed,
-                                "hidef_speed1": hidef_speed1,
-                                "hidef_speed2": hidef_speed2,
-                                "hidef_speed3": hidef_speed3,
-                                "hidef_overburn_speed": hidef_overburn_speed,
-                                "hidef_overburn_adjust": hidef_overburn_adjust,
-                                "hidef_straight_leadin": hidef_straight_leadin
-                                }
-                            line.hole_builder.\
-                                plasma_hole(line, centre_x, centre_y, diameter, \
-                                            hidef_kerf, hidef_leadin_radius, \
-                                            hidef_settings, hidef)
-                            
-                            # scan forward and back to mark the M3 and M5 as Coammands.REMOVE
-                            j = i-1
-                            found_m3 = False
-                            for j in range(j, -1, -1):
-                                prev = self._parsed[j]
-                                # mark for removal any lines until find the M3
-                                if prev.token.startswith('M3'):
-                                    found_m3 = True
-                                    prev.type = Commands.REMOVE
-                                if not found_m3:
-                                    prev.type = Commands.REMOVE
-                                try:
-                                    if prev.active_g_modal_groups[1] != 'G0' and found_m3:
-                                        break
-                                    elif prev.active_g_modal_groups[1] == 'G0':
-                                        prev.type = Commands.REMOVE
-                                except KeyError:
-                                    # access to the dictionary index failed,
-                                    # so no longer in a g0 mode
-                                    break
-                            j = i+1
-                            for j in range(j, len(self._parsed)):
-                                next = self._parsed[j]
-                                # mark all lines for removal until find M5
-                                next.type = Commands.REMOVE
-                                if next.token.startswith('M5'):
-                                    next.type = Commands.REMOVE
-                                    break
-                            
-                        elif (diameter <= self.active_thickness * thickness_ratio) or \
-                           (diameter <= max_hole_size):
-                            LOG.debug("Build a normal hole using UI params")
-                            # Only build the hole of within a certain size of
-                            # Params:
-                            # x:              Hole Centre X position
-                            # y:              Hole Centre y position
-                            # d:              Hole diameter
-                            # kerf:           Kerf width for cut
-                            # leadin_radius:  Radius for the lead in arc
-                            # splits[]:       List of length segments. Segments will support different speeds. +ve is left of 12 o'clock
-                            #                 -ve is right of 12 o'clock
-                            #                 and starting positions of the circle. Including overburn
-                            if leadin_radius == 0:
-                                this_hole_leadin_radius = radius-(radius/4)-(kerf_width/2)
-                            else:
-                                this_hole_leadin_radius = leadin_radius
-                                
-                            # arc1_distance = circumferance - arc2_distance - arc3_distance - overburn_start_distance_before_zero
-                            # arc2_from_zero = arc1_distance + arc2_distance
-                            # arc3_from_zero = arc2_from_zero + arc3_distance
-                            # overburn_from_zero = arc3_from_zero + overburn_distance - circumferance
-                            # overburn_from_zero = arc3_from_zero + overburn_distance
-                            line.hole_builder.\
-                                plasma_hole(line, centre_x, centre_y, diameter, \
-                                            kerf_width, this_hole_leadin_radius)
-                            
-                            # scan forward and back to mark the M3 and M5 as Coammands.REMOVE
-                            j = i-1
-                            found_m3 = False
-                            for j in range(j, -1, -1):
-                                prev = self._parsed[j]
-                                # mark for removal any lines until find the M3
-                                if prev.token.startswith('M3'):
-                                    found_m3 = True
-                                    prev.type = Commands.REMOVE
-                                if not found_m3:
-                                    prev.type = Commands.REMOVE
-                                try:
-                                    if prev.active_g_modal_groups[1] != 'G0' and found_m3:
-                                        break
-                                    elif prev.active_g_modal_groups[1] == 'G0':
-                                        prev.type = Commands.REMOVE
-                                except KeyError:
-                                    # access to the dictionary index failed,
-                                    # so no longer in a g0 mode
-                                    break
-                            j = i+1
-                            for j in range(j, len(self._parsed)):
-                                next = self._parsed[j]
-                                # mark all lines for removal until find M5
-                                next.type = Commands.REMOVE
-                                if next.token.startswith('M5'):
-                                    next.type = Commands.REMOVE
-                                    break
-                        else:
-                            line.is_hole = False
-                            line.hole_builder = None
-            i += 1
-
-    def flag_pierce(self):
-        # old school loop so we can easily peek forward or back of the current
-        # record being processed.
-        i = 0
-        while i < len(self._parsed):
-            line = self._parsed[i]
-            if len(line.command) == 2:
-                if line.command[0] == 'M' and line.command[1] == 3:
-                    # this is a torce start so must be a pierce.
-                    line.is_pierce = True
-                    line.pierce_builder = PierceBuilder()
-                            
-                    # scan forward to find the M5 and remove all the 
-                    # stuff in the moddle using Coammands.REMOVE
-                    # Aadd in a wiggle for the pierce 
-                    j = i+1
-                    for j in range(j, len(self._parsed)):
-                        next = self._parsed[j]
-                        # mark all lines for removal until find M5
-                        next.type = Commands.REMOVE
-                        if next.token.startswith('M5'):
-                            next.type = Commands.REMOVE
-                            break
-            i += 1
-        
 
-    def parse(self):
+        self._hole_settings = (thickness_ratio, max_hole_size, leadin_radius, kerf_width,
+                               small_hole_size, small_hole_detect, marking_delay, use_hidef)
+
+    def flag_hole(self, line):
+        # Called for each line as it is parsed, before it joins the pending
+        # window. The lead in removal can only reach lines still pending, see
+        # release_lines() for why that is always enough.
+        if line.command != ('G', 3):
+            return
+
+        (thickness_ratio, max_hole_size, leadin_radius, kerf_width,
+         small_hole_size, small_hole_detect, marking_delay, use_hidef) = self._hole_settings
+
+        # this could be a hole, test for it.
+        # NB: Only circles that are defined as cww are deemed to be
+        # a hole.  cw (G2) cuts are deemed as an outer edge not inner.
+
+        #[1] the last X and Y position while grp 1 was a motion mode
+        lastx = self._last_x
+        lasty = self._last_y
+        endx = line.params['X'] if 'X' in line.params.keys() else lastx
+        endy = line.params['Y'] if 'Y' in line.params.keys() else lasty
+        if endx is not None and endy is not None and endx == lastx and endy == lasty:
+            line.is_hole = True
+        else:
+            line.is_hole = False
+
+        # if line is a hole then prepare to replace
+        # with "smart" holes IF it is within the upper params of a
+        # hole definition.  Nomally <= 5 * thickness
+        if line.is_hole:
+            LOG.debug("Found a Hole. Start HoleBuilder")
+            line.hole_builder = HoleBuilder()
+            arc_i = line.params.get('I', 0)
+            arc_j = line.params.get('J', 0)
+            centre_x = endx + arc_i
+            centre_y = endy + arc_j
+            radius = line.hole_builder.line_length(centre_x, centre_y,endx, endy)
+            diameter = 2 * fabs(radius)
+            circumferance = diameter * pi
+
+            # see if can find hidef data for this hole scenario
+            if self.active_materialid is not None and use_hidef:
+                LOG.debug(f"Look for HiDef data on this machine/material/thickness {(self.active_machineid, self.active_materialid, self.active_thicknessid)}")
+                hidef_data = PLASMADB.hidef_holes(self.active_machineid, self.active_materialid, self.active_thicknessid)
+            else:
+                hidef_data = []
+            hidef = False
+            LOG.debug(f"Finished hidef data look. Found {len(hidef_data)}")
+            if len(hidef_data) > 0:
+                LOG.debug("Building up hidef hole defintion")
+                # leadin_radius = Column(Float)
+                # kerf = Column(Float)
+                # cut_height = Column(Float)
+                # leadin_speed = Column(Float)
+                # speed1 = Column(Float)
+                # speed2 = Column(Float)
+                # speed3 = Column(Float)
+                # overburn_speed = Column(Float)
+                # overburn_adjust = Column(Float)
+                # straight_leadin = Column(Boolean)
+
+                hidef_hole = HiDefHole(hidef_data)
+                hidef_leadin_radius = hidef_hole.leadin_radius(diameter)
+                hidef_kerf = hidef_hole.kerf(diameter)
+                hidef_cutheight = hidef_hole.cut_height(diameter)
+                hidef_leadin_speed = hidef_hole.leadin_speed(diameter)
+                hidef_speed1 = hidef_hole.speed1(diameter)
+                hidef_speed2 = hidef_hole.speed2(diameter)
+                hidef_speed3 = hidef_hole.speed3(diameter)
+                hidef_overburn_speed = hidef_hole.overburn_speed(diameter)
+                hidef_overburn_adjust = hidef_hole.overburn_adjust(diameter)
+                hidef_straight_leadin = hidef_hole.straight_leadin(diameter)
+                if None not in (hidef_leadin_radius, hidef_kerf, \
+                                hidef_cutheight, hidef_leadin_speed, hidef_speed1, \
+                                hidef_speed2, hidef_speed3, \
+                                hidef_overburn_speed, hidef_overburn_adjust, \
+                                hidef_straight_leadin):
+                    hidef = True
+                LOG.debug(f"HiDef status is {hidef}")
+
+            if diameter < small_hole_size and small_hole_detect:
+                # removde the hole and replace with a pulse
+                LOG.debug("Hole diamter smaller the small-hole.  Remove hole and replace with pulse")
+                line.hole_builder.\
+                    plasma_mark(line, centre_x, centre_y, marking_delay)
+                # mark the lead in back to the M3 and the cut up to the M5 as Commands.REMOVE
+                self.remove_leadin()
+                self._remove_until_m5 = True
+            elif hidef:
+                LOG.debug("Build a hole using hidef data")
+                #TODO: fix for 3 segments and overburn
+                # hidef_leadin_radius = hidef_hole.leadin_radius(diameter)
+                # hidef_kerf = hidef_hole.kerf(diameter)
+                # hidef_cutheight = hidef_hole.cut_height(diameter)
+                # hidef_leadin_speed = hidef_hole.leadin_speed(diameter)
+                # hidef_speed1 = hidef_hole.speed1(diameter)
+                # hidef_speed2 = hidef_hole.speed2(diameter)
+                # hidef_speed3 = hidef_hole.speed3(diameter)
+                # hidef_overburn_speed = hidef_hole.overburn_speed(diameter)
+                # hidef_overburn_adjust = hidef_hole.overburn_adjust(diameter)
+                # hidef_straight_leadin = hidef_hole.straight_leadin(diameter)
+                hidef_settings = {
+                    "hidef_leadin_radius": hidef_leadin_radius,
+                    "hidef_kerf": hidef_kerf,
+                    "hidef_cutheight": hidef_cutheight,
+                    "hidef_leadin_speed": hidef_leadin_speed,
+                    "hidef_speed1": hidef_speed1,
+                    "hidef_speed2": hidef_speed2,
+                    "hidef_speed3": hidef_speed3,
+                    "hidef_overburn_speed": hidef_overburn_speed,
+                    "hidef_overburn_adjust": hidef_overburn_adjust,
+                    "hidef_straight_leadin": hidef_straight_leadin
+                    }
+                line.hole_builder.\
+                    plasma_hole(line, centre_x, centre_y, diameter, \
+                                hidef_kerf, hidef_leadin_radius, \
+                                hidef_settings, hidef)
+
+                # mark the lead in back to the M3 and the cut up to the M5 as Commands.REMOVE
+                self.remove_leadin()
+                self._remove_until_m5 = True
+
+            elif (self.active_thickness is not None and diameter <= self.active_thickness * thickness_ratio) or \
+               (diameter <= max_hole_size):
+                LOG.debug("Build a normal hole using UI params")
+                # Only build the hole of within a certain size of
+                # Params:
+                # x:              Hole Centre X position
+                # y:              Hole Centre y position
+                # d:              Hole diameter
+                # kerf:           Kerf width for cut
+                # leadin_radius:  Radius for the lead in arc
+                # splits[]:       List of length segments. Segments will support different speeds. +ve is left of 12 o'clock
+                #                 -ve is right of 12 o'clock
+                #                 and starting positions of the circle. Including overburn
+                if leadin_radius == 0:
+                    this_hole_leadin_radius = radius-(radius/4)-(kerf_width/2)
+                else:
+                    this_hole_leadin_radius = leadin_radius
+
+                # arc1_distance = circumferance - arc2_distance - arc3_distance - overburn_start_distance_before_zero
+                # arc2_from_zero = arc1_distance + arc2_distance
+                # arc3_from_zero = arc2_from_zero + arc3_distance
+                # overburn_from_zero = arc3_from_zero + overburn_distance - circumferance
+                # overburn_from_zero = arc3_from_zero + overburn_distance
+                line.hole_builder.\
+                    plasma_hole(line, centre_x, centre_y, diameter, \
+                                kerf_width, this_hole_leadin_radius)
+
+                # mark the lead in back to the M3 and the cut up to the M5 as Commands.REMOVE
+                self.remove_leadin()
+                self._remove_until_m5 = True
+            else:
+                line.is_hole = False
+                line.hole_builder = None
+
+    def remove_leadin(self):
+        # walk back from the hole marking the lead in, up to and including
+        # the M3, and then the rapid leading to it as Commands.REMOVE
+        found_m3 = False
+        for prev in reversed(self._pending):
+            # mark for removal any lines until find the M3
+            if prev.token.startswith('M3'):
+                found_m3 = True
+                prev.type = Commands.REMOVE
+            if not found_m3:
+                prev.type = Commands.REMOVE
+            try:
+                if prev.active_g_modal_groups[1] != 'G0' and found_m3:
+                    break
+                elif prev.active_g_modal_groups[1] == 'G0':
+                    prev.type = Commands.REMOVE
+            except KeyError:
+                # access to the dictionary index failed,
+                # so no longer in a g0 mode
+                break
+
+    def flag_pierce(self, line):
+        # Called for each line as it is parsed.
+        if line.command == ('M', 3):
+            # this is a torce start so must be a pierce.
+            line.is_pierce = True
+            line.pierce_builder = PierceBuilder()
+
+            # remove all the stuff up to the M5 using Coammands.REMOVE
+            # Aadd in a wiggle for the pierce
+            self._remove_until_m5 = True
+
+    def header_lines(self):
         # Build Header for parsed file
-        self._parsed.append(CodeLine( '(--------------------------------------------------)', parent=self))
-        self._parsed.append(CodeLine( '(            Plasma G-Code Preprocessor            )', parent=self))
-        self._parsed.append(CodeLine(f'(                 {PREPROC_VERSION}                            )', parent=self))
-        self._parsed.append(CodeLine( '(--------------------------------------------------)', parent=self))
+        yield '(--------------------------------------------------)'
+        yield '(            Plasma G-Code Preprocessor            )'
+        yield f'(                 {PREPROC_VERSION}                            )'
+        yield '(--------------------------------------------------)'
         # Build inputs for scale, tiles, flip, mirror and rotation
-        self._parsed.append(CodeLine( ';inputs', parent=self))
-        self._parsed.append(CodeLine( '#<ucs_x_offset> = [#5221 + [[#5220-1] * 20]]', parent=self))
-        self._parsed.append(CodeLine( '#<ucs_y_offset> = [#5222 + [[#5220-1] * 20]]', parent=self))
-        self._parsed.append(CodeLine( '#<ucs_r_offset> = [#5230 + [[#5220-1] * 20]]', parent=self))
-        self._parsed.append(CodeLine( f'#<array_x_offset> = {hal.get_value("qtpyvcp.column-separation.out")}', parent=self))
-        self._parsed.append(CodeLine( f'#<array_y_offset> = {hal.get_value("qtpyvcp.row-separation.out")}', parent=self))
-        self._parsed.append(CodeLine( f'#<array_columns> = {hal.get_value("qtpyvcp.tile-columns.out")}', parent=self))
-        self._parsed.append(CodeLine( f'#<array_rows> = {hal.get_value("qtpyvcp.tile-rows.out")}', parent=self))
-        self._parsed.append(CodeLine( '#<origin_x_offset> = 0.0', parent=self))
-        self._parsed.append(CodeLine( '#<origin_y_offset> = 0.0', parent=self))
-        self._parsed.append(CodeLine( '#<array_angle> = 0.0', parent=self))
-        self._parsed.append(CodeLine( f'#<blk_scale> = {hal.get_value("qtpyvcp.gcode-scale.out")}', parent=self))
-        self._parsed.append(CodeLine( f'#<shape_angle> = {hal.get_value("qtpyvcp.gcode-rotation.out")}', parent=self))
+        yield ';inputs'
+        yield '#<ucs_x_offset> = [#5221 + [[#5220-1] * 20]]'
+        yield '#<ucs_y_offset> = [#5222 + [[#5220-1] * 20]]'
+        yield '#<ucs_r_offset> = [#5230 + [[#5220-1] * 20]]'
+        yield f'#<array_x_offset> = {hal.get_value("qtpyvcp.column-separation.out")}'
+        yield f'#<array_y_offset> = {hal.get_value("qtpyvcp.row-separation.out")}'
+        yield f'#<array_columns> = {hal.get_value("qtpyvcp.tile-columns.out")}'
+        yield f'#<array_rows> = {hal.get_value("qtpyvcp.tile-rows.out")}'
+        yield '#<origin_x_offset> = 0.0'
+        yield '#<origin_y_offset> = 0.0'
+        yield '#<array_angle> = 0.0'
+        yield f'#<blk_scale> = {hal.get_value("qtpyvcp.gcode-scale.out")}'
+        yield f'#<shape_angle> = {hal.get_value("qtpyvcp.gcode-rotation.out")}'
 
         if hal.get_value("qtpyvcp.gcode-mirror.checked"):
-            self._parsed.append(CodeLine( '#<shape_mirror> = -1', parent=self))
+            yield '#<shape_mirror> = -1'
             self.g2g3_flip = not self.g2g3_flip
         else:
-            self._parsed.append(CodeLine( '#<shape_mirror> = 1', parent=self))
+            yield '#<shape_mirror> = 1'
 
         if hal.get_value("qtpyvcp.gcode-flip.checked"):
-            self._parsed.append(CodeLine( '#<shape_flip> = -1', parent=self))
+            yield '#<shape_flip> = -1'
             self.g2g3_flip = not self.g2g3_flip
         else:
-            self._parsed.append(CodeLine( '#<shape_flip> = 1', parent=self))
-        
-        self._parsed.append(CodeLine( ';calculations', parent=self))
-        self._parsed.append(CodeLine( '#<this_col> = 0', parent=self))
-        self._parsed.append(CodeLine( '#<this_row> = 0', parent=self))
-        self._parsed.append(CodeLine( '#<array_rot> = [#<array_angle> + #<ucs_r_offset>]', parent=self))
-        self._parsed.append(CodeLine( '#<blk_x_offset> = [#<origin_x_offset> + [#<ucs_x_offset> * 1]]', parent=self))
-        self._parsed.append(CodeLine( '#<blk_y_offset> = [#<origin_y_offset> + [#<ucs_y_offset> * 1]]', parent=self))
-        self._parsed.append(CodeLine( '#<x_sin> = [[#<array_x_offset> * #<blk_scale>] * SIN[#<array_rot>]]', parent=self))
-        self._parsed.append(CodeLine( '#<x_cos> = [[#<array_x_offset> * #<blk_scale>] * COS[#<array_rot>]]', parent=self))
-        self._parsed.append(CodeLine( '#<y_sin> = [[#<array_y_offset> * #<blk_scale>] * SIN[#<array_rot>]]', parent=self))
-        self._parsed.append(CodeLine( '#<y_cos> = [[#<array_y_offset> * #<blk_scale>] * COS[#<array_rot>]]', parent=self))
-        self._parsed.append(CodeLine( '', parent=self))
-
-        self._parsed.append(CodeLine( ';main loop', parent=self))
-        self._parsed.append(CodeLine( 'o<loop> while [#<this_row> LT #<array_rows>]', parent=self))
-        self._parsed.append(CodeLine( '#<shape_x_start> = [[#<this_col> * #<x_cos>] - [#<this_row> * #<y_sin>] + #<blk_x_offset>]', parent=self))
-        self._parsed.append(CodeLine( '#<shape_y_start> = [[#<this_row> * #<y_cos>] + [#<this_col> * #<x_sin>] + #<blk_y_offset>]', parent=self))
-        self._parsed.append(CodeLine( '#<blk_angle> = [#<shape_angle> + #<array_rot>]', parent=self))
-        self._parsed.append(CodeLine( 'G10 L2 P0 X#<shape_x_start> Y#<shape_y_start> R#<blk_angle>', parent=self))     
+            yield '#<shape_flip> = 1'
         
+        yield ';calculations'
+        yield '#<this_col> = 0'
+        yield '#<this_row> = 0'
+        yield '#<array_rot> = [#<array_angle> + #<ucs_r_offset>]'
+        yield '#<blk_x_offset> = [#<origin_x_offset> + [#<ucs_x_offset> * 1]]'
+        yield '#<blk_y_offset> = [#<origin_y_offset> + [#<ucs_y_offset> * 1]]'
+        yield '#<x_sin> = [[#<array_x_offset> * #<blk_scale>] * SIN[#<array_rot>]]'
+        yield '#<x_cos> = [[#<array_x_offset> * #<blk_scale>] * COS[#<array_rot>]]'
+        yield '#<y_sin> = [[#<array_y_offset> * #<blk_scale>] * SIN[#<array_rot>]]'
+        yield '#<y_cos> = [[#<array_y_offset> * #<blk_scale>] * COS[#<array_rot>]]'
+        yield ''
+
+        yield ';main loop'
+        yield 'o<loop> while [#<this_row> LT #<array_rows>]'
+        yield '#<shape_x_start> = [[#<this_col> * #<x_cos>] - [#<this_row> * #<y_sin>] + #<blk_x_offset>]'
+        yield '#<shape_y_start> = [[#<this_row> * #<y_cos>] + [#<this_col> * #<x_sin>] + #<blk_y_offset>]'
+        yield '#<blk_angle> = [#<shape_angle> + #<array_rot>]'
+        yield 'G10 L2 P0 X#<shape_x_start> Y#<shape_y_start> R#<blk_angle>'
+
+    def process(self, do_holes=False, do_pierce=False):
+        """Parse, flag and write out the program in a single pass.
+
+        Lines are written to stdout as soon as nothing later in the file can
+        change them, so memory use and run time are linear in the file size.
+        """
+        self._do_pierce = do_pierce
+        self._do_holes = do_holes and not do_pierce
+        if self._do_holes:
+            self.read_hole_settings()
+
+        for header_line in self.header_lines():
+            self.add_line(CodeLine(header_line, parent=self))
+
         # setup any global default modal groups that we need to be aware of
         self.set_active_g_modal('G91.1')
         self.set_active_g_modal('G40')
         # start parsing through the loaded file
-        for line in self._orig_gcode:
-            self._line_num += 1
-            self._line = line.strip()
-            LOG.debug('Parse: Build gcode line.')
-            cline = CodeLine(self._line, parent=self, g2g3flip=self.g2g3_flip)
-            # try:
-            #     gcode = f'{cline.command[0]}{cline.command[1]}'
-            # except Exception as e:
-            #     LOG.info(f'Gcode command parse issue: {e}')
-            #     gcode = ''
-            self.set_active_g_modal(cline.token)
-            cline.save_g_modal_group(self.active_g_modal_grps)
-            self._parsed.append(cline)
+        with open(self._in_code, 'r') as openfile:
+            for line in openfile:
+                self._line_num += 1
+                self._line = line.strip()
+                if TRACE_LINES:
+                    LOG.debug('Parse: Build gcode line.')
+                cline = CodeLine(self._line, parent=self, g2g3flip=self.g2g3_flip)
+                self.set_active_g_modal(cline.token)
+                cline.save_g_modal_group(self.active_g_modal_grps)
+                self.add_line(cline)
+
+        self.write_lines(len(self._pending))
+        sys.stdout.flush()
+
+    def add_line(self, line):
+        # lines following a hole or pierce are dropped up to the next M5
+        if self._remove_until_m5:
+            line.type = Commands.REMOVE
+            if line.token.startswith('M5'):
+                self._remove_until_m5 = False
+
+        if self._do_holes:
+            self.flag_hole(line)
+        elif self._do_pierce:
+            self.flag_pierce(line)
+
+        # remember the last X and Y position while grp 1 was a motion mode
+        if line.active_g_modal_groups.get(1) in ('G0', 'G1', 'G2', 'G3'):
+            if 'X' in line.params:
+                self._last_x = line.params['X']
+            if 'Y' in line.params:
+                self._last_y = line.params['Y']
+
+        self._pending.append(line)
+        self.release_lines()
+
+    def release_lines(self):
+        # Write out the pending lines that no later hole can change.
+        # A hole removes lines back to the closest M3 before it and then the
+        # G0 lines before that M3, stopping at the first line not in G0.
+        # So once an M3 has been seen, everything before the first non G0
+        # line at or ahead of it is final.
+        if not self._do_holes:
+            self.write_lines(len(self._pending))
+            return
+
+        if not self._pending[-1].token.startswith('M3'):
+            return
+
+        keep = 0
+        for prev in reversed(self._pending):
+            keep += 1
+            if prev.active_g_modal_groups.get(1) != 'G0':
+                break
+        self.write_lines(len(self._pending) - keep)
+
+    def write_lines(self, count):
+        for _ in range(count):
+            self.write_line(self._pending.popleft())
 
     def dump_raw(self):
         LOG.debug('Dump raw gcode to stdio')
-        for line in self._orig_gcode:
-            print(line, file=sys.stdout, end="")
-            sys.stdout.flush()
-            
+        with open(self._in_code, 'r') as openfile:
+            shutil.copyfileobj(openfile, sys.stdout)
+        sys.stdout.flush()
 
-    def dump_parsed(self):
-        LOG.debug('Dump parsed gcode to stdio')
-        for line in self._parsed:
-            #print(f'{l.type}\t\t -- {l.command} \
-            #    {l.params} {l.comment}')
-            # build up line to go to stdout
-            if line.is_hole:
-                print('(---- Smart Hole Start ----)')
-                line.hole_builder.generate_hole_gcode()
-                print('(---- Smart Hole End ----)')
-                print()
-                continue
-            if line.is_pierce:
-                print('(---- Pierce ----)')
-                line.pierce_builder.generate_pierce_gcode(line)
-                continue
-            if line.type in [Commands.COMMENT, Commands.MAGIC_MATERIAL]:
-                out = line.comment
-                if out == ';end post-amble':
-                    out += """
+    def write_line(self, line):
+        # build up line to go to stdout
+        if line.is_hole:
+            print('(---- Smart Hole Start ----)')
+            line.hole_builder.generate_hole_gcode()
+            print('(---- Smart Hole End ----)')
+            print()
+            return
+        if line.is_pierce:
+            print('(---- Pierce ----)')
+            line.pierce_builder.generate_pierce_gcode(line)
+            return
+        if line.type in [Commands.COMMENT, Commands.MAGIC_MATERIAL]:
+            out = line.comment
+            if out == ';end post-amble':
+                out += """
                     
 #<this_col> = [#<this_col> + 1]
 o<count> if [#<this_col> EQ #<array_columns>]
@@ -1745,47 +1729,46 @@ o<loop> endwhile
 
 G10 L2 P0 X[#<ucs_x_offset> * 1] Y[#<ucs_y_offset> * 1] R#<ucs_r_offset>
                     """
-            elif line.type is Commands.OTHER:
-                # Other at the moment means not recognised
-                out = "; >>  "+line.raw
-            elif line.type in [Commands.PASSTHROUGH, Commands.RAW]:
-                out = line.raw
-            elif line.type is Commands.REMOVE:
-                # skip line as not to be used
+        elif line.type is Commands.OTHER:
+            # Other at the moment means not recognised
+            out = "; >>  "+line.raw
+        elif line.type in [Commands.PASSTHROUGH, Commands.RAW]:
+            out = line.raw
+        elif line.type is Commands.REMOVE:
+            # skip line as not to be used
+            out = ''
+            return
+        else:
+            try:
+                out = f"{line.command[0]}{line.command[1]}"
+            except Exception as e:
+                LOG.info(f'Gcode parse issue: {e}')
                 out = ''
-                continue
-            else:
-                try:
-                    out = f"{line.command[0]}{line.command[1]}"
-                except Exception as e:
-                    LOG.info(f'Gcode parse issue: {e}')
-                    out = ''
-                try:
-                    for p in line.params:
-                        vars = ''
-                        if p == 'X':
-                            vars = '#<blk_scale>*#<shape_mirror>'
-                        elif p == 'Y':
-                            vars = '#<blk_scale>*#<shape_flip>'
-                        elif p == 'I':
-                            vars = '#<blk_scale>*#<shape_mirror>'
-                        elif p == 'J':
-                            vars = '#<blk_scale>*#<shape_flip>'
-                        if isinstance(line.params[p], float):
-                            if line.params[p] < 0.001:
-                                out += f' {p}[{line.params[p]:.6f}*{vars}]'
-                            else:
-                                out += f' {p}[{line.params[p]:.3f}*{vars}]'
+            try:
+                for p in line.params:
+                    vars = ''
+                    if p == 'X':
+                        vars = '#<blk_scale>*#<shape_mirror>'
+                    elif p == 'Y':
+                        vars = '#<blk_scale>*#<shape_flip>'
+                    elif p == 'I':
+                        vars = '#<blk_scale>*#<shape_mirror>'
+                    elif p == 'J':
+                        vars = '#<blk_scale>*#<shape_flip>'
+                    if isinstance(line.params[p], float):
+                        if line.params[p] < 0.001:
+                            out += f' {p}[{line.params[p]:.6f}*{vars}]'
                         else:
-                            out += f' {p}{line.params[p]}'
-                    out += f' {line.comment}'
-                    out = out.strip()
-                except Exception as e:
-                    LOG.info(f'GCode parse issue: {e}')
-                    out = ''
-            #LOG.debug(f"Dump line >>> {out}")
-            print(out, file=sys.stdout)
-            sys.stdout.flush()
+                            out += f' {p}[{line.params[p]:.3f}*{vars}]'
+                    else:
+                        out += f' {p}{line.params[p]}'
+                out += f' {line.comment}'
+                out = out.strip()
+            except Exception as e:
+                LOG.info(f'GCode parse issue: {e}')
+                out = ''
+        #LOG.debug(f"Dump line >>> {out}")
+        print(out, file=sys.stdout)
 
     def set_ui_hal_cutchart_pin(self):
         if self.active_cutchart is not None and self.active_cutchart != 99999:
@@ -1860,6 +1843,45 @@ G10 L2 P0 X[#<ucs_x_offset> * 1] Y[#<ucs_y_offset> * 1] R#<ucs_r_offset>
             LOG.debug('No active cutchart')
 
 
+def open_plasma_db(cfg_dic):
+    """Connect to the live plasma process DB."""
+    # SQLAlchemy is slow to import so only pull it in when the DB is used
+    from qtpyvcp.plugins.plasma_processes import PlasmaProcesses
+
+    # we assume that things are sqlite unless we find custom_config.yml
+    # pointing to different type of DB
+    try:
+        db_connect_str = cfg_dic['data_plugins']['plasmaprocesses']['kwargs']['connect_string']
+        # if no error then we found a db connection string. Use it.
+        db = PlasmaProcesses(connect_string=db_connect_str)
+        LOG.debug(f'Connected to NON SQLite DB: {db_connect_str}')
+    except Exception as e:
+        # no connect string found OR can't connect so assume sqlite on local machine
+        LOG.debug(f'Connection issue to SQL DB: {e}')
+        db = PlasmaProcesses(db_type='sqlite')
+        LOG.debug('Connected to SQLite DB')
+    return db
+
+
+def load_plasma_snapshot(cfg_dic):
+    """Load the cut chart snapshot of the local SQLite DB, None if not usable."""
+    try:
+        cfg_dic['data_plugins']['plasmaprocesses']['kwargs']['connect_string']
+        LOG.debug('Non SQLite DB configured, snapshot not used')
+        return None
+    except Exception:
+        pass
+
+    # same filters as the PlasmaProcesses plugin
+    linear_units = INI.find('TRAJ', 'LINEAR_UNITS') or INI.find('AXIS_X', 'UNITS')
+    measurement = 'mm' if linear_units in ('mm', 'metric') else 'inch'
+    db_file = normalizePath(path='plasma_table.db', base=os.getenv('CONFIG_DIR', './'))
+    return load_snapshot(db_file,
+                         machine=INI.find('PLASMAC', 'MACHINE'),
+                         pressure=INI.find('PLASMAC', 'PRESSURE'),
+                         measurement=measurement)
+
+
 def main():
     global PLASMADB
 
@@ -1879,28 +1901,20 @@ def main():
     custom_config_yaml_file_name = normalizePath(path='custom_config.yml', base=os.getenv('CONFIG_DIR', '~/'))
     cfg_dic = load_config_files(custom_config_yaml_file_name)
     LOG.debug(f'Log custom config yaml file: {custom_config_yaml_file_name}')
-    
-    # we assume that things are sqlite unless we find custom_config.yml
-    # pointing to different type of DB
-    try:
-        db_connect_str = cfg_dic['data_plugins']['plasmaprocesses']['kwargs']['connect_string']
-        # if no error then we found a db connection string. Use it.
-        PLASMADB = PlasmaProcesses(connect_string=db_connect_str)
-        LOG.debug(f'Connected to NON SQLite DB: {db_connect_str}')
-    except Exception as e:
-        # no connect string found OR can't connect so assume sqlite on local machine
-        LOG.debug(f'Connection issue to SQL DB: {e}')
-        PLASMADB = PlasmaProcesses(db_type='sqlite')
-        LOG.debug('Connected to SQLite DB')
+
+    # cut chart lookups come from the snapshot exported by the PlasmaProcesses
+    # plugin when it is current, otherwise from the DB
+    PLASMADB = load_plasma_snapshot(cfg_dic)
+    if PLASMADB is not None:
+        LOG.debug('Using cut chart snapshot')
+    else:
+        PLASMADB = open_plasma_db(cfg_dic)
+        # refresh the snapshot so the next run can use it
+        PLASMADB.export_snapshot()
 
     # Start cycling through each line of the file and processing it
     LOG.debug('Build preprocessor object and process gcode')
     p = PreProcessor(inCode)
-    if not p.preparsed:
-        p.parse()
-        LOG.debug('Parsing done.')
-    else:
-        LOG.debug('File is Preparsed.')
 
     if not p.preparsed:
         # Holes flag
@@ -1916,23 +1930,21 @@ def main():
         except Exception as e:
             LOG.debug(f'Hal pin query issue: {e}')
             do_pierce = False
-        
-        if do_holes and not do_pierce:
-            LOG.debug('Flag holes ...')
-            p.flag_holes()
-            LOG.debug('... Flag holes done')
-        elif do_pierce:
-            LOG.debug('Flag piercing ...')
-            p.flag_pierce()
-            LOG.debug('... Flag piercing done')
-    
-        # pass file to stdio and set any hal pins
-        LOG.debug('Dump parsed file')
-        p.dump_parsed()
+
+        # parse, flag holes or piercing and pass file to stdio in one pass
+        LOG.debug(f'Process file, holes={do_holes} pierce={do_pierce} ...')
+        p.process(do_holes=do_holes, do_pierce=do_pierce)
+        LOG.debug('... Processing done.')
+
+        # the magic tool is written back to the DB, the snapshot is read only
+        if p.active_cutchart == 99999 and isinstance(PLASMADB, CutChartSnapshot):
+            PLASMADB = open_plasma_db(cfg_dic)
+
         # Set hal pin on UI for cutchart.id
         LOG.debug('Set UI param data via cutchart pin')
         p.set_ui_hal_cutchart_pin()
     else:
+        LOG.debug('File is Preparsed.')
         p.dump_raw()
     
     # Close out DB
@@ -0,0 +1,160 @@
+"""
+Command Dispatcher
+------------------
+
+Runs LinuxCNC commands on a worker thread so the GUI never blocks on
+``linuxcnc.command.wait_complete()``.
+
+The worker owns its own ``linuxcnc.command`` channel and executes queued
+commands strictly in order, so a mode change queued before an MDI command
+is always complete before the MDI command is sent. Each submitted command
+returns a :class:`concurrent.futures.Future`, and an optional callback is
+called on the GUI thread once the command has finished.
+
+Commands that must take effect immediately, like abort, should be sent
+directly and pending commands dropped with :meth:`CommandDispatcher.cancelPending`.
+
+Example::
+
+    from qtpyvcp.utilities.command_dispatcher import CommandDispatcher
+    DISPATCHER = CommandDispatcher()
+
+    DISPATCHER.submit('mode', linuxcnc.MODE_MDI, wait=True)
+    DISPATCHER.submit('mdi', 'G0 X0', callback=lambda f: print(f.result()))
+"""
+
+import queue
+import threading
+
+from concurrent.futures import Future
+
+import linuxcnc
+
+from qtpy.QtCore import QObject, Signal
+
+from qtpyvcp.utilities import logger
+
+LOG = logger.getLogger(__name__)
+
+
+class CommandDispatcher(object):
+    """Ensures only one command dispatcher exists per python interpreter.
+    """
+    _instance = None
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = _CommandDispatcher(*args, **kwargs)
+        return cls._instance
+
+
+class _CommandDispatcher(QObject):
+    """Ordered, non-blocking LinuxCNC command dispatcher.
+
+    Args:
+        timeout (float) : Default ``wait_complete`` timeout in seconds.
+    """
+
+    # emitted on the GUI thread with the future of each finished command
+    commandFinished = Signal(object)
+
+    _finished = Signal(object, object)
+
+    def __init__(self, timeout=5.0):
+        super(_CommandDispatcher, self).__init__()
+
+        self.timeout = timeout
+
+        self._queue = queue.Queue()
+        self._finished.connect(self._onFinished)
+
+        self._thread = threading.Thread(target=self._run,
+                                        name='CommandDispatcher',
+                                        daemon=True)
+        self._thread.start()
+
+    def submit(self, command, *args, wait=False, timeout=None, callback=None):
+        """Queue a ``linuxcnc.command`` method call.
+
+        Args:
+            command (str) : Name of the command method, e.g. 'mode' or 'mdi'.
+            *args : Arguments for the command.
+            wait (bool) : Call ``wait_complete`` after the command. The result
+                of the future is then the ``wait_complete`` return value.
+            timeout (float) : ``wait_complete`` timeout, default from the
+                dispatcher.
+            callback (callable) : Called with the future on the GUI thread
+                once the command has finished.
+
+        Returns:
+            Future : Completes once the command has been sent (and waited for).
+        """
+        if timeout is None:
+            timeout = self.timeout
+
+        def run(cmd):
+            result = getattr(cmd, command)(*args)
+            if wait:
+                result = cmd.wait_complete(timeout)
+            return result
+
+        run.__name__ = command
+        return self.call(run, callback=callback)
+
+    def call(self, func, callback=None):
+        """Queue `func(cmd)` to run on the worker with its command channel.
+
+        Use for sequences that need to run back to back without other
+        queued commands in between.
+
+        Returns:
+            Future : Holds the return value of `func`.
+        """
+        future = Future()
+        self._queue.put((future, func, callback))
+        return future
+
+    def cancelPending(self):
+        """Cancel all commands that have not been started yet.
+
+        Returns:
+            int : Number of cancelled commands.
+        """
+        count = 0
+        while True:
+            try:
+                future, func, callback = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if future.cancel():
+                count += 1
+                self._finished.emit(future, callback)
+        if count:
+            LOG.debug("Cancelled %i pending commands", count)
+        return count
+
+    def pending(self):
+        """Approximate number of commands waiting to be run."""
+        return self._queue.qsize()
+
+    def _run(self):
+        cmd = None
+        while True:
+            future, func, callback = self._queue.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                if cmd is None:
+                    cmd = linuxcnc.command()
+                future.set_result(func(cmd))
+            except Exception as e:
+                LOG.exception("Error running command: %s", func.__name__)
+                future.set_exception(e)
+            self._finished.emit(future, callback)
+
+    def _onFinished(self, future, callback):
+        if callback is not None:
+            try:
+                callback(future)
+            except Exception:
+                LOG.exception("Error in command callback")
+        self.commandFinished.emit(future)
@@ -1,21 +1,38 @@
+"""
+Config Loader
+-------------
+
+Loads and merges the YAML config files.
+
+Each file is rendered as a Jinja2 template and the results are merged with
+hiyapyco. The merged config is cached in ``$XDG_CACHE_HOME/qtpyvcp/config``
+(``~/.cache/qtpyvcp/config``) together with the content hash of every file
+it was built from (the YAML files, any templates they include and the INI
+file) and the value of every environment variable the templates read. While
+none of these change the cached config is used and neither Jinja2 nor
+hiyapyco are imported. Set ``QTPYVCP_CONFIG_CACHE=0`` to disable the cache.
+"""
+
 import os
 import sys
+import pickle
+import hashlib
 
-import hiyapyco
-
-from jinja2.nativetypes import NativeEnvironment
-from jinja2 import Environment, FileSystemLoader, Undefined, make_logging_undefined
+from collections.abc import Mapping
 
 from qtpyvcp.utilities.logger import getLogger, logLevelFromName
 from qtpyvcp.utilities.yaml_filters import INIFilterModule
 
 LOG = getLogger(__name__)
 
-hiyapyco_logger = getLogger('qtpyvcp.config_loader.hiyapyco')
-hiyapyco_logger.setLevel(os.getenv('HIYAPYCO_LOG_LEVEL', 'ERROR'))
-hiyapyco.logger = hiyapyco_logger
+# bump to invalidate all cached configs
+CACHE_VERSION = 1
+
+CACHE_DIR = os.path.join(os.getenv('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'),
+                         'qtpyvcp', 'config')
+
+CACHE_ENABLED = os.getenv('QTPYVCP_CONFIG_CACHE', '1').lower() not in ('0', 'false', 'no', 'off')
 
-LogUndefined = make_logging_undefined(logger=LOG, base=Undefined)
 
 def load_config_files(*files):
     """Load and merge YAML config files.
@@ -41,7 +58,36 @@ def load_config_files(*files):
     # hiyapyco merges in order least important to most important
     files.reverse()
 
-    expanded_files = process_templates(files)
+    cache_file = _cacheFile(files)
+    if CACHE_ENABLED:
+        cfg_dict = _loadCachedConfig(cache_file)
+        if cfg_dict is not None:
+            LOG.debug("Loaded merged config from cache: %s", cache_file)
+            return cfg_dict
+
+    dependencies = Dependencies()
+    for file in files:
+        dependencies.addFile(file)
+    cfg_dict = _merge_config_files(files, dependencies)
+
+    if CACHE_ENABLED:
+        _writeCachedConfig(cache_file, dependencies, cfg_dict)
+
+    return cfg_dict
+
+
+def _merge_config_files(files, dependencies=None):
+    import hiyapyco
+    from jinja2 import Undefined, make_logging_undefined
+    from jinja2.nativetypes import NativeEnvironment
+
+    hiyapyco_logger = getLogger('qtpyvcp.config_loader.hiyapyco')
+    hiyapyco_logger.setLevel(os.getenv('HIYAPYCO_LOG_LEVEL', 'ERROR'))
+    hiyapyco.logger = hiyapyco_logger
+
+    LogUndefined = make_logging_undefined(logger=LOG, base=Undefined)
+
+    expanded_files = process_templates(files, dependencies)
 
     hiyapyco.jinja2env = NativeEnvironment(variable_start_string='(',
                                            variable_end_string=')',
@@ -62,8 +108,20 @@ def load_config_files(*files):
     return cfg_dict
 
 
-def process_templates(files):
-    env = Environment(loader=FileSystemLoader(searchpath=[os.path.dirname(config_file) for config_file in files]),
+def process_templates(files, dependencies=None):
+    from jinja2 import Environment, FileSystemLoader, Undefined
+
+    if dependencies is None:
+        dependencies = Dependencies()
+
+    class RecordingLoader(FileSystemLoader):
+        # record included templates as well as the config files
+        def get_source(self, environment, template):
+            source, filename, uptodate = super().get_source(environment, template)
+            dependencies.addFile(filename)
+            return source, filename, uptodate
+
+    env = Environment(loader=RecordingLoader(searchpath=[os.path.dirname(config_file) for config_file in files]),
                       undefined=Undefined)
     
     filter_module = INIFilterModule()
@@ -86,7 +144,7 @@ def process_templates(files):
 
                         
             result = template.render({'file': {'path': config_file, 'dir': file_dir, 'name': file_name},
-                                      'env': os.environ,
+                                      'env': dependencies.environ,
                                       'ini': ini_data})
             
 
@@ -95,6 +153,123 @@ def process_templates(files):
     return expanded_templates
 
 
+class Dependencies(object):
+    """Files and environment variables a merged config was built from."""
+
+    def __init__(self):
+        self.files = {}
+        self.env = {}
+        self.cacheable = True
+        self.environ = _RecordingEnviron(self)
+
+        # the from-ini filter reads the INI file named by INI_FILE_NAME
+        ini_file = self.environ.get('INI_FILE_NAME')
+        if ini_file:
+            self.addFile(ini_file)
+
+    def addFile(self, path):
+        path = os.path.realpath(path)
+        if path not in self.files:
+            self.files[path] = _fileHash(path)
+
+    def isCurrent(self):
+        """Whether all files and environment variables are unchanged."""
+        for name, value in self.env.items():
+            if os.environ.get(name) != value:
+                return False
+        for path, file_hash in self.files.items():
+            if _fileHash(path) != file_hash:
+                return False
+        return True
+
+    def __getstate__(self):
+        return {'files': self.files, 'env': self.env}
+
+    def __setstate__(self, state):
+        self.files = state['files']
+        self.env = state['env']
+        self.cacheable = True
+        self.environ = _RecordingEnviron(self)
+
+
+class _RecordingEnviron(Mapping):
+    """``os.environ`` for templates, records which variables are read."""
+
+    def __init__(self, dependencies):
+        self._dependencies = dependencies
+
+    def __getitem__(self, name):
+        value = os.environ.get(name)
+        self._dependencies.env[name] = value
+        if value is None:
+            raise KeyError(name)
+        return value
+
+    def __iter__(self):
+        # depends on the whole environment
+        self._dependencies.cacheable = False
+        return iter(os.environ)
+
+    def __len__(self):
+        self._dependencies.cacheable = False
+        return len(os.environ)
+
+
+def _fileHash(path):
+    try:
+        with open(path, 'rb') as fh:
+            return hashlib.sha1(fh.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def _cacheFile(files):
+    key = hashlib.sha1()
+    key.update('{}:{}'.format(CACHE_VERSION, sys.version).encode())
+    for file in files:
+        key.update(os.path.realpath(file).encode() + b'\0')
+    return os.path.join(CACHE_DIR, key.hexdigest()[:16] + '.pickle')
+
+
+def _loadCachedConfig(cache_file):
+    try:
+        with open(cache_file, 'rb') as fh:
+            data = pickle.load(fh)
+    except Exception:
+        return None
+
+    if data.get('version') != CACHE_VERSION:
+        return None
+    if not data['dependencies'].isCurrent():
+        return None
+
+    return data['config']
+
+
+def _writeCachedConfig(cache_file, dependencies, cfg_dict):
+    if not dependencies.cacheable:
+        LOG.debug("Not caching config, the templates depend on the whole environment")
+        return
+
+    data = {'version': CACHE_VERSION,
+            'dependencies': dependencies,
+            'config': cfg_dict}
+
+    tmp_file = '{}.{}.tmp'.format(cache_file, os.getpid())
+    try:
+        if not os.path.isdir(CACHE_DIR):
+            os.makedirs(CACHE_DIR)
+        with open(tmp_file, 'wb') as fh:
+            pickle.dump(data, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+    except Exception:
+        LOG.debug("Could not write config cache: %s", cache_file, exc_info=True)
+        try:
+            os.remove(tmp_file)
+        except OSError:
+            pass
+
+
 def load_config_files_from_env():
     files = os.getenv('VCP_CONFIG_FILES', '').split(':')
     return load_config_files(*files)
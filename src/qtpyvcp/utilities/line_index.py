@@ -0,0 +1,125 @@
+"""
+Line Index
+----------
+
+Random access to the lines of a large text file without reading it all.
+
+The file is memory mapped and a sparse index holds the byte offset of every
+``STRIDE``-th line, so any line is found by a checkpoint lookup and a scan
+over at most ``STRIDE`` lines. The index for a 5M line program is a few
+hundred KB, and only the pages that are actually read stay resident.
+
+Example::
+
+    index = LineIndex('/path/to/big_program.ngc')
+    print(index.line_count)
+    text = index.lines(100000, 200)  # 200 lines starting at line 100001
+    index.close()
+"""
+
+import os
+import re
+import mmap
+
+from array import array
+
+from qtpyvcp.utilities.encode_utils import allEncodings
+
+# lines between index checkpoints
+STRIDE = 64
+
+# bytes looked at to detect the file encoding
+DETECT_SIZE = 1024 * 1024
+
+
+class LineIndex(object):
+    """Sparse line offset index over a memory mapped file.
+
+    Args:
+        fname (str) : Path of the file to index.
+        encoding (str, optional) : File encoding, detected if not given.
+    """
+    def __init__(self, fname, encoding=None):
+        self.fname = fname
+
+        self._fh = open(fname, 'rb')
+        stat = os.fstat(self._fh.fileno())
+        self.size = stat.st_size
+        self._mtime = stat.st_mtime_ns
+
+        if self.size:
+            self._data = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._data = b''
+
+        self.encoding = encoding or self._detectEncoding()
+
+        # byte offset of line 0, STRIDE, 2 * STRIDE, ...
+        self._checkpoints = array('Q', [0])
+        stride_re = re.compile(rb'(?:[^\n]*\n){%d}' % STRIDE)
+        for match in stride_re.finditer(self._data):
+            self._checkpoints.append(match.end())
+
+        # the last checkpoint is at the end if the file ends on a stride
+        if self._checkpoints[-1] >= self.size and len(self._checkpoints) > 1:
+            self._checkpoints.pop()
+
+        # less than STRIDE lines after the last checkpoint
+        tail = self._data[self._checkpoints[-1]:]
+        tail_lines = tail.count(b'\n')
+        if tail and not tail.endswith(b'\n'):
+            # last line has no line end
+            tail_lines += 1
+
+        self.line_count = (len(self._checkpoints) - 1) * STRIDE + tail_lines
+
+    def _detectEncoding(self):
+        sample = self._data[:DETECT_SIZE]
+        if len(sample) < self.size:
+            # don't split a multi byte character
+            sample = sample[:sample.rfind(b'\n') + 1] or sample
+
+        for enc in allEncodings():
+            try:
+                sample.decode(enc)
+                return enc
+            except (UnicodeDecodeError, LookupError):
+                continue
+        return 'utf-8'
+
+    def offset(self, line):
+        """Byte offset of the start of `line` (0 based)."""
+        if line <= 0:
+            return 0
+        if line >= self.line_count:
+            return self.size
+
+        checkpoint, remaining = divmod(line, STRIDE)
+        pos = self._checkpoints[checkpoint]
+        data = self._data
+        for _ in range(remaining):
+            pos = data.find(b'\n', pos) + 1
+        return pos
+
+    def lines(self, first, count):
+        """Text of `count` lines starting at `first` (0 based)."""
+        start = self.offset(first)
+        end = self.offset(first + count)
+        return self._data[start:end].decode(self.encoding, errors='replace')
+
+    def changed(self):
+        """Whether the file was modified in place since it was indexed.
+
+        Reading a mapped file that has been truncated is fatal, so check this
+        before reading lines from a file that may be rewritten.
+        """
+        try:
+            stat = os.fstat(self._fh.fileno())
+        except (OSError, ValueError):
+            return True
+        return stat.st_size != self.size or stat.st_mtime_ns != self._mtime
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._fh.close()
@@ -18,7 +18,7 @@
 #   You should have received a copy of the GNU General Public License
 #   along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-import linuxcnc, time, threading, subprocess, os, json
+import linuxcnc, hal, subprocess
 from qtpy.QtCore import QObject, QTimer, Signal
 
 # Setup logging
@@ -191,6 +191,55 @@ class Status(QObject):
 # HAL Status Monitor
 #==============================================================================
 
+# halcmd names of the hal module pin types and directions
+HAL_TYPES = {hal.HAL_BIT: 'bit', hal.HAL_FLOAT: 'float', hal.HAL_S32: 's32', hal.HAL_U32: 'u32'}
+HAL_DIRECTIONS = {hal.HAL_IN: 'IN', hal.HAL_OUT: 'OUT', hal.HAL_IO: 'I/O'}
+
+
+def halPinInfo():
+    """Get the type, direction and value of all HAL pins.
+
+    Read from HAL shared memory through the hal module, or from a single
+    ``halcmd show pin`` if that is not possible, e.g. when this process has
+    not created a HAL component yet.
+
+    Returns:
+        dict : (type, direction, value) tuples by pin name.
+    """
+    try:
+        return {pin['NAME']: (HAL_TYPES.get(pin['TYPE']),
+                              HAL_DIRECTIONS.get(pin['DIRECTION']),
+                              pin['VALUE']) for pin in hal.get_info_pins()}
+    except (AttributeError, RuntimeError, KeyError, TypeError) as e:
+        log.debug("Could not read HAL pins from shared memory: {}".format(e))
+
+    info = {}
+    raw = subprocess.check_output(['halcmd', '-s', 'show', 'pin']).decode()
+    for line in raw.splitlines():
+        fields = line.split()
+        if len(fields) >= 5:
+            info[fields[4]] = (fields[1], fields[2], fields[3])
+    return info
+
+
+def halPinValue(pin_name):
+    """Get the value of a HAL pin, from shared memory if possible."""
+    try:
+        return hal.get_value(pin_name)
+    except (AttributeError, RuntimeError):
+        pass
+    return subprocess.check_output(['halcmd', '-s', 'getp', pin_name]).decode().strip()
+
+
+def halSetPin(pin_name, value):
+    """Set the value of an unconnected HAL pin, returns 0 on success."""
+    try:
+        hal.set_p(pin_name, str(value))
+        return 0
+    except (AttributeError, RuntimeError):
+        pass
+    return subprocess.call(['halcmd', 'setp', pin_name, str(value)])
+
 class HALPin(QObject):
     """HALPin object, represents a single LinuxCNC HAL pin, enables reading.
         writing and connecting slots to be called when the HAL pin value changes.
@@ -221,7 +270,7 @@ class HALPin(QObject):
         type_map = {'float': float, 's32': int, 'u32': int, 'bit': bool}
         self.type = type_map.get(pin_type)
         self.settable = pin_direction in ['IN', 'I/O']
-        self.value = self.type(pin_value)
+        self.value = self.convertType(pin_value)
 
         self.log_change = False
 
@@ -257,12 +306,11 @@ class HALPin(QObject):
             self.valueChanged[self.type].disconnect()
 
     def getValue(self):
-        data = subprocess.check_output(['halcmd', '-s', 'show', 'pin', self.pin_name]).split()
-        return self.convertType(data[3])
+        return self.convertType(halPinValue(self.pin_name))
 
     def setValue(self, value):
         if self.settable:
-            return subprocess.call(['halcmd', 'setp', self.pin_name, str(value)])
+            return halSetPin(self.pin_name, value)
         raise TypeError("setValue failed, HAL pin '{}' is read only".format(self.pin_name))
 
     def getSettable(self):
@@ -279,113 +327,72 @@ class HALPin(QObject):
         return self.log_change
 
     def convertType(self, value):
-        if self.type == bool:
-            return value.lower() in ['true', '1']
+        # values from halcmd are strings, from the hal module python types
+        if isinstance(value, str):
+            if self.type == bool:
+                return value.lower() in ['true', '1']
+            if self.type == int:
+                # u32 values are shown in hex
+                return int(value, 0)
         return self.type(value)
 
 
 class HALPoller(QObject):
-    """docstring for StatusPoller"""
+    """Polls the values of the HAL pins in use.
+
+    Only the pins requested with `getHALPin` are read, straight from HAL
+    shared memory through the hal module, so nothing is forked per cycle.
+    Pin types and directions are looked up in one cached snapshot of all pins.
+    """
     def __init__(self):
         super(HALPoller, self).__init__()
 
         self.cycle_time = 50
-        self.linuxcnc_is_alive = False
 
         self.status_items = {}
-        self.pin_dict = {}
-        self.sig_dict = {}
-
-        # Create a thread for checking the HAL pins and sigs
-        self.hal_mutex = threading.Lock()
-        self.hal_thread = threading.Thread(target=self.hal_poll_thread)
-        self.hal_thread.daemon = True
-        self.hal_thread.start()
-
-
-    # halcmd can take 200ms or more to run, so run poll updates in a thread so as not to slow the server
-    # requests for hal pins and sigs will read the results from the most recent update
-    def hal_poll_thread(self):
-
-        while True:
-            # s = time.time()
-
-            # first, check if linuxcnc is running at all
-            if not os.path.isfile( '/tmp/linuxcnc.lock' ):
-                self.hal_mutex.acquire()
-                try:
-                    if self.linuxcnc_is_alive:
-                        log.debug("LinuxCNC has stopped.")
-                    self.linuxcnc_is_alive = False
-                    self.pin_dict = {}
-                    self.sig_dict = {}
-                finally:
-                    self.hal_mutex.release()
-                time.sleep(self.cycle_time/1000.0)
-                continue
-            else:
-                if not self.linuxcnc_is_alive:
-                    log.debug("LinuxCNC has started.")
-                self.linuxcnc_is_alive = True
-
-            self.p = subprocess.Popen( ['halcmd', '-s', 'show', 'pin'] , stderr=subprocess.PIPE, stdout=subprocess.PIPE )
-            rawtuple = self.p.communicate()
-            if len(rawtuple[0]) <= 0:
-                time.sleep(self.cycle_time/1000.0)
-                continue
-            raw = rawtuple[0].split('\n')
+        self._pin_info = None
+        self._read_errors = set()
 
-            pins = [ [a for a in [x.strip() for x in line.split(' ')] if a != ''] for line in raw ]
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self._poll)
+        self.timer.start(self.cycle_time)
 
-            # UPDATE THE DICTIONARY OF PIN INFO
-            # Acquire the mutex so we don't step on other threads
-            self.hal_mutex.acquire()
+    def _poll(self):
+        for pin_name, status_item in list(self.status_items.items()):
             try:
-                pin_dict = {}
-                sig_dict = {}
-
-                for p in pins:
-                    if len(p) > 5:
-                        # if there is a signal listed on this pin, make sure
-                        # that signal is in our signal dictionary
-                        sig_dict[ p[6] ] = p[3]
-                    if len(p) >= 5:
-                        pin_dict[ p[4] ] = p[3]
-            finally:
-                self.hal_mutex.release()
-
-            changed_items = set(pin_dict.items()) - set(self.pin_dict.items())
-            # for item in changed_items:
-            #     print('HAL pin Changed: {} => {}'.format(item[0], item[1]))
-
-            self.pin_dict = pin_dict
-            self.sig_dict = sig_dict
+                value = status_item.convertType(hal.get_value(pin_name))
+            except Exception as e:
+                # HAL is not up yet, LinuxCNC has stopped or the pin is gone
+                if pin_name not in self._read_errors:
+                    self._read_errors.add(pin_name)
+                    log.warning("Could not read HAL pin {}: {}".format(pin_name, e))
+                continue
 
-            for changed_item in changed_items:
-                if changed_item[0] in self.status_items:
-                    self.status_items[changed_item[0]].update(changed_item[1])
+            self._read_errors.discard(pin_name)
+            if value != status_item.value:
+                status_item.update(value)
 
-            # print(time.time() - s)
-            # print(json.dumps(pin_dict, indent=4, sort_keys=True))
+    def getPinInfo(self, pin_name):
+        """Get the type, direction and value of a HAL pin.
 
-            # before starting the next check, sleep a little so we don't use all the CPU
-            time.sleep(self.cycle_time/1000.0)
+        Returns:
+            tuple : (type, direction, value), or None if there is no such pin.
+        """
+        if self._pin_info is None or pin_name not in self._pin_info:
+            # the pin may have been created since the snapshot was taken
+            self._pin_info = halPinInfo()
+        return self._pin_info.get(pin_name)
 
     def getHALPin(self, pin_name):
         si = self.status_items.get(pin_name)
         if si is None:
-            raw = subprocess.check_output(['halcmd', '-s', 'show', 'pin', pin_name]).strip()
-            if len(raw.split('\n')) > 1: # more than one pin name matches
-                raise ValueError("HAL pin red<{}> does not exist".format(pin_name))
-            pin_data = raw.split()
-            if len(pin_data) == 0: # no pin names match
+            pin_info = self.getPinInfo(pin_name)
+            if pin_info is None:
+                matches = [name for name in self._pin_info if name.startswith(pin_name)]
+                if len(matches) == 1: # name is not complete, but only one pin could match
+                    raise ValueError("HAL pin red<{}> does not exist, did you mean green<{}>?".format(pin_name, matches[0]))
                 raise ValueError("HAL pin red<{}> does not exist".format(pin_name))
-                return
-            if pin_name != pin_data[4]: # name is not complete, but only one pin could match
-                raise ValueError("HAL pin red<{}> does not exist, did you mean green<{}>?".format(pin_name, pin_data[4]))
-            pin_type = pin_data[1].strip()
-            pin_direction = pin_data[2].strip()
-            pin_value = pin_data[3].strip()
+            pin_type, pin_direction, pin_value = pin_info
             log.debug("Adding new HALStatusItem for pin '{}'".format(pin_name))
             si = HALPin(pin_name, pin_type, pin_direction, pin_value)
             self.status_items[pin_name] = si
@@ -35,6 +35,8 @@ Application Options:
   --qt-api (pyqt5 | pyqt | pyside2 | pyside)
                        Specify the Qt Python binding to use.
   --perfmon            Monitor and log system performance.
+  --profile-startup    Record startup times and write a report next to
+                       the log file.
   --develop            Development mode. Enables live reloading of QSS styles.
   --command_line_args <args>...
                        Additional args passed to the QtApplication.
@@ -206,6 +208,10 @@ def apply_opts(opts):
 
     LOG.info("QtPyVCP Version: %s", QTPYVCP_VERSION)
 
+    if opts.profile_startup:
+        from qtpyvcp.utilities.startup_profiler import PROFILER
+        PROFILER.enable()
+
     if LOG.getEffectiveLevel() == logger.logLevelFromName("DEBUG"):
         import qtpy
         LOG.debug("Qt Version: %s", qtpy.QT_VERSION)
@@ -0,0 +1,152 @@
+"""
+Plasma Cut Chart Snapshot
+-------------------------
+
+Compact read only copy of the plasma process tables.
+
+The PlasmaProcesses plugin writes the snapshot next to the SQLite database
+whenever the database changes. Tools such as the gcode preprocessor run once
+per program load and only need to look up cut charts and hole tables, so they
+can load the snapshot instead of importing SQLAlchemy and querying the
+database.
+
+The snapshot is keyed by the database file revision (modification time and
+size), a stale snapshot is never used.
+"""
+
+import os
+import pickle
+
+from types import SimpleNamespace
+
+SNAPSHOT_VERSION = 1
+
+# tables copied into the snapshot
+SNAPSHOT_TABLES = ('machine', 'material', 'linearsystem', 'pressuresystem',
+                   'thickness', 'cutchart', 'holecut')
+
+
+def snapshot_path(db_file):
+    """Snapshot file used for the database file `db_file`."""
+    return os.path.splitext(db_file)[0] + '.snapshot'
+
+
+def db_revision(db_file):
+    """Revision of the database file, None if it does not exist."""
+    try:
+        st = os.stat(db_file)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def write_snapshot(db_file, tables):
+    """Write the snapshot for `db_file`.
+
+    Args:
+        db_file (str) : Path of the SQLite database file.
+        tables (dict) : Table name -> list of row dicts.
+    """
+    data = {'version': SNAPSHOT_VERSION,
+            'revision': db_revision(db_file),
+            'tables': tables}
+
+    path = snapshot_path(db_file)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as fh:
+        pickle.dump(data, fh, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(db_file, machine, pressure, measurement):
+    """Load the snapshot for `db_file`.
+
+    Returns:
+        CutChartSnapshot : The snapshot, or None if it is missing, unreadable
+            or older than the database.
+    """
+    try:
+        with open(snapshot_path(db_file), 'rb') as fh:
+            data = pickle.load(fh)
+    except Exception:
+        return None
+
+    if data.get('version') != SNAPSHOT_VERSION:
+        return None
+    revision = db_revision(db_file)
+    if revision is None or data.get('revision') != revision:
+        return None
+
+    try:
+        return CutChartSnapshot(data['tables'], machine, pressure, measurement)
+    except (KeyError, IndexError):
+        return None
+
+
+class CutChartSnapshot(object):
+    """Read only stand in for the PlasmaProcesses lookup methods.
+
+    Rows are returned as simple attribute objects carrying the same column
+    names as the database models.
+
+    Args:
+        tables (dict) : Table name -> list of row dicts.
+        machine (str) : Active machine name.
+        pressure (str) : Active pressure system name.
+        measurement (str) : Active linear system name, 'mm' or 'inch'.
+    """
+    def __init__(self, tables, machine, pressure, measurement):
+        rows = {name: [SimpleNamespace(**row) for row in tables[name]]
+                for name in SNAPSHOT_TABLES}
+
+        thickness_by_id = {t.id: t for t in rows['thickness']}
+        for row in rows['cutchart'] + rows['holecut']:
+            row.thickness = thickness_by_id.get(row.thicknessid)
+
+        self._machines = sorted(rows['machine'], key=lambda r: r.name)
+        self._materials = sorted(rows['material'], key=lambda r: r.name)
+        self._linearsystems = sorted(rows['linearsystem'], key=lambda r: r.name)
+        self._thicknesses = sorted(rows['thickness'], key=lambda r: r.thickness)
+
+        self._machineid = self._id_by_name(rows['machine'], machine)
+        self._pressureid = self._id_by_name(rows['pressuresystem'], pressure)
+        self._measurementid = self._id_by_name(rows['linearsystem'], measurement)
+
+        # cuts for the active machine/pressure/measurement, by tool number
+        self._tools = {}
+        for cut in sorted(rows['cutchart'], key=lambda r: r.id):
+            if (cut.machineid, cut.pressuresystemid, cut.linearsystemid) == \
+                    (self._machineid, self._pressureid, self._measurementid):
+                self._tools.setdefault(cut.tool_number, []).append(cut)
+
+        self._holes = {}
+        for hole in sorted(rows['holecut'], key=lambda r: r.hole_size):
+            key = (hole.machineid, hole.materialid, hole.thicknessid)
+            self._holes.setdefault(key, []).append(hole)
+
+    @staticmethod
+    def _id_by_name(rows, name):
+        return [r.id for r in rows if r.name == name][0]
+
+    def machines(self):
+        return list(self._machines)
+
+    def materials(self):
+        return list(self._materials)
+
+    def linearsystems(self):
+        return list(self._linearsystems)
+
+    def thicknesses(self, measureid=None):
+        if measureid is None:
+            return list(self._thicknesses)
+        return [t for t in self._thicknesses if t.linearsystemid == measureid]
+
+    def hidef_holes(self, machineid, materialid, thicknessid):
+        return list(self._holes.get((machineid, materialid, thicknessid), []))
+
+    def tool_id(self, tool_num):
+        return list(self._tools.get(tool_num, []))
+
+    def terminate(self):
+        pass
@@ -0,0 +1,197 @@
+"""
+Startup Profiler
+----------------
+
+Records where QtPyVCP startup time goes.
+
+When enabled, either with the ``--profile-startup`` command line option or
+by setting the ``QTPYVCP_PROFILE_STARTUP`` environment variable, the time
+taken by each plugin constructor and ``initialise``, each dialog and window,
+each ``uic.loadUi`` call, each widget ``initialize`` and the import of heavy
+modules such as vtk, sqlalchemy and pyqtgraph is recorded. Once the main
+window is up a report is logged and written to ``qtpyvcp_startup_profile.txt``
+next to the log file.
+
+If ``QTPYVCP_PROFILE_STARTUP`` holds a file path the report is written there
+instead.
+
+Example::
+
+    from qtpyvcp.utilities.startup_profiler import PROFILER
+
+    with PROFILER.measure('plugin', 'status'):
+        plugin = Status()
+"""
+
+import os
+import sys
+import time
+
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from qtpyvcp.utilities.logger import getLogger
+
+LOG = getLogger(__name__)
+
+# top level modules whose import time is recorded
+HEAVY_MODULES = ('vtk', 'vtkmodules', 'sqlalchemy', 'pyqtgraph', 'numpy',
+                 'OpenGL', 'cv2', 'psutil', 'yaml', 'jinja2')
+
+# max entries listed per category in the report
+REPORT_TOP = 15
+
+
+class _ImportTimer(object):
+    """Meta path finder that times the import of HEAVY_MODULES."""
+
+    def __init__(self, profiler):
+        self.profiler = profiler
+
+    def find_spec(self, fullname, path=None, target=None):
+        if fullname not in HEAVY_MODULES:
+            return None
+
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+
+        loader = spec.loader
+        if loader is None or not hasattr(loader, 'exec_module'):
+            return spec
+
+        exec_module = loader.exec_module
+        profiler = self.profiler
+
+        def timed_exec_module(module):
+            with profiler.measure('import', fullname):
+                exec_module(module)
+
+        loader.exec_module = timed_exec_module
+        return spec
+
+
+class StartupProfiler(object):
+    """Startup timing recorder. Does nothing until enabled."""
+
+    def __init__(self):
+        self.enabled = False
+        self.records = []
+        self._start = time.perf_counter()
+        self._import_timer = None
+        self._report_file = None
+
+        env = os.getenv('QTPYVCP_PROFILE_STARTUP')
+        if env:
+            if env.lower() not in ('1', 'true', 'yes', 'on'):
+                self._report_file = os.path.expanduser(env)
+            self.enable()
+
+    def enable(self, report_file=None):
+        """Start recording.
+
+        Args:
+            report_file (str, optional) : Where to write the report. An
+                explicit path from ``QTPYVCP_PROFILE_STARTUP`` takes priority.
+        """
+        if self._report_file is None:
+            self._report_file = report_file
+
+        if self.enabled:
+            return
+        self.enabled = True
+
+        self._import_timer = _ImportTimer(self)
+        sys.meta_path.insert(0, self._import_timer)
+        LOG.info("Startup profiling enabled")
+
+    def disable(self):
+        """Stop recording, already recorded times are kept."""
+        self.enabled = False
+        if self._import_timer in sys.meta_path:
+            sys.meta_path.remove(self._import_timer)
+        self._import_timer = None
+
+    @contextmanager
+    def measure(self, category, name):
+        """Context manager recording the time taken by its body."""
+        if not self.enabled:
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.records.append((category, str(name), time.perf_counter() - start))
+
+    def record(self, category, name, seconds):
+        """Record an already measured time."""
+        if self.enabled:
+            self.records.append((category, str(name), seconds))
+
+    def report(self):
+        """Startup report text.
+
+        Returns:
+            str : Per category totals followed by the slowest entries.
+        """
+        categories = OrderedDict()
+        for category, name, seconds in self.records:
+            categories.setdefault(category, []).append((seconds, name))
+
+        lines = ['QtPyVCP startup profile',
+                 '=======================',
+                 '',
+                 'Since profiler start: {:.3f} s'.format(time.perf_counter() - self._start),
+                 '']
+
+        for category, entries in categories.items():
+            total = sum(seconds for seconds, name in entries)
+            lines.append('{} ({} entries, {:.3f} s total)'.format(category, len(entries), total))
+
+            if category == 'phase':
+                # phases are listed in order, not by time
+                top = entries
+            else:
+                top = sorted(entries, reverse=True)[:REPORT_TOP]
+
+            for seconds, name in top:
+                lines.append('  {:8.3f} s  {}'.format(seconds, name))
+            lines.append('')
+
+        return '\n'.join(lines)
+
+    def writeReport(self, log_file=None):
+        """Log the report and write it to file, then stop profiling.
+
+        Args:
+            log_file (str, optional) : The log file, the report is written
+                to the same directory unless a report file has been set.
+        """
+        if not self.enabled:
+            return
+
+        self.disable()
+        text = self.report()
+        LOG.info(text)
+
+        report_file = self._report_file
+        if report_file is None:
+            log_dir = os.path.dirname(log_file) if log_file else os.path.expanduser('~')
+            report_file = os.path.join(log_dir, 'qtpyvcp_startup_profile.txt')
+
+        try:
+            with open(report_file, 'w') as fh:
+                fh.write(text)
+            LOG.info("Startup profile written to yellow<{}>".format(report_file))
+        except OSError:
+            LOG.exception("Could not write startup profile: %s", report_file)
+
+
+PROFILER = StartupProfiler()
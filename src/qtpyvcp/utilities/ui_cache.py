@@ -0,0 +1,213 @@
+"""
+UI Cache
+--------
+
+Drop in replacement for ``uic.loadUi`` that caches compiled .ui files.
+
+``uic.loadUi`` parses the .ui XML and builds the widgets reflectively every
+time it is called. The first time a .ui file is loaded it is compiled to a
+python module with ``uic.compileUi`` and stored in the cache dir, keyed by a
+hash of the .ui file contents, so later launches only need to import the
+module. An edited .ui file gets a new hash and is recompiled, so VCP authors
+do not need to do anything.
+
+Runtime parsing is used instead if the Qt binding can not compile .ui files,
+if the cache can not be written, or if the .ui file refers to image files by
+relative path (compiled modules resolve these against the working dir, not the
+.ui file dir).
+
+The cache is stored in ``$XDG_CACHE_HOME/qtpyvcp/ui`` (``~/.cache/qtpyvcp/ui``)
+and can be disabled by setting the ``QTPYVCP_UI_CACHE`` environment variable
+to ``0``.
+
+Example::
+
+    from qtpyvcp.utilities import ui_cache
+
+    class MyDialog(QDialog):
+        def __init__(self, parent=None):
+            super(MyDialog, self).__init__(parent)
+            ui_cache.loadUi(os.path.join(UI_DIR, 'my_dialog.ui'), self)
+"""
+
+import os
+import re
+import types
+import hashlib
+import importlib.util
+
+from qtpy import uic, API_NAME, QT_VERSION
+
+from qtpyvcp.utilities.logger import getLogger
+from qtpyvcp.utilities.startup_profiler import PROFILER
+
+LOG = getLogger(__name__)
+
+# bump to invalidate all cached modules
+CACHE_VERSION = 1
+
+CACHE_DIR = os.path.join(os.getenv('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'),
+                         'qtpyvcp', 'ui')
+
+ENABLED = os.getenv('QTPYVCP_UI_CACHE', '1').lower() not in ('0', 'false', 'no', 'off')
+
+# image paths in the .ui file, see _isCacheable()
+IMAGE_PATH_RE = re.compile(r'<(iconset|pixmap|normaloff|normalon|disabledoff|'
+                           r'disabledon|activeoff|activeon|selectedoff|selectedon)'
+                           r'\b[^>]*(?<!/)>\s*([^<\s][^<]*?)\s*<')
+
+# compiled form classes by cache key, None if the .ui file can't be cached
+_FORM_CLASSES = {}
+
+
+def loadUi(ui_file, base_instance=None):
+    """Load a .ui file into `base_instance`, using the compiled cache if possible.
+
+    Args:
+        ui_file (str) : Path of the .ui file to load.
+        base_instance (QWidget) : Widget to set up from the .ui file. Must be
+            an instance of the top level class of the .ui file.
+
+    Returns:
+        QWidget : `base_instance`, or a new widget if `base_instance` was None.
+    """
+    with PROFILER.measure('loadUi', ui_file):
+        form_class = None
+        if ENABLED and base_instance is not None and hasattr(uic, 'compileUi'):
+            form_class = _getFormClass(ui_file)
+
+        if form_class is None:
+            return uic.loadUi(ui_file, base_instance)
+
+        return _setupUi(form_class, ui_file, base_instance)
+
+
+def clearCache():
+    """Delete all cached modules."""
+    _FORM_CLASSES.clear()
+    if not os.path.isdir(CACHE_DIR):
+        return
+    for fname in os.listdir(CACHE_DIR):
+        if fname.endswith('.py'):
+            try:
+                os.remove(os.path.join(CACHE_DIR, fname))
+            except OSError:
+                pass
+
+
+def _setupUi(form_class, ui_file, base_instance):
+    # run setupUi with the base instance as `self`, so child widgets are set
+    # as attributes of the base instance just like uic.loadUi does
+    base_instance.retranslateUi = types.MethodType(form_class.retranslateUi, base_instance)
+    try:
+        form_class.setupUi(base_instance, base_instance)
+    except Exception:
+        # don't use this module again, the widget is left half built
+        # so let the error propagate
+        LOG.exception("Error loading cached UI for %s", ui_file)
+        _discard(ui_file)
+        raise
+    finally:
+        del base_instance.retranslateUi
+
+    return base_instance
+
+
+def _cacheKey(ui_file, content):
+    ui_hash = hashlib.sha1()
+    ui_hash.update(content)
+    ui_hash.update('{}:{}:{}'.format(CACHE_VERSION, API_NAME, QT_VERSION).encode())
+
+    path_hash = hashlib.sha1(os.path.realpath(ui_file).encode()).hexdigest()[:8]
+    prefix = '{}_{}_'.format(re.sub(r'\W', '_', os.path.basename(ui_file)), path_hash)
+
+    return prefix, prefix + ui_hash.hexdigest()[:16]
+
+
+def _isCacheable(ui_file, content):
+    for match in IMAGE_PATH_RE.finditer(content.decode('utf-8', 'replace')):
+        path = match.group(2)
+        if not (path.startswith(':') or os.path.isabs(path)):
+            LOG.debug("Not caching %s, it uses a relative image path: %s", ui_file, path)
+            return False
+    return True
+
+
+def _getFormClass(ui_file):
+    try:
+        with open(ui_file, 'rb') as fh:
+            content = fh.read()
+    except OSError:
+        # let uic.loadUi raise the error
+        return None
+
+    prefix, key = _cacheKey(ui_file, content)
+    try:
+        return _FORM_CLASSES[key]
+    except KeyError:
+        pass
+
+    form_class = None
+    if _isCacheable(ui_file, content):
+        py_file = os.path.join(CACHE_DIR, key + '.py')
+        if not os.path.isfile(py_file):
+            _compile(ui_file, py_file, prefix)
+        if os.path.isfile(py_file):
+            form_class = _importFormClass(py_file, key)
+
+    _FORM_CLASSES[key] = form_class
+    return form_class
+
+
+def _compile(ui_file, py_file, prefix):
+    LOG.debug("Compiling %s to cache", ui_file)
+    tmp_file = '{}.{}.tmp'.format(py_file, os.getpid())
+    try:
+        if not os.path.isdir(CACHE_DIR):
+            os.makedirs(CACHE_DIR)
+        with open(tmp_file, 'w') as fh:
+            uic.compileUi(ui_file, fh)
+        os.replace(tmp_file, py_file)
+    except Exception:
+        LOG.debug("Could not compile %s to cache", ui_file, exc_info=True)
+        try:
+            os.remove(tmp_file)
+        except OSError:
+            pass
+        return
+
+    # remove modules compiled from older versions of this .ui file
+    py_name = os.path.basename(py_file)
+    for fname in os.listdir(CACHE_DIR):
+        if fname.startswith(prefix) and fname.endswith('.py') and fname != py_name:
+            try:
+                os.remove(os.path.join(CACHE_DIR, fname))
+            except OSError:
+                pass
+
+
+def _importFormClass(py_file, key):
+    try:
+        spec = importlib.util.spec_from_file_location('qtpyvcp_ui_cache.' + key, py_file)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    except Exception:
+        # e.g. a resource module the .ui refers to can't be imported
+        LOG.debug("Could not import cached UI %s", py_file, exc_info=True)
+        return None
+
+    for name, obj in vars(module).items():
+        if name.startswith('Ui_') and hasattr(obj, 'setupUi'):
+            return obj
+
+    return None
+
+
+def _discard(ui_file):
+    try:
+        with open(ui_file, 'rb') as fh:
+            prefix, key = _cacheKey(ui_file, fh.read())
+        _FORM_CLASSES[key] = None
+        os.remove(os.path.join(CACHE_DIR, key + '.py'))
+    except OSError:
+        pass
@@ -1,12 +1,12 @@
 import os
 import yaml
 from pkg_resources import iter_entry_points
-from qtpy import uic
 
 from qtpy.QtCore import Qt, Slot
 from qtpy.QtWidgets import QFileDialog, QApplication, QDialog, QTreeWidgetItem, \
     QStyleFactory
 
+from qtpyvcp.utilities import ui_cache
 from qtpyvcp import TOP_DIR
 
 CHOOSER_DIR = os.path.abspath(os.path.dirname(__file__))
@@ -17,7 +17,7 @@ EXAMPLE_VCP_DIR = os.path.join(TOP_DIR, 'examples')
 class VCPChooser(QDialog):
     def __init__(self, opts):
         super(VCPChooser, self).__init__()
-        uic.loadUi(os.path.join(CHOOSER_DIR, 'vcp_chooser.ui'), self)
+        ui_cache.loadUi(os.path.join(CHOOSER_DIR, 'vcp_chooser.ui'), self)
 
         self.setAttribute(Qt.WA_DeleteOnClose, True)
 
@@ -9,7 +9,9 @@ all other QtPyVCP widgets are based.
 import os
 import json
 
-from qtpy.QtCore import Property, Slot, Qt
+from functools import partial
+
+from qtpy.QtCore import Property, Slot, Qt, QTimer
 from qtpy.QtWidgets import QPushButton
 
 from qtpyvcp import hal as qhal
@@ -29,6 +31,92 @@ class ChanList(list):
         return super(ChanList, self).__getitem__(index)()
 
 
+# Rule compiler caches, shared by all widgets. Screens often repeat the same
+# rules on many widgets, so each JSON string, channel URL and expression is
+# only parsed/compiled once.
+_RULES_CACHE = {}
+_CHANNEL_CACHE = {}
+_EXPRESSION_CACHE = {}
+
+
+def _parseRules(rules):
+    try:
+        return _RULES_CACHE[rules]
+    except KeyError:
+        parsed = _RULES_CACHE[rules] = json.loads(rules)
+        return parsed
+
+
+def _getChannel(url):
+    """Cached ``(chan_obj, chan_exp)`` for a rule channel URL."""
+    try:
+        return _CHANNEL_CACHE[url]
+    except KeyError:
+        protocol, sep, item = url.partition(':')
+        chan_obj, chan_exp = getPlugin(protocol).getChannel(item)
+        if chan_obj is not None:
+            _CHANNEL_CACHE[url] = chan_obj, chan_exp
+        return chan_obj, chan_exp
+
+
+def _compileExpression(method, expression):
+    """Cached function calling ``widget.<method>(<expression>)``.
+
+    The returned function takes ``(widget, ch)``.
+    """
+    key = (method, expression)
+    try:
+        return _EXPRESSION_CACHE[key]
+    except KeyError:
+        src = 'lambda widget, ch: widget.{}({})'.format(method, expression)
+        func = _EXPRESSION_CACHE[key] = eval(compile(src, '<rule>', 'eval'), {})
+        return func
+
+
+class RuleUpdater(object):
+    """Deferred, de-duplicated rule evaluation.
+
+    Rules with several trigger channels are evaluated once on the next event
+    loop pass however many of their triggers fired, e.g. in one status cycle.
+    """
+    _pending = []
+    _timer = None
+
+    def __init__(self, widget, exp):
+        self.widget = widget
+        self.exp = exp
+        self.scheduled = False
+
+    def schedule(self, *args):
+        if self.scheduled:
+            return
+        self.scheduled = True
+
+        cls = RuleUpdater
+        cls._pending.append(self)
+        if cls._timer is None:
+            cls._timer = QTimer()
+            cls._timer.setSingleShot(True)
+            cls._timer.timeout.connect(cls._update)
+        if not cls._timer.isActive():
+            cls._timer.start(0)
+
+    @staticmethod
+    def _update():
+        pending = RuleUpdater._pending
+        RuleUpdater._pending = []
+        for updater in pending:
+            updater.scheduled = False
+            try:
+                updater.exp()
+            except RuntimeError:
+                # underlying C++ widget has been deleted
+                pass
+            except Exception:
+                LOG.exception('Error calling rules expression from %s:',
+                              updater.widget.objectName())
+
+
 class VCPPrimitiveWidget(object):
     """VCPPrimitiveWidget.
 
@@ -220,7 +308,7 @@ class VCPBaseWidget(VCPPrimitiveWidget):
         self.registerRules()
 
     def registerRules(self):
-        rules = json.loads(self._rules)
+        rules = _parseRules(self._rules)
         for rule in rules:
             # print(rule)
             ch = ChanList()
@@ -229,8 +317,7 @@ class VCPBaseWidget(VCPPrimitiveWidget):
 
                 try:
                     url = chan['url'].strip()
-                    protocol, sep, item = url.partition(':')
-                    chan_obj, chan_exp = getPlugin(protocol).getChannel(item)
+                    chan_obj, chan_exp = _getChannel(url)
 
                     ch.append(chan_exp)
 
@@ -249,10 +336,7 @@ class VCPBaseWidget(VCPPrimitiveWidget):
                 self._data_channels = ch
                 continue
 
-            eval_env = {'ch': ch, 'widget': self}
-            eval_exp = 'lambda: widget.{}({})'.format(
-                            prop[0], rule['expression']).encode('utf-8')
-            exp = eval(eval_exp, eval_env)
+            exp = partial(_compileExpression(prop[0], rule['expression']), self, ch)
 
             # initial call to update
             try:
@@ -262,8 +346,9 @@ class VCPBaseWidget(VCPPrimitiveWidget):
                 LOG.exception(f'Error calling rules expression from {widget_name}:')
                 continue
 
+            updater = RuleUpdater(self, exp)
             for trigger in triggers:
-                trigger(exp)
+                trigger(updater.schedule)
 
 
 class VCPWidget(VCPBaseWidget):
@@ -79,6 +79,9 @@ class DROBaseWidget(VCPWidget):
         self._fmt = self._in_fmt
         self._input_type = 'number:float'
 
+        # position channel of the displayed axis, set in initialize()
+        self._pos_chan = None
+
         self.updateValue()
 
         self.status.program_units.notify(self.updateUnits, 'string')
@@ -108,7 +111,7 @@ class DROBaseWidget(VCPWidget):
         self.updateValue()
 
     def initialize(self):
-        getattr(self.pos, self._ref_typ.name).notify(self.updateValue)
+        self._connectPosition()
         self.updateValue()
 
         if self._is_lathe:
@@ -130,24 +133,46 @@ class DROBaseWidget(VCPWidget):
             except AttributeError:  # settings not found
                 pass
 
+    def _connectPosition(self):
+        # only changes of the displayed axis need to update the text
+        if self._pos_chan is not None:
+            self._pos_chan.signal.disconnect(self._onPositionChanged)
+
+        self._pos_chan = self.pos.axisChannel(self._ref_typ.name, self._anum)
+        self._pos_chan.notify(self._onPositionChanged)
+
+    def _onPositionChanged(self, value):
+        self.updateValue()
+
     def updateDiameterMode(self, gcodes):
         self._g7_active = 'G7' in gcodes
         self.updateValue()
 
     def updateValue(self, pos=None):
-        """Update the displayed position."""
+        """Update the displayed position.
+
+        Args:
+            pos (tuple, optional) : Positions of all axes, the current
+                positions of the reference type are used if not given.
+        """
         if pos is None:
-            pos = getattr(self.pos, self._ref_typ.name).getValue()
+            chan = self.pos.axisChannel(self._ref_typ.name, self._anum)
+            value = chan.value
+        else:
+            chan = None
+            value = pos[self._anum]
 
         if self._is_lathe and self._anum == Axis.X:
             if self._lathe_mode == LatheMode.Diameter or \
                     (self._lathe_mode == LatheMode.Auto and self._g7_active):
-                self.setText(self._fmt % (pos[self._anum] * 2))
-            else:
-                self.setText(self._fmt % pos[self._anum])
+                self.setText(self._fmt % (value * 2))
+                return
 
+        if chan is not None:
+            # formatted once for all DROs using the same format
+            self.setText(chan.format(self._fmt))
         else:
-            self.setText(self._fmt % pos[self._anum])
+            self.setText(self._fmt % value)
 
     @Property(int)
     def referenceType(self):
@@ -156,6 +181,8 @@ class DROBaseWidget(VCPWidget):
     @referenceType.setter
     def referenceType(self, ref_type):
         self._ref_typ = RefType(ref_type)
+        if self._pos_chan is not None:
+            self._connectPosition()
         self.updateValue()
 
     @Property(int)
@@ -168,6 +195,8 @@ class DROBaseWidget(VCPWidget):
         if axis in [3, 4, 5]:
             self._angular_axis = True
             self._fmt = self._deg_fmt
+        if self._pos_chan is not None:
+            self._connectPosition()
         self.updateValue()
 
     @Property(str)
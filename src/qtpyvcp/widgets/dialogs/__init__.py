@@ -1,6 +1,6 @@
 from qtpy.QtWidgets import QApplication, QMessageBox
 
-from qtpyvcp import DIALOGS
+from qtpyvcp import DIALOGS, LAZY_DIALOGS
 from qtpyvcp.utilities.logger import getLogger
 
 LOG = getLogger(__name__)
@@ -14,13 +14,21 @@ def getDialog(name):
     Args:
         name (str) : The dialog name as defined in the YAML file.
 
+    Lazy dialogs are constructed on the first request.
+
     Returns:
         A dialog instance, or None.
     """
     try:
         return DIALOGS[name]
     except KeyError:
-        LOG.error("The requested dialog '{}' was not found.".format(name))
+        pass
+
+    factory = LAZY_DIALOGS.pop(name, None)
+    if factory is not None:
+        return factory()
+
+    LOG.error("The requested dialog '{}' was not found.".format(name))
 
 
 def showDialog(name):
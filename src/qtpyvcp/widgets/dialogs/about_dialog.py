@@ -16,9 +16,9 @@
 #   You should have received a copy of the GNU General Public License
 #   along with QtPyVCP.  If not, see <http://www.gnu.org/licenses/>.
 
-from qtpy import uic
 from qtpy.QtWidgets import QVBoxLayout, QDialog, QDialogButtonBox, QLabel
 
+from qtpyvcp.utilities import ui_cache
 from qtpyvcp.widgets.dialogs.base_dialog import BaseDialog
 from qtpyvcp import __version__
 
@@ -30,7 +30,7 @@ class AboutDialog(BaseDialog):
         self.ui_file = kwargs.get('ui_file')
 
         if self.ui_file:
-            uic.loadUi(self.ui_file, self)
+            ui_cache.loadUi(self.ui_file, self)
         else:
 
             self.setFixedSize(600, 200)
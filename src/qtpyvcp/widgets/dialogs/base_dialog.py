@@ -2,10 +2,10 @@
 
 import os
 
-from qtpy import uic
 from qtpy.QtCore import Qt
 from qtpy.QtWidgets import QDialog
 
+from qtpyvcp.utilities import ui_cache
 from qtpyvcp.utilities.logger import getLogger
 
 LOG = getLogger(__name__)
@@ -95,7 +95,7 @@ class BaseDialog(QDialog):
             return
 
         LOG.debug("Loading dialog from ui_file: %s", ui_file)
-        uic.loadUi(ui_file, self)
+        ui_cache.loadUi(ui_file, self)
 
     def setWindowFlag(self, flag, on):
         """BackPort QWidget.setWindowFlag() implementation from Qt 5.9
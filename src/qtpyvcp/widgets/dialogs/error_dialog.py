@@ -1,10 +1,10 @@
 import os
 from traceback import format_exception
 
-from qtpy import uic
 from qtpy.QtCore import Slot
 from qtpy.QtWidgets import QDialog, QApplication
 
+from qtpyvcp.utilities import ui_cache
 from qtpyvcp.utilities.logger import getLogger
 from qtpyvcp.widgets.dialogs.base_dialog import BaseDialog
 
@@ -17,7 +17,7 @@ class ErrorDialog(BaseDialog):
     def __init__(self, exc_info):
         super(ErrorDialog, self).__init__(stay_on_top=True)
 
-        uic.loadUi(os.path.join(os.path.dirname(__file__), 'error_dialog.ui'), self)
+        ui_cache.loadUi(os.path.join(os.path.dirname(__file__), 'error_dialog.ui'), self)
 
         self.exc_info = exc_info
         exc_type, exc_msg, exc_tb = exc_info
@@ -151,6 +151,7 @@ class FindReplaceDialog(BaseDialog):
         self.replace_all_button.clicked.connect(self.replace_all)
         self.undo_button.clicked.connect(self.undo_last_replace)
         self.close_button.clicked.connect(self.hide_dialog)
+        self.parent.searchUpdated.connect(self.on_search_updated)
 
         # Store the original palette for status feedback
         self.default_palette = self.find_input.palette()
@@ -206,6 +207,11 @@ class FindReplaceDialog(BaseDialog):
         """Update search when text changes (incremental search)."""
         self._highlight_and_update(text)
 
+    def on_search_updated(self):
+        """Update the match count once a background search is done."""
+        if self.isVisible() and self.find_input.text():
+            self.update_match_count()
+
     def update_match_count(self):
         """Update the status label with match count."""
         count = self.parent.getMatchCount(
@@ -225,7 +231,8 @@ class FindReplaceDialog(BaseDialog):
         elif count == 0:
             self.status_label.setText("Not found")
         else:
-            self.status_label.setText("")
+            # still searching, on_search_updated is called when done
+            self.status_label.setText("Searching...")
 
     def find_next(self):
         """Find next occurrence."""
@@ -20,9 +20,9 @@
 import linuxcnc
 import os
 
-from qtpy import uic
 from qtpy.QtWidgets import QDialog
 
+from qtpyvcp.utilities import ui_cache
 from qtpyvcp.widgets.dialogs.base_dialog import BaseDialog
 
 INIFILE = linuxcnc.ini(os.getenv("INI_FILE_NAME"))
@@ -41,4 +41,4 @@ class ToolEditDialog(BaseDialog):
         else:
             self.dialog_ui = self.mill_ui_dialog
 
-        uic.loadUi(os.path.join(os.path.dirname(__file__), self.dialog_ui), self)
+        ui_cache.loadUi(os.path.join(os.path.dirname(__file__), self.dialog_ui), self)
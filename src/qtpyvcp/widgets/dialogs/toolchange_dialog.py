@@ -17,9 +17,9 @@
 #   along with QtPyVCP.  If not, see <http://www.gnu.org/licenses/>.
 
 import os
-from qtpy import uic
 from qtpy.QtWidgets import QVBoxLayout, QDialog, QDialogButtonBox, QLabel
 
+from qtpyvcp.utilities import ui_cache
 from qtpyvcp.widgets.dialogs.base_dialog import BaseDialog
 from qtpyvcp.plugins import getPlugin
 
@@ -66,7 +66,7 @@ class ToolChangeDialog(BaseDialog):
 
         self.ui_file = kwargs.get('ui_file', default_ui)
 
-        self.ui = uic.loadUi(self.ui_file, self)
+        self.ui = ui_cache.loadUi(self.ui_file, self)
 
         comp = hal.getComponent("qtpyvcp_manualtoolchange")
         comp.addPin('number', 's32', 'in')
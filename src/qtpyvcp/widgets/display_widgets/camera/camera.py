@@ -43,7 +43,6 @@
 
 import os
 
-from qtpy import uic
 
 from qtpy.QtCore import QByteArray, Qt, QTimer
 from qtpy.QtGui import QPalette, QPixmap
@@ -51,6 +50,7 @@ from qtpy.QtWidgets import (QAction, QActionGroup, QApplication,
                              QWidget, QMessageBox)
 
 # Set up logging
+from qtpyvcp.utilities import ui_cache
 from qtpyvcp.utilities import logger
 LOG = logger.getLogger(__name__)
 
@@ -85,7 +85,7 @@ class Camera(QWidget):
         if not multimedia_available:
             return
 
-        self.ui = uic.loadUi(os.path.join(WIDGET_PATH, "camera.ui"), self)
+        self.ui = ui_cache.loadUi(os.path.join(WIDGET_PATH, "camera.ui"), self)
 
         self.camera = None
         self.imageCapture = None
@@ -40,12 +40,12 @@
 
 import os
 
-from qtpy import uic
-
 from qtpy.QtCore import qFuzzyCompare
 from qtpy.QtMultimedia import QMultimedia
 from qtpy.QtWidgets import QDialog
 
+from qtpyvcp.utilities import ui_cache
+
 WIDGET_PATH = os.path.dirname(os.path.abspath(__file__))
 
 
@@ -57,7 +57,7 @@ class Settings(QDialog):
         self.imagecapture = imageCapture
         self.mediaRecorder = mediaRecorder
 
-        self.ui = uic.loadUi(os.path.join(WIDGET_PATH, "settings.ui"), self)
+        self.ui = ui_cache.loadUi(os.path.join(WIDGET_PATH, "settings.ui"), self)
 
         self.ui.imageCodecBox.addItem("Default image format", "")
         for codecName in self.imagecapture.supportedImageCodecs():
@@ -2,9 +2,9 @@
 
 import os
 
-from qtpy import uic
 from qtpy.QtWidgets import QWidget
 
+from qtpyvcp.utilities import ui_cache
 from qtpyvcp.widgets import VCPWidget
 from qtpyvcp.utilities import logger
 
@@ -19,4 +19,4 @@ class GCodeProperties(QWidget):
         super(GCodeProperties, self).__init__(parent)
         if not IN_DESIGNER:
 
-            self.ui = uic.loadUi(os.path.join(WIDGET_PATH, "gcode_properties.ui"), self)
\ No newline at end of file
+            self.ui = ui_cache.loadUi(os.path.join(WIDGET_PATH, "gcode_properties.ui"), self)
\ No newline at end of file
@@ -1,11 +1,11 @@
-import gcode
 import linuxcnc
 import os
-import shutil
 
 from qtpyvcp.utilities import logger
 from qtpyvcp.plugins import getPlugin
 
+from .program_analysis import ProgramAnalyzer
+
 LOG = logger.getLogger(__name__)
 IN_DESIGNER = os.getenv('DESIGNER', False)
 NOTIFICATIONS = getPlugin('notifications')
@@ -38,9 +38,16 @@ class BaseBackPlot(object):
         self.temp_parameter_file = os.path.join(self.parameter_file + '.temp')
 
         self.last_filename = None
+        self._analysis_job = None
 
     def load(self, filename=None):
+        """Load a program into the canon.
+
+        The program is analysed in a worker thread, :meth:`program_loaded`
+        is called once the canon has been loaded or loading failed.
+        """
         if self.canon is None:
+            self.program_loaded(False)
             return
 
         filename = filename or self.last_filename
@@ -52,40 +59,41 @@ class BaseBackPlot(object):
             self.canon = None
             self.notification.notification_dispatcher.setNotify("3D plot", "Can't load backplot, invalid file: {}".format(filename))
             # raise ValueError("Can't load backplot, invalid file: {}".format(filename))
+            self.program_loaded(False)
+            return
 
         self.last_filename = filename
 
-        if os.path.exists(self.parameter_file):
-            shutil.copy(self.parameter_file, self.temp_parameter_file)
-
-        self.canon.parameter_file = self.temp_parameter_file
-
-        # Some initialization g-code to set the units and optional user code
-        unitcode = "G%d" % (20 + (self.stat.linear_units == 1))
-        initcode = self.ini.find("RS274NGC", "RS274NGC_STARTUP_CODE") or ""
-
-        # THIS IS WHERE IT ALL HAPPENS: load_preview will execute the code,
-        # call back to the canon with motion commands, and record a history
-        # of all the movements.
-
-        try:
-            result, seq = gcode.parse(filename, self.canon, unitcode, initcode)
-
-            if result > gcode.MIN_ERROR:
-                msg = gcode.strerror(result)
-                fname = os.path.basename(filename)
-                self.notification.notification_dispatcher.setNotify("3D plot", "Error in {} line {}\n{}".format(fname, seq - 1, msg))
-                # raise SyntaxError("Error in %s line %i: %s" % (fname, seq - 1, msg))
-
-        except KeyboardInterrupt:
-            # probably raised by an (AXIS, stop) comment in the G-code file
-            # abort generating the backplot
-            pass
-        except Exception as e:
-            LOG.warning(f"CANON ERROR {e}")
-        # clean up temp var file and the backup
-        os.unlink(self.temp_parameter_file)
-        os.unlink(self.temp_parameter_file + '.bak')
+        # the interpreter runs at most once per unchanged program, the
+        # result is shared with other consumers such as gcode_properties
+        self._analysis_job = ProgramAnalyzer().analyzeAsync(filename,
+                                                            self._analysis_finished)
+
+    def _analysis_finished(self, job, analysis):
+        if job is not self._analysis_job:
+            return  # superseded by a newer load
+
+        self._analysis_job = None
+
+        if analysis is None or self.canon is None:
+            self.program_loaded(False)
+            return
+
+        if analysis.error is not None:
+            fname = os.path.basename(analysis.file_path)
+            self.notification.notification_dispatcher.setNotify("3D plot", "Error in {} line {}\n{}".format(fname, analysis.seq - 1, analysis.error))
+            # raise SyntaxError("Error in %s line %i: %s" % (fname, seq - 1, msg))
+
+        self.canon.load_analysis(analysis)
+        self.program_loaded(True)
+
+    def program_loaded(self, success):
+        """Called when :meth:`load` is done.
+
+        Args:
+            success (bool) : Whether the program was loaded into the canon.
+        """
+        pass
 
 
 if __name__ == "__main__":
@@ -18,12 +18,17 @@
 import gcode
 import linuxcnc
 import math
+import threading
 
 from qtpy.QtCore import Signal, QObject
 
 from qtpyvcp.utilities import logger
 LOG = logger.getLogger(__name__)
 
+# gcode.parse drives a single module level interpreter instance,
+# so parses from different threads must not overlap.
+PARSE_LOCK = threading.RLock()
+
 class BaseCanon(QObject):
     def __init__(self):
 
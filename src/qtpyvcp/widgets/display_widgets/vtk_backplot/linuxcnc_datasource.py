@@ -49,6 +49,11 @@ class LinuxCncDataSource(QObject):
         self._fps = int(self._inifile.find("DISPLAY", "FPS") or 0)
         if self._fps == 0:
             self._fps = int(self._inifile.find("VTK", "FPS") or 30)
+        self._path_lod = (self._inifile.find("VTK", "PATH_LOD") or "true").strip().lower() not in ["0", "false", "no", "n"]
+        self._path_lod_min_segments = int(self._inifile.find("VTK", "PATH_LOD_MIN_SEGMENTS") or 100000)
+        self._breadcrumb_max_points = int(self._inifile.find("VTK", "BREADCRUMB_MAX_POINTS") or 100000)
+        self._breadcrumb_min_distance = self._inifile.find("VTK", "BREADCRUMB_MIN_DISTANCE")
+        self._render_stats_interval = float(self._inifile.find("VTK", "RENDER_STATS") or 0)
         
         self._status.file.notify(self.__handleProgramLoaded)
         self._status.position.notify(self.__handlePositionChanged)
@@ -108,6 +113,24 @@ class LinuxCncDataSource(QObject):
     def getFPS(self):
         return self._fps
 
+    def getPathLod(self):
+        return self._path_lod
+
+    def getPathLodMinSegments(self):
+        return self._path_lod_min_segments
+
+    def getRenderStatsInterval(self):
+        return self._render_stats_interval
+
+    def getBreadcrumbMaxPoints(self):
+        return self._breadcrumb_max_points
+
+    def getBreadcrumbMinDistance(self):
+        # default to about a thousandth of an inch in machine units
+        if self._breadcrumb_min_distance is not None:
+            return float(self._breadcrumb_min_distance)
+        return 0.025 if self.isMachineMetric() else 0.001
+
     def getAxis(self):
         return self._status.stat.axis
 
@@ -20,6 +20,10 @@ from qtpyvcp.utilities.settings import getSetting
 LOG = logger.getLogger(__name__)
 IN_DESIGNER = os.getenv('DESIGNER', False)
 
+# index into the position (linear) or rotation (angular) tuple driving a part
+LINEAR_PART_AXES = {'x': 0, 'y': 1, 'z': 2}
+ANGULAR_PART_AXES = {'a': 0, 'b': 1, 'c': 2}
+
 
 
 class MachineCubeActor(vtk.vtkCubeAxesActor):
@@ -246,6 +250,11 @@ class MachinePart(vtk.vtkAssembly):
         self.part_type = None
         self.part_pos = None
 
+        self.axis_index = None
+        self.axis_sign = 1.0
+        self.last_value = None
+        self.transform = vtk.vtkTransform()
+
     def SetPartPosition(self, attr):
         self.part_pos = attr
         
@@ -264,6 +273,66 @@ class MachinePart(vtk.vtkAssembly):
     def GetPartType(self):
         return self.part_type
 
+    def compile(self):
+        """Resolve the driving axis once so updates are a lookup and compare."""
+        axis = str(self.part_axis or '').strip().lower()
+        self.axis_sign = -1.0 if axis.startswith('-') else 1.0
+
+        if self.part_type == "linear":
+            self.axis_index = LINEAR_PART_AXES.get(axis.lstrip('-'))
+        elif self.part_type == "angular":
+            self.axis_index = ANGULAR_PART_AXES.get(axis.lstrip('-'))
+        else:
+            self.axis_index = None
+
+        self.last_value = None
+        self.transform.Identity()
+        self.SetUserTransform(self.transform)
+
+    def update(self, position, rotation):
+        """Move the part to follow its axis.
+
+        Args:
+            position (tuple) : X, Y, Z position.
+            rotation (tuple) : A, B, C rotation.
+
+        Returns:
+            bool : True if the part moved.
+        """
+        if self.axis_index is None:
+            return False
+
+        if self.part_type == "linear":
+            value = position[self.axis_index]
+        else:
+            value = rotation[self.axis_index]
+
+        if value == self.last_value:
+            return False
+        self.last_value = value
+
+        value *= self.axis_sign
+        transform = self.transform
+        transform.Identity()
+
+        if self.part_type == "linear":
+            offset = [0.0, 0.0, 0.0]
+            offset[self.axis_index] = value
+            transform.Translate(*offset)
+        else:
+            pivot = self.part_pos
+            transform.Translate(pivot[0], pivot[1], pivot[2])
+            if self.axis_index == 0:
+                transform.RotateX(value)
+            elif self.axis_index == 1:
+                transform.RotateY(value)
+            else:
+                transform.RotateZ(value)
+            transform.Translate(-pivot[0], -pivot[1], -pivot[2])
+
+        self.Modified()
+        return True
+
 
 class MachinePartsASM(vtk.vtkAssembly):
     
@@ -279,6 +348,10 @@ class MachinePartsASM(vtk.vtkAssembly):
         self.part_joint = None
         self.part_color = None
 
+        # flat list of every part, built once so position updates do not
+        # need to walk the assembly tree
+        self.moving_parts = list()
+
         previous_asm = None
         
         parts_dict = OrderedDict()
@@ -346,6 +419,9 @@ class MachinePartsASM(vtk.vtkAssembly):
         tmp_assembly.SetPartAxis(self.part_axis)
         tmp_assembly.SetPartType(self.part_type)
         tmp_assembly.SetPartPosition(self.part_position)
+        tmp_assembly.compile()
+
+        self.moving_parts.append(tmp_assembly)
         
         tmp_assembly.AddPart(part_actor)
         
@@ -1,11 +1,23 @@
+import numpy as np
+
+import vtk
 import vtk.qt
+from vtkmodules.util import numpy_support
+
 from .axes_actor import AxesActor
 from qtpyvcp.utilities import logger
 
 LOG = logger.getLogger(__name__)
 
+# on screen deviation, in pixels, allowed for each interactive level of detail
+LOD_TOLERANCE_PIXELS = (1.0, 4.0)
+
+# the levels are rebuilt once the size of a pixel in path units has changed
+# by more than this factor since they were built, e.g. after zooming
+LOD_REBUILD_FACTOR = 1.5
 
-class PathActor(vtk.vtkActor):
+
+class PathActor(vtk.vtkLODActor):
     def __init__(self, linuxcncDataSource):
         super(PathActor, self).__init__()
         self._datasource = linuxcncDataSource
@@ -36,6 +48,14 @@ class PathActor(vtk.vtkActor):
         self.poly_data = vtk.vtkPolyData()
         self.data_mapper = vtk.vtkPolyDataMapper()
 
+        # decimated copies of the path drawn while the camera is moving,
+        # vtkLODActor picks the best one that fits the allocated render time
+        self.lod_mappers = list()
+        self._lod_polylines = dict()
+        self._lod_colors = None
+        self._lod_pixel_size = None
+        self.clear_lods()
+
     def set_origin_index(self, index):
         self.origin_index = index
 
@@ -50,3 +70,122 @@ class PathActor(vtk.vtkActor):
 
     def get_axes_actor(self):
         return self.axes_actor
+
+    def prepare_lods(self, starts, ends, types, color_table):
+        """Prepare decimated levels of detail for interactive rendering.
+
+        Consecutive connected segments of the same motion type are chained
+        into polylines. The levels themselves are built by
+        :meth:`update_lods` once the size of a screen pixel is known.
+
+        Args:
+            starts (ndarray) : (N, 3) segment start points.
+            ends (ndarray) : (N, 3) segment end points.
+            types (ndarray) : (N,) line type codes.
+            color_table (ndarray) : (num_types, 4) RGBA colors by type code.
+        """
+        self.clear_lods()
+
+        for type_code in np.unique(types):
+            index = np.flatnonzero(types == type_code)
+            self._lod_polylines[type_code] = self._chainSegments(index, starts[index], ends[index])
+
+        self._lod_colors = color_table
+
+    def update_lods(self, pixel_size):
+        """Build the levels of detail for the current view.
+
+        The polylines are simplified so that collinear runs and finely
+        segmented arcs collapse to a few vertices, deviating at most
+        LOD_TOLERANCE_PIXELS on screen. Nothing is done unless the pixel size
+        changed by more than LOD_REBUILD_FACTOR since the last build.
+
+        Args:
+            pixel_size (float) : Size of a screen pixel in path units.
+        """
+        if not self._lod_polylines or pixel_size <= 0.0:
+            return
+
+        if self._lod_pixel_size is not None:
+            ratio = pixel_size / self._lod_pixel_size
+            if 1.0 / LOD_REBUILD_FACTOR < ratio < LOD_REBUILD_FACTOR:
+                return
+
+        self._lod_pixel_size = pixel_size
+        self._reset_lod_mappers()
+
+        for pixels in LOD_TOLERANCE_PIXELS:
+            tolerance = pixel_size * pixels
+
+            append = vtk.vtkAppendPolyData()
+            for type_code, poly_data in self._lod_polylines.items():
+                decimate = vtk.vtkDecimatePolylineFilter()
+                decimate.SetInputData(poly_data)
+                decimate.SetTargetReduction(0.99)
+                decimate.SetMaximumError(tolerance)
+                decimate.Update()
+
+                decimated = decimate.GetOutput()
+                colors = np.tile(self._lod_colors[type_code], (decimated.GetNumberOfCells(), 1))
+                decimated.GetCellData().SetScalars(
+                    numpy_support.numpy_to_vtk(colors, deep=True, array_type=vtk.VTK_UNSIGNED_CHAR))
+
+                append.AddInputData(decimated)
+
+            append.Update()
+
+            mapper = vtk.vtkPolyDataMapper()
+            mapper.SetInputData(append.GetOutput())
+            mapper.Update()
+
+            self.lod_mappers.append(mapper)
+            self.AddLODMapper(mapper)
+
+        LOG.debug("Built %d path LODs at %g units per pixel", len(self.lod_mappers), pixel_size)
+
+    def clear_lods(self):
+        """Drop any decimated levels and render at full resolution only."""
+        self._lod_polylines = dict()
+        self._lod_colors = None
+        self._lod_pixel_size = None
+        self._reset_lod_mappers()
+
+    def _reset_lod_mappers(self):
+        self.lod_mappers = list()
+        self.GetLODMappers().RemoveAllItems()
+        # vtkLODActor creates point cloud LODs of its own when it has none,
+        # registering the full resolution mapper keeps paths drawn as lines
+        self.AddLODMapper(self.data_mapper)
+
+    @staticmethod
+    def _chainSegments(index, starts, ends):
+        # join segments that follow on from each other into polylines,
+        # a new polyline begins wherever the path is not continuous
+        count = len(index)
+
+        breaks = np.ones(count, dtype=bool)
+        breaks[1:] = (np.diff(index) != 1) | np.any(ends[:-1] != starts[1:], axis=1)
+
+        chain_ids = np.cumsum(breaks) - 1
+        num_chains = int(chain_ids[-1]) + 1
+        last = np.append(np.flatnonzero(breaks)[1:] - 1, count - 1)
+
+        points = np.empty((count + num_chains, 3), dtype=np.float64)
+        points[np.arange(count) + chain_ids] = starts
+        points[last + chain_ids[last] + 1] = ends[last]
+
+        offsets = np.append(np.flatnonzero(breaks) + np.arange(num_chains),
+                            count + num_chains).astype(numpy_support.ID_TYPE_CODE)
+        connectivity = np.arange(count + num_chains, dtype=numpy_support.ID_TYPE_CODE)
+
+        vtk_points = vtk.vtkPoints()
+        vtk_points.SetData(numpy_support.numpy_to_vtk(points, deep=True))
+
+        lines = vtk.vtkCellArray()
+        lines.SetData(numpy_support.numpy_to_vtkIdTypeArray(offsets, deep=True),
+                      numpy_support.numpy_to_vtkIdTypeArray(connectivity, deep=True))
+
+        poly_data = vtk.vtkPolyData()
+        poly_data.SetPoints(vtk_points)
+        poly_data.SetLines(lines)
+        return poly_data
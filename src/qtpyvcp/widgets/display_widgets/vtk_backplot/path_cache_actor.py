@@ -1,22 +1,43 @@
+import numpy as np
+
+import vtk
 import vtk.qt
+from vtkmodules.util import numpy_support
 from qtpyvcp.utilities import logger
 from vtk.util.colors import cyan
 
 LOG = logger.getLogger(__name__)
 
+
 class PathCacheActor(vtk.vtkActor):
-    def __init__(self, current_position):
+    """Live plot breadcrumb trail.
+
+    The trail is a fixed capacity ring buffer drawn as a single polyline, once
+    full the oldest points are dropped so memory and render cost stay flat no
+    matter how long the job runs.
+
+    Args:
+        current_position (tuple) : The initial tool tip position.
+        max_points (int) : Maximum number of points kept in the trail.
+        min_distance (float) : Positions closer than this to the last
+            recorded point are skipped.
+    """
+    def __init__(self, current_position, max_points=100000, min_distance=0.0):
         super(PathCacheActor, self).__init__()
         self.current_position = current_position
-        self.index = 0
-        self.num_points = 2
+        self.capacity = max(int(max_points), 2)
+        self.min_distance = float(min_distance)
 
-        self.points = vtk.vtkPoints()
-        self.points.InsertNextPoint(current_position)
+        # every point is written twice, capacity apart, so the newest
+        # `count` points are always one contiguous slice of the buffer
+        self._buffer = np.zeros((self.capacity * 2, 3), dtype=np.float64)
+        self._connectivity = np.arange(self.capacity, dtype=numpy_support.ID_TYPE_CODE)
+        self._offsets = np.zeros(2, dtype=numpy_support.ID_TYPE_CODE)
+        self.index = -1
+        self.count = 0
 
+        self.points = vtk.vtkPoints()
         self.lines = vtk.vtkCellArray()
-        self.lines.InsertNextCell(1)  # number of points
-        self.lines.InsertCellPoint(0)
 
         self.lines_poligon_data = vtk.vtkPolyData()
         self.polygon_mapper = vtk.vtkPolyDataMapper()
@@ -24,7 +45,9 @@ class PathCacheActor(vtk.vtkActor):
         self.GetProperty().SetLineWidth(2.5)
         self.GetProperty().SetOpacity(0.5)
         self.SetMapper(self.polygon_mapper)
-        
+
+        self._append(current_position)
+
         self.lines_poligon_data.SetPoints(self.points)
         self.lines_poligon_data.SetLines(self.lines)
 
@@ -36,12 +59,32 @@ class PathCacheActor(vtk.vtkActor):
         self.GetProperty().SetBackfaceCulling(1)
 
     def add_line_point(self, point):
-        self.index += 1
+        """Extend the trail to `point`.
+
+        Returns:
+            bool : False if the point was too close to the last one and skipped.
+        """
+        if self.min_distance > 0.0:
+            last = self._buffer[self.index]
+            if np.sum((np.asarray(point[:3], dtype=np.float64) - last) ** 2) < self.min_distance ** 2:
+                return False
+
+        self._append(point)
+        self.lines_poligon_data.Modified()
+        return True
+
+    def _append(self, point):
+        self.index = (self.index + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+        self._buffer[self.index] = point[:3]
+        self._buffer[self.index + self.capacity] = point[:3]
 
-        self.points.InsertNextPoint(point)
-        self.points.Modified()
+        end = self.index + self.capacity + 1
+        window = self._buffer[end - self.count:end]
+        self._offsets[1] = self.count
 
-        self.lines.InsertNextCell(self.num_points)
-        self.lines.InsertCellPoint(self.index - 1)
-        self.lines.InsertCellPoint(self.index)
-        self.lines.Modified()
+        # shallow wrappers, VTK reads straight from the ring buffer
+        self.points.SetData(numpy_support.numpy_to_vtk(window, deep=False))
+        self.lines.SetData(numpy_support.numpy_to_vtkIdTypeArray(self._offsets, deep=False),
+                           numpy_support.numpy_to_vtkIdTypeArray(self._connectivity[:self.count], deep=False))
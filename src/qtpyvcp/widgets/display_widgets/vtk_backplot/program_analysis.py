@@ -0,0 +1,720 @@
+"""
+Program Analysis
+----------------
+
+Runs the RS274NGC interpreter over a G-code file once and shares the
+recorded motion with every consumer, such as the VTK backplot and the
+G-code properties plugin.
+
+Results are cached in memory and on disk, keyed by the file path, mtime
+and size together with the var file, tool table and subroutine files, so
+reloading an unchanged program, even after a restart, skips the
+interpreter entirely.
+
+Usage::
+
+    from qtpyvcp.widgets.display_widgets.vtk_backplot.program_analysis import ProgramAnalyzer
+
+    # blocking, returns a ProgramAnalysis or None
+    analysis = ProgramAnalyzer().analyze('/path/to/file.ngc')
+
+    # non blocking, slots must belong to QObjects living in the GUI thread
+    ProgramAnalyzer().analyzeAsync('/path/to/file.ngc', self.onFinished, self.onProgress)
+
+"""
+
+import os
+import math
+import pickle
+import shutil
+import hashlib
+import threading
+
+from collections import OrderedDict
+
+import numpy as np
+
+import gcode
+import linuxcnc
+
+from qtpy.QtCore import QObject, QTimer, Signal
+
+from qtpyvcp.utilities import logger
+from qtpyvcp.utilities.info import Info
+
+from .base_canon import StatCanon, PARSE_LOCK
+
+LOG = logger.getLogger(__name__)
+INFO = Info()
+
+# bump whenever the pickled format of ProgramAnalysis changes
+CACHE_VERSION = 2
+
+CACHE_DIR = os.path.join(os.getenv('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'),
+                         'qtpyvcp', 'program_analysis')
+
+
+# segment types are stored as uint8 codes, the index into this tuple
+LINE_TYPES = ('traverse', 'feed', 'arcfeed', 'dwell', 'user')
+LINE_TYPE_CODES = {name: code for code, name in enumerate(LINE_TYPES)}
+
+TRAVERSE = LINE_TYPE_CODES['traverse']
+FEED = LINE_TYPE_CODES['feed']
+ARCFEED = LINE_TYPE_CODES['arcfeed']
+
+
+class SegmentBuffer(object):
+    """Growable, preallocated NumPy storage for motion segments.
+
+    Segments are kept as a uint8 array of :data:`LINE_TYPES` codes and two
+    ``(N, 9)`` float64 arrays of start and end points. Capacity doubles as
+    needed, so appending is amortized O(1) without per segment objects.
+
+    Args:
+        capacity (int) : Number of segments to preallocate.
+    """
+
+    def __init__(self, capacity=256):
+        capacity = max(1, capacity)
+        self.count = 0
+        self._types = np.empty(capacity, dtype=np.uint8)
+        self._starts = np.empty((capacity, 9), dtype=np.float64)
+        self._ends = np.empty((capacity, 9), dtype=np.float64)
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        """Iterate ``(line_type, start_point, end_point)`` tuples."""
+        for code, start, end in zip(self.types, self.starts, self.ends):
+            yield LINE_TYPES[code], tuple(start), tuple(end)
+
+    @property
+    def types(self):
+        return self._types[:self.count]
+
+    @property
+    def starts(self):
+        return self._starts[:self.count]
+
+    @property
+    def ends(self):
+        return self._ends[:self.count]
+
+    def _resize(self, capacity):
+        count = self.count
+        for name in ('_types', '_starts', '_ends'):
+            old = getattr(self, name)
+            new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:count] = old[:count]
+            setattr(self, name, new)
+
+    def reserve(self, extra):
+        """Make room for at least ``extra`` more segments."""
+        needed = self.count + extra
+        capacity = len(self._types)
+        if needed > capacity:
+            while capacity < needed:
+                capacity *= 2
+            self._resize(capacity)
+
+    def append(self, type_code, start_point, end_point):
+        n = self.count
+        if n == len(self._types):
+            self.reserve(1)
+
+        self._types[n] = type_code
+        self._starts[n] = start_point
+        self._ends[n] = end_point
+        self.count = n + 1
+
+    def extend(self, types, starts, ends):
+        n = self.count
+        size = len(types)
+        self.reserve(size)
+
+        self._types[n:n + size] = types
+        self._starts[n:n + size] = starts
+        self._ends[n:n + size] = ends
+        self.count = n + size
+
+    def trim(self):
+        """Release unused capacity."""
+        if len(self._types) != self.count:
+            self._resize(max(1, self.count))
+
+    def __getstate__(self):
+        return self.types.copy(), self.starts.copy(), self.ends.copy()
+
+    def __setstate__(self, state):
+        self._types, self._starts, self._ends = state
+        self.count = len(self._types)
+
+
+class MotionRun(object):
+    """Consecutive motion segments that share the same offset context.
+
+    Args:
+        g5x_index (int) : LinuxCNC G5x index (G53 is 0), or None before the
+            interpreter has set an offset.
+        g5x_offset (tuple) : The 9 axis G5x offset.
+        rotation_xy (float) : The G5x XY rotation in degrees. Segments are
+            recorded unrotated, consumers apply the rotation as needed.
+        tool_offsets (tuple) : The 9 axis tool length offset.
+    """
+    __slots__ = ('g5x_index', 'g5x_offset', 'rotation_xy', 'tool_offsets', 'segments')
+
+    def __init__(self, g5x_index=None, g5x_offset=(0.0,) * 9, rotation_xy=0.0,
+                 tool_offsets=(0.0,) * 9):
+        self.g5x_index = g5x_index
+        self.g5x_offset = g5x_offset
+        self.rotation_xy = rotation_xy
+        self.tool_offsets = tool_offsets
+
+        self.segments = SegmentBuffer()
+
+
+class ProgramAnalysis(object):
+    """The result of interpreting a G-code program once."""
+
+    def __init__(self, key, file_path):
+        self.cache_version = CACHE_VERSION
+        self.key = key
+        self.file_path = file_path
+
+        self.runs = []
+
+        self.num_lines = 0
+        self.tool_calls = 0
+        self.tools = []
+        self.work_planes = []
+        self.rigid_taps = []
+        self.g5x_offsets = dict()
+        self.dwell_time = 0.0
+
+        self.foam_z = 0.0
+        self.foam_w = 0.0
+
+        # interpreter result
+        self.result = 0
+        self.seq = 0
+        self.error = None
+
+        # summary, filled in by summarize()
+        self.min_extents = [0.0, 0.0, 0.0]
+        self.max_extents = [0.0, 0.0, 0.0]
+        self.rapid_distance = 0.0
+        self.feed_distance = 0.0
+
+    def summarize(self):
+        """Compute the extents and travel distances of the program.
+
+        Points are rotated by their run's XY rotation, so the summary is
+        in the same coordinates the interpreter commanded.
+        """
+        min_extents = np.full(3, 9e99)
+        max_extents = np.full(3, -9e99)
+        rapid = 0.0
+        feed = 0.0
+
+        for run in self.runs:
+            types = run.segments.types
+            moves = types <= ARCFEED
+            if not moves.any():
+                continue
+
+            starts = run.segments.starts[moves, :3]
+            ends = run.segments.ends[moves, :3]
+
+            if run.rotation_xy:
+                theta = math.radians(run.rotation_xy)
+                rotation = np.array([[math.cos(theta), math.sin(theta)],
+                                     [-math.sin(theta), math.cos(theta)]])
+                origin = np.asarray(run.g5x_offset[:2])
+                starts = starts.copy()
+                ends = ends.copy()
+                starts[:, :2] = (starts[:, :2] - origin) @ rotation + origin
+                ends[:, :2] = (ends[:, :2] - origin) @ rotation + origin
+
+            # traverses before the first feed after the start or a tool offset
+            # change are never recorded, so they don't count as rapid distance
+            lengths = np.linalg.norm(ends - starts, axis=1)
+            traverse = types[moves] == TRAVERSE
+            rapid += float(lengths[traverse].sum())
+            feed += float(lengths[~traverse].sum())
+
+            min_extents = np.minimum(min_extents, np.minimum(starts.min(axis=0), ends.min(axis=0)))
+            max_extents = np.maximum(max_extents, np.maximum(starts.max(axis=0), ends.max(axis=0)))
+
+        if min_extents[0] <= max_extents[0]:
+            self.min_extents = min_extents.tolist()
+            self.max_extents = max_extents.tolist()
+
+        self.rapid_distance = rapid
+        self.feed_distance = feed
+
+
+class AnalysisCanon(StatCanon):
+    """Canon that records the interpreter output into a ProgramAnalysis."""
+
+    def __init__(self, analysis, progress_callback=None, *args, **kwargs):
+        super(AnalysisCanon, self).__init__(*args, **kwargs)
+
+        self.analysis = analysis
+        self.aborted = False
+        self.total_lines = 0
+
+        self._progress_callback = progress_callback
+        self._last_progress = -1
+
+        self._g5x_index = None
+        self._rotation = 0.0
+        self._run = None
+        self._newRun()
+
+    def _newRun(self):
+        run = self._run
+        if run is None or run.segments:
+            run = MotionRun()
+            self.analysis.runs.append(run)
+            self._run = run
+
+        run.g5x_index = self._g5x_index
+        run.g5x_offset = (self.g5x_offset_x, self.g5x_offset_y, self.g5x_offset_z,
+                          self.g5x_offset_a, self.g5x_offset_b, self.g5x_offset_c,
+                          self.g5x_offset_u, self.g5x_offset_v, self.g5x_offset_w)
+        run.rotation_xy = self._rotation
+        run.tool_offsets = tuple(self.tool_offsets)
+
+    def check_abort(self):
+        return self.aborted
+
+    def next_line(self, st):
+        super(AnalysisCanon, self).next_line(st)
+        self.analysis.num_lines += 1
+
+        if self._progress_callback is not None and self.total_lines:
+            percent = min(99, self.analysis.num_lines * 100 // self.total_lines)
+            if percent != self._last_progress:
+                self._last_progress = percent
+                self._progress_callback(percent)
+
+    def comment(self, comment):
+        items = comment.lower().split(',', 1)
+        if len(items) > 1 and items[0] in ['axis', 'backplot']:
+            cmd = items[1].strip()
+            if cmd == "hide":
+                self.suppress += 1
+            elif cmd == "show":
+                self.suppress -= 1
+            elif cmd == 'stop':
+                LOG.info("Program analysis stopped by G-code comment.")
+                raise KeyboardInterrupt
+            elif cmd.startswith("xy_z_pos"):
+                self.analysis.foam_z = float(cmd.split(',')[1])
+            elif cmd.startswith("uv_z_pos"):
+                self.analysis.foam_w = float(cmd.split(',')[1])
+
+    def set_g5x_offset(self, index, x, y, z, a, b, c, u, v, w):
+        super(AnalysisCanon, self).set_g5x_offset(index, x, y, z, a, b, c, u, v, w)
+        self.analysis.g5x_offsets[str(index)] = (x, y, z, a, b, c, u, v, w)
+        self._g5x_index = index
+        self._newRun()
+
+    def set_xy_rotation(self, rotation):
+        # record the rotation but leave the points unrotated, the backplot
+        # applies the WCS rotation with a VTK transform
+        self._rotation = rotation
+        self._newRun()
+
+    def tool_offset(self, xo, yo, zo, ao, bo, co, uo, vo, wo):
+        super(AnalysisCanon, self).tool_offset(xo, yo, zo, ao, bo, co, uo, vo, wo)
+        self._newRun()
+
+    def set_plane(self, plane):
+        super(AnalysisCanon, self).set_plane(plane)
+        self.analysis.work_planes.append(plane)
+
+    def change_tool(self, pocket):
+        super(AnalysisCanon, self).change_tool(pocket)
+        if pocket != -1:
+            self.analysis.tool_calls += 1
+            if pocket not in self.analysis.tools:
+                self.analysis.tools.append(pocket)
+
+    def rigid_tap(self, x, y, z):
+        if self.suppress > 0:
+            return
+
+        self.analysis.rigid_taps.append((x, y, z))
+        super(AnalysisCanon, self).rigid_tap(x, y, z)
+
+    def dwell(self, arg):
+        super(AnalysisCanon, self).dwell(arg)
+        self.analysis.dwell_time = self.dwell_time
+
+    def add_path_point(self, line_type, start_point, end_point):
+        self._run.segments.append(LINE_TYPE_CODES[line_type], start_point, end_point)
+
+
+class AnalysisJob(QObject):
+    """A single interpreter run, shared by everyone asking for the same key.
+
+    The ``progress`` and ``finished`` signals may be emitted from a worker
+    thread, so they must be connected to methods of QObjects living in the
+    GUI thread for the slots to be called there.
+    """
+
+    # (job, percent)
+    progress = Signal(object, int)
+    # (job, ProgramAnalysis or None if cancelled or failed)
+    finished = Signal(object, object)
+
+    def __init__(self, analyzer, key, file_path, unitcode, initcode):
+        super(AnalysisJob, self).__init__()
+
+        self.analyzer = analyzer
+        self.key = key
+        self.file_path = file_path
+        self.unitcode = unitcode
+        self.initcode = initcode
+
+        self.aborted = False
+        self.analysis = None
+        self.canon = None
+
+        self._done = threading.Event()
+        self._thread = None
+
+    def isDone(self):
+        return self._done.is_set()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name='program-analysis', daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        """Request the interpreter to stop at the next line."""
+        self.aborted = True
+        canon = self.canon
+        if canon is not None:
+            canon.aborted = True
+
+    def wait(self):
+        """Block until the job is done and return its analysis."""
+        self._done.wait()
+        return self.analysis
+
+    def reportProgress(self, percent):
+        self.progress.emit(self, percent)
+
+    def run(self):
+        try:
+            self.analysis = self.analyzer._execute(self)
+        except Exception:
+            LOG.exception("Error analysing program %s", self.file_path)
+            self.analysis = None
+
+        self._done.set()
+        self.finished.emit(self, self.analysis)
+
+
+class ProgramAnalyzer(object):
+    """Ensures only one ProgramAnalyzer exists per python interpreter."""
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = _ProgramAnalyzer()
+        return cls._instance
+
+
+class _ProgramAnalyzer(object):
+
+    def __init__(self, memory_cache_size=2, disk_cache_size=20):
+        super(_ProgramAnalyzer, self).__init__()
+
+        inifile = os.getenv("INI_FILE_NAME")
+        self.inifile = inifile
+        self.ini = linuxcnc.ini(inifile)
+        self.config_dir = os.path.dirname(inifile)
+
+        self.stat = linuxcnc.stat()
+
+        temp = self.ini.find("EMCIO", "RANDOM_TOOLCHANGER")
+        self.random = int(temp or 0)
+
+        temp = self.ini.find("DISPLAY", "GEOMETRY") or 'XYZ'
+        self.geometry = temp.upper()
+
+        temp = self.ini.find("RS274NGC", "PARAMETER_FILE") or "linuxcnc.var"
+        self.parameter_file = os.path.join(self.config_dir, temp)
+        self.temp_parameter_file = os.path.join(self.parameter_file + '.analysis.temp')
+
+        self.subroutine_dirs = INFO.getSubroutineSearchDirs()
+
+        self.memory_cache_size = memory_cache_size
+        self.disk_cache_size = disk_cache_size
+
+        self._cache = OrderedDict()
+        self._jobs = dict()
+        self._lock = threading.Lock()
+
+    def analyze(self, file_path):
+        """Analyse a program, blocking until the result is available.
+
+        If the same program is already being analysed in the background
+        this waits for that job instead of interpreting it a second time.
+
+        Args:
+            file_path (str) : The G-code file to analyse.
+
+        Returns:
+            ProgramAnalysis, or None if the analysis failed.
+        """
+        key, unitcode, initcode = self._prepare(file_path)
+
+        analysis = self._fromMemory(key)
+        if analysis is not None:
+            return analysis
+
+        with self._lock:
+            job = self._jobs.get(key)
+
+        if job is not None:
+            analysis = job.wait()
+            if analysis is not None:
+                return analysis
+
+        job = self._newJob(key, file_path, unitcode, initcode)
+        job.run()
+        return job.analysis
+
+    def analyzeAsync(self, file_path, finished, progress=None):
+        """Analyse a program in a worker thread.
+
+        Args:
+            file_path (str) : The G-code file to analyse.
+            finished (callable) : Slot called with ``(job, analysis)``.
+            progress (callable, optional) : Slot called with ``(job, percent)``.
+
+        Returns:
+            AnalysisJob
+        """
+        key, unitcode, initcode = self._prepare(file_path)
+
+        with self._lock:
+            job = self._jobs.get(key)
+            # a job is only removed from the list right before it emits
+            # finished, so connecting while holding the lock can't miss it
+            if job is not None and not job.aborted:
+                job.finished.connect(finished)
+                if progress is not None:
+                    job.progress.connect(progress)
+                return job
+
+        analysis = self._fromMemory(key)
+        if analysis is not None:
+            job = AnalysisJob(self, key, file_path, unitcode, initcode)
+            job.analysis = analysis
+            job._done.set()
+            job.finished.connect(finished)
+            # emit from the event loop so the caller has the job first
+            QTimer.singleShot(0, lambda: job.finished.emit(job, analysis))
+            return job
+
+        job = self._newJob(key, file_path, unitcode, initcode)
+        job.finished.connect(finished)
+        if progress is not None:
+            job.progress.connect(progress)
+
+        job.start()
+        return job
+
+    def clearCache(self):
+        """Drop all cached analyses, in memory and on disk."""
+        with self._lock:
+            self._cache.clear()
+        shutil.rmtree(CACHE_DIR, ignore_errors=True)
+
+    def _newJob(self, key, file_path, unitcode, initcode):
+        job = AnalysisJob(self, key, file_path, unitcode, initcode)
+        with self._lock:
+            # only one interpreter, so stop working on anything else
+            for other in self._jobs.values():
+                other.cancel()
+            self._jobs[key] = job
+        return job
+
+    def _prepare(self, file_path):
+        file_path = os.path.abspath(file_path)
+
+        self.stat.poll()
+
+        # Some initialization g-code to set the units and optional user code
+        unitcode = "G%d" % (20 + (self.stat.linear_units == 1))
+        initcode = self.ini.find("RS274NGC", "RS274NGC_STARTUP_CODE") or ""
+
+        return self._cacheKey(file_path, unitcode, initcode), unitcode, initcode
+
+    def _cacheKey(self, file_path, unitcode, initcode):
+        fstat = os.stat(file_path)
+
+        sha = hashlib.sha1()
+        sha.update(repr((CACHE_VERSION, self.inifile, file_path,
+                         fstat.st_mtime_ns, fstat.st_size, unitcode, initcode,
+                         self.stat.axis_mask, self.stat.block_delete,
+                         self.random)).encode())
+
+        if os.path.exists(self.parameter_file):
+            with open(self.parameter_file, 'rb') as fh:
+                sha.update(fh.read())
+
+        sha.update(repr(tuple(tuple(tool) for tool in self.stat.tool_table)).encode())
+
+        # called subroutines affect the result without touching the program
+        for sub_dir in self.subroutine_dirs:
+            try:
+                entries = sorted(os.scandir(sub_dir), key=lambda e: e.name)
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.name.lower().endswith('.ngc'):
+                    sha.update(repr((entry.path, entry.stat().st_mtime_ns)).encode())
+
+        return sha.hexdigest()
+
+    def _fromMemory(self, key):
+        with self._lock:
+            analysis = self._cache.get(key)
+            if analysis is not None:
+                self._cache.move_to_end(key)
+            return analysis
+
+    def _remember(self, analysis):
+        with self._lock:
+            self._cache[analysis.key] = analysis
+            self._cache.move_to_end(analysis.key)
+            while len(self._cache) > self.memory_cache_size:
+                self._cache.popitem(last=False)
+
+    def _execute(self, job):
+        """Produce the analysis for a job, from disk or by interpreting."""
+        try:
+            analysis = self._fromMemory(job.key) or self._loadCached(job.key)
+            if analysis is None and not job.aborted:
+                analysis = self._interpret(job)
+                if analysis is not None:
+                    self._storeCached(analysis)
+
+            if analysis is not None:
+                self._remember(analysis)
+
+            return analysis
+
+        finally:
+            with self._lock:
+                if self._jobs.get(job.key) is job:
+                    del self._jobs[job.key]
+
+    def _interpret(self, job):
+        analysis = ProgramAnalysis(job.key, job.file_path)
+
+        canon = AnalysisCanon(analysis, job.reportProgress,
+                              geometry=self.geometry, random=self.random)
+        job.canon = canon
+        if job.aborted:
+            return None
+
+        canon.total_lines = self._countLines(job.file_path)
+
+        with PARSE_LOCK:
+            if canon.aborted:
+                return None
+
+            if os.path.exists(self.parameter_file):
+                shutil.copy(self.parameter_file, self.temp_parameter_file)
+
+            canon.parameter_file = self.temp_parameter_file
+
+            # THIS IS WHERE IT ALL HAPPENS: load_preview will execute the code,
+            # call back to the canon with motion commands, and record a history
+            # of all the movements.
+            try:
+                result, seq = gcode.parse(job.file_path, canon, job.unitcode, job.initcode)
+
+                analysis.result = result
+                analysis.seq = seq
+                if result > gcode.MIN_ERROR:
+                    analysis.error = gcode.strerror(result)
+                    LOG.debug(f"Error in {job.file_path} line {seq - 1}\n{analysis.error}")
+
+            except KeyboardInterrupt:
+                # raised by check_abort or an (AXIS, stop) comment
+                pass
+            finally:
+                # clean up temp var file and the backup
+                for fname in (self.temp_parameter_file, self.temp_parameter_file + '.bak'):
+                    if os.path.exists(fname):
+                        os.unlink(fname)
+
+        if canon.aborted:
+            return None
+
+        for run in analysis.runs:
+            run.segments.trim()
+
+        analysis.summarize()
+        return analysis
+
+    @staticmethod
+    def _countLines(file_path):
+        lines = 0
+        with open(file_path, 'rb') as fh:
+            for chunk in iter(lambda: fh.read(1 << 20), b''):
+                lines += chunk.count(b'\n')
+        return lines
+
+    def _loadCached(self, key):
+        if not self.disk_cache_size:
+            return None
+
+        fname = os.path.join(CACHE_DIR, key + '.pickle')
+        if not os.path.isfile(fname):
+            return None
+
+        try:
+            with open(fname, 'rb') as fh:
+                analysis = pickle.load(fh)
+        except Exception:
+            LOG.debug("Discarding unreadable program analysis cache %s", fname)
+            os.unlink(fname)
+            return None
+
+        if getattr(analysis, 'cache_version', None) != CACHE_VERSION or analysis.key != key:
+            return None
+
+        # touch so pruning keeps recently used entries
+        os.utime(fname)
+        LOG.debug("Loaded program analysis from cache: %s", analysis.file_path)
+        return analysis
+
+    def _storeCached(self, analysis):
+        if not self.disk_cache_size:
+            return
+
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+
+            fname = os.path.join(CACHE_DIR, analysis.key + '.pickle')
+            with open(fname + '.tmp', 'wb') as fh:
+                pickle.dump(analysis, fh, pickle.HIGHEST_PROTOCOL)
+            os.replace(fname + '.tmp', fname)
+
+            entries = sorted((e for e in os.scandir(CACHE_DIR) if e.name.endswith('.pickle')),
+                             key=lambda e: e.stat().st_mtime, reverse=True)
+            for entry in entries[self.disk_cache_size:]:
+                os.unlink(entry.path)
+
+        except OSError:
+            LOG.warning("Failed to write program analysis cache", exc_info=True)
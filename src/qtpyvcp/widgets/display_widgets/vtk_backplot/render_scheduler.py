@@ -0,0 +1,138 @@
+"""
+Render Scheduler
+----------------
+
+Single point through which the backplot asks for renders.
+
+Every part of the backplot that changes something visible (position, offsets,
+tool, view, program) calls :meth:`RenderScheduler.request` with a short source
+name. Requests are coalesced into at most one render per frame, capped at the
+target frame rate, so several changes arriving in the same status cycle cost a
+single render. Nothing is rendered while no requests arrive, so an idle machine
+with a still camera does not use the GPU at all.
+
+The scheduler keeps counters that can be read with :meth:`RenderScheduler.stats`
+to check how often and how expensively the backplot is drawing.
+"""
+
+import time
+
+from collections import defaultdict
+
+from qtpy.QtCore import QObject, QTimer
+
+from qtpyvcp.utilities import logger
+
+LOG = logger.getLogger(__name__)
+
+
+class RenderScheduler(QObject):
+    """Frame rate capped, coalescing render scheduler.
+
+    Args:
+        render (callable) : Called with the set of dirty source names to
+            perform the actual render.
+        fps (int) : Maximum number of scheduled renders per second.
+        parent (QObject) : Parent object.
+    """
+
+    def __init__(self, render, fps=30, parent=None):
+        super(RenderScheduler, self).__init__(parent)
+
+        self._render = render
+        self._dirty = set()
+        self._last_frame = 0.0
+
+        self.frame_interval = 1.0 / max(int(fps), 1)
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._renderPending)
+
+        self.resetStats()
+
+    def request(self, source='view'):
+        """Request a render on the next frame.
+
+        Args:
+            source (str) : Name of what changed, used for the counters.
+        """
+        self._requests[source] += 1
+
+        if self._dirty:
+            self._coalesced += 1
+        self._dirty.add(source)
+
+        if self._timer.isActive():
+            return
+
+        delay = self._last_frame + self.frame_interval - time.monotonic()
+        self._timer.start(max(0, int(delay * 1000)))
+
+    def renderNow(self, source='interactive'):
+        """Render immediately, folding in anything already pending.
+
+        Used for camera interaction where latency matters more than the cap.
+        """
+        self._requests[source] += 1
+        self._timer.stop()
+        self._dirty.add(source)
+        self._renderPending()
+
+    def isPending(self):
+        """True if a render has been requested but not done yet."""
+        return bool(self._dirty)
+
+    def cancel(self):
+        """Drop any pending render."""
+        self._timer.stop()
+        self._dirty = set()
+
+    def _renderPending(self):
+        sources = self._dirty
+        self._dirty = set()
+
+        start = time.monotonic()
+        try:
+            self._render(sources)
+        except Exception:
+            LOG.exception("Error rendering backplot")
+        duration = time.monotonic() - start
+
+        self._last_frame = start
+        self._frames += 1
+        self._render_time += duration
+        self._max_render_time = max(self._max_render_time, duration)
+
+    def stats(self):
+        """Render counters since the last :meth:`resetStats`.
+
+        Returns:
+            dict : frames, requests, coalesced requests, requests per source,
+                average and maximum render time (ms), achieved frames per
+                second and process CPU time used (s).
+        """
+        elapsed = max(time.monotonic() - self._stats_start, 1e-6)
+        frames = self._frames
+
+        return {
+            'frames': frames,
+            'requests': sum(self._requests.values()),
+            'coalesced': self._coalesced,
+            'sources': dict(self._requests),
+            'avg_render_ms': (self._render_time / frames * 1000.0) if frames else 0.0,
+            'max_render_ms': self._max_render_time * 1000.0,
+            'fps': frames / elapsed,
+            'cpu_time': time.process_time() - self._cpu_start,
+            'elapsed': elapsed,
+        }
+
+    def resetStats(self):
+        """Zero all counters."""
+        self._frames = 0
+        self._coalesced = 0
+        self._requests = defaultdict(int)
+        self._render_time = 0.0
+        self._max_render_time = 0.0
+        self._stats_start = time.monotonic()
+        self._cpu_start = time.process_time()
@@ -60,6 +60,7 @@ from .table_actor import TableActor
 from .spindle_actor import SpindleActor
 from .machine_actor import MachineCubeActor, MachineLineActor, MachinePartsASM
 from .path_cache_actor import PathCacheActor
+from .render_scheduler import RenderScheduler
 from .program_bounds_actor import ProgramBoundsActor
 from .vtk_canon import VTKCanon, COLOR_MAP
 from .linuxcnc_datasource import LinuxCncDataSource
@@ -262,9 +263,9 @@ class VTKBackPlot(QVTKRenderWindowInteractor, VCPWidget, BaseBackPlot):
             # Ensure this widget does not keep focus after mouse clicks
             self.setFocusPolicy(Qt.NoFocus)
 
-        self.current_time = round(time.time() * 1000)
-        self.plot_interval = 1000/self._datasource.getFPS()  # 1 second / 30 fps
-        self.prev_plot_time = 0
+        # all renders go through the scheduler, capped at FPS and coalesced
+        self._render_scheduler = RenderScheduler(self._render_sources, self._datasource.getFPS(), self)
+        self._pending_position = None
         
         self.parent = parent
         self.ploter_enabled = True
@@ -299,8 +300,7 @@ class VTKBackPlot(QVTKRenderWindowInteractor, VCPWidget, BaseBackPlot):
         self.rotating = 0
         self.panning = 0
         self.zooming = 0
-        self._render_scheduled = False
-        
+
         self.machine_parts = None
         self.machine_parts_data = None
         
@@ -341,6 +341,7 @@ class VTKBackPlot(QVTKRenderWindowInteractor, VCPWidget, BaseBackPlot):
         self.original_g5x_offset = [0.0] * NUMBER_OF_WCS
         self.original_g92_offset = [0.0] * NUMBER_OF_WCS
 
+        self._tool_transform = vtk.vtkTransform()
         self.spindle_position = (0.0, 0.0, 0.0)
         self.spindle_rotation = (0.0, 0.0, 0.0)
         self.tooltip_position = (0.0, 0.0, 0.0)
@@ -390,6 +391,22 @@ class VTKBackPlot(QVTKRenderWindowInteractor, VCPWidget, BaseBackPlot):
         self.interactor = self.renderer_window.GetInteractor()
         self.interactor.SetInteractorStyle(self.nav_style)
         self.interactor.render_window = self.renderer_window
+
+        # camera moves render at the desired update rate so the path actors
+        # can fall back to their decimated LODs, once the camera has settled
+        # a still frame is rendered at full resolution
+        self.interactive_update_rate = float(self._datasource.getFPS())
+        self.still_update_rate = self.renderer_window.GetDesiredUpdateRate()
+        self._still_render_timer = QTimer(self)
+        self._still_render_timer.setSingleShot(True)
+        self._still_render_timer.setInterval(250)
+        self._still_render_timer.timeout.connect(self._render_still)
+
+        stats_interval = self._datasource.getRenderStatsInterval()
+        if stats_interval > 0:
+            self._render_stats_timer = QTimer(self)
+            self._render_stats_timer.timeout.connect(self._log_render_stats)
+            self._render_stats_timer.start(int(stats_interval * 1000))
         # self.interactor.SetRenderWindow(self.renderer_window)
         
         if self._datasource.getAntialias() in ["true", "True", "TRUE", 1, "1"]:
@@ -420,7 +437,7 @@ class VTKBackPlot(QVTKRenderWindowInteractor, VCPWidget, BaseBackPlot):
             # Machine-space transform intentionally not applied to global axes actor.
             # self.axes_actor.SetUserTransform(transform)
             self.path_actors = OrderedDict()
-            self.path_cache_actor = PathCacheActor(self.tooltip_position)
+            self.path_cache_actor = self._new_path_cache_actor()
 
             self.points_surface_actor = PointsSurfaceActor(self._datasource)
 
@@ -775,20 +792,25 @@ class VTKBackPlot(QVTKRenderWindowInteractor, VCPWidget, BaseBackPlot):
         self.offset_axes.clear()
         self.program_bounds_actors.clear()
 
-        start_time = time.time()
+        self._load_start_time = time.time()
 
         if fname:
             # create the object which handles the canonical motion callbacks
             # (straight_feed, straight_traverse, arc_feed, rigid_tap, etc.)
             self.canon = VTKCanon(colors=self.path_colors)
+            # the program is drawn in program_loaded() once it is analysed
             self.load(fname)
         else:
             self._datasource._status.removeLock()
+
+    def program_loaded(self, success):
+        if not success:
+            self._datasource._status.removeLock()
             return
 
         self.canon.draw_lines()
 
-        LOG.info("-------Draw time %s seconds ---" % (time.time() - start_time))
+        LOG.info("-------Draw time %s seconds ---" % (time.time() - self._load_start_time))
         self.path_actors = self.canon.get_path_actors()
         self.offset_transitions = self.canon.get_offset_transitions()
 
@@ -866,7 +888,7 @@ class VTKBackPlot(QVTKRenderWindowInteractor, VCPWidget, BaseBackPlot):
 
         self._rebuild_transition_actors(offset_columns)
         # self.renderer.AddActor(self.axes_actor)
-        self._request_render()
+        self._request_render('program')
         if self.program_view_when_loading_program:
             self.setViewProgram(self.program_view_when_loading_program_view)
 
@@ -893,15 +915,11 @@ class VTKBackPlot(QVTKRenderWindowInteractor, VCPWidget, BaseBackPlot):
             #     yield part
                     
     def update_position(self, position):  # the tool movement
-        
-        self.current_time = round(time.time() * 1000)
-        
-        if self.current_time - self.prev_plot_time >= self.plot_interval:
-            self.prev_plot_time = self.current_time
-        else:
-            return
-        
-        
+        # only the newest position is drawn, once per frame
+        self._pending_position = position
+        self._request_render('position')
+
+    def _apply_position(self, position):
         # Plots the movement of the tool and leaves a trace line
         
         if 0 <= self.active_wcs_index < len(self.wcs_offsets):
@@ -919,37 +937,18 @@ class VTKBackPlot(QVTKRenderWindowInteractor, VCPWidget, BaseBackPlot):
         self.spindle_rotation = position[3:6]
         
 
-        tool_transform = vtk.vtkTransform()
+        tool_transform = self._tool_transform
+        tool_transform.Identity()
         tool_transform.Translate(*self.spindle_position)
-        #tool_transform.RotateX(-self.spindle_rotation[0])
-        #tool_transform.RotateY(-self.spindle_rotation[1])
-        #tool_transform.RotateZ(-self.spindle_rotation[2])
-        
 
         if self.spindle_model:
             self.spindle_actor.SetUserTransform(tool_transform)
 
         if self._plot_machine:
             if self.machine_parts:
-
-
-                # self.machine_parts_actor.InitPathTraversal()
-                # parts = self.machine_parts_actor.GetParts()
-                
-                self.machine_parts_actor.InitPathTraversal()
-                for part in self.get_asm_parts(self.machine_parts_actor):
-                    # part_prop = path.GetViewProp()
-                    # if isinstance(part, vtk.vtkActor):
-                    #    self.move_part(part)
-                    if isinstance(part, vtk.vtkAssembly):
-                        self.move_part(part)
-                    #
-
-                        # for p in part.GetParts():
-                        #     if isinstance(p, vtk.vtkActor):
-                        #         self.move_part(p)
-                        #     # if isinstance(p, vtk.vtkAssembly):
-                            #     self.move_part(p)
+                # only parts whose driving axis changed are touched
+                for part in self.machine_parts_actor.moving_parts:
+                    part.update(self.spindle_position, self.spindle_rotation)
 
         self.tool_actor.SetUserTransform(tool_transform)
 
@@ -972,85 +971,9 @@ class VTKBackPlot(QVTKRenderWindowInteractor, VCPWidget, BaseBackPlot):
 
         if self.breadcrumbs_plotted:
             self.path_cache_actor.add_line_point(self.tooltip_position)
-        self._request_render()
         
     def move_part(self, part):
-                
-        position = part.GetPartPosition()
-        
-        part_axis = part.GetPartAxis()
-        part_type = part.GetPartType()
-
-
-        part_transform = vtk.vtkTransform()  
-        
-        if part_type == "linear":
-
-            #part_position = self.joints[part_joint].input.value
-            
-            # if part_axis == "x":
-            #     part.SetPosition(self.spindle_position[0], 0, 0)
-            # elif part_axis == "y":
-            #     part.SetPosition(0, self.spindle_position[1], 0)
-            # elif part_axis == "z":
-            #     part.SetPosition(0, 0, self.spindle_position[2])
-            # elif part_axis == "-x":
-            #     part.SetPosition(-self.spindle_position[0], 0, 0)
-            # elif part_axis == "-y":
-            #     part.SetPosition(0, -self.spindle_position[1], 0)
-            # elif part_axis == "-z":
-            #     part.SetPosition(0, 0, -self.spindle_position[2])
-                
-            if part_axis == "x":
-                part_transform.Translate(self.spindle_position[0], 0, 0)
-            elif part_axis == "y":
-                part_transform.Translate(0, self.spindle_position[1], 0)
-            elif part_axis == "z":
-                part_transform.Translate(0, 0, self.spindle_position[2])
-            elif part_axis == "-x":
-                part_transform.Translate(-self.spindle_position[0], 0, 0)
-            elif part_axis == "-y":
-                part_transform.Translate(0, -self.spindle_position[1], 0)
-            elif part_axis == "-z":
-                part_transform.Translate(0, 0, -self.spindle_position[2])
-            
-
-        elif part_type == "angular":
-            
-            # part_position = self.joints[part_joint].input.value
-            
-            # if part_axis == "a":
-            #     part.SetOrientation(self.spindle_rotation[0], 0, 0)
-            # elif part_axis== "b":
-            #     part.SetOrientation(0, self.spindle_rotation[1], 0)
-            # elif part_axis == "c":
-            #     part.SetOrientation(0, 0, self.spindle_rotation[2])
-            # elif part_axis == "-a":
-            #     part.SetOrientation(-self.spindle_rotation[0], 0, 0)
-            # elif part_axis == "-b":
-            #     part.SetOrientation(0, -self.spindle_rotation[1], 0)
-            # elif part_axis == "-c":
-            #     part.SetOrientation(0, 0, -self.spindle_rotation[2])
- 
-            part_transform.Translate(position[0], position[1], position[2])
-            
-            if part_axis == "a":
-                part_transform.RotateX(self.spindle_rotation[0])
-            elif part_axis== "b":
-                part_transform.RotateY(self.spindle_rotation[1])
-            elif part_axis == "c":
-                part_transform.RotateZ(self.spindle_rotation[2])
-            elif part_axis == "-a":
-                part_transform.RotateX(-self.spindle_rotation[0])
-            elif part_axis == "-b":
-                part_transform.RotateY(-self.spindle_rotation[1])
-            elif part_axis == "-c":
-                part_transform.RotateZ(-self.spindle_rotation[2])  
-            
-            part_transform.Translate(-position[0], -position[1], -position[2])
-            
-        part.SetUserTransform(part_transform)
-        
+        part.update(self.spindle_position, self.spindle_rotation)
 
     def update_joints(self, joints):
         self.joints = joints
@@ -1134,7 +1057,7 @@ class VTKBackPlot(QVTKRenderWindowInteractor, VCPWidget, BaseBackPlot):
         if len(self.path_actors) > 1:
             self._update_transition_actors(self.offsetTableColumnsIndex)
 
-        self._request_render()
+        self._request_render('offsets')
         
     def update_g5x_index(self, index):
         self.active_wcs_index = index
@@ -1170,7 +1093,7 @@ class VTKBackPlot(QVTKRenderWindowInteractor, VCPWidget, BaseBackPlot):
 
                 self._sync_program_bounds_actor(wcs_index, actor)
 
-            self._request_render()
+            self._request_render('offsets')
 
     def update_tool(self):
         self.renderer.RemoveActor(self.tool_actor)
@@ -1197,7 +1120,7 @@ class VTKBackPlot(QVTKRenderWindowInteractor, VCPWidget, BaseBackPlot):
         self.renderer.AddActor(self.tool_actor)
         self.renderer.AddActor(self.tool_bit_actor)
 
-        self._request_render()
+        self._request_render('tool')
 
     @Slot(bool)
     @Slot(object)
@@ -1505,23 +1428,69 @@ class VTKBackPlot(QVTKRenderWindowInteractor, VCPWidget, BaseBackPlot):
         self.camera.SetClippingRange(self.clipping_range_near, self.clipping_range_far)
         self._request_render()
 
-    def _render_now(self):
-        self._render_scheduled = False
+    def _render_sources(self, sources):
+        # apply the newest tool position once per frame, however many
+        # position updates arrived since the last one
+        if self._pending_position is not None:
+            position = self._pending_position
+            self._pending_position = None
+            self._apply_position(position)
+
+        # rebuild the path LODs for the current zoom once the camera settled
+        if not self._still_render_timer.isActive():
+            self._update_path_lods()
+
         self.renderer_window.Render()
 
-    def _request_render(self):
-        if self._render_scheduled:
+    def _render_now(self):
+        self._render_scheduler.renderNow('view')
+
+    def _update_path_lods(self):
+        height = self.renderer.GetSize()[1]
+        if height <= 0 or not self.path_actors:
             return
-        self._render_scheduled = True
-        QTimer.singleShot(0, self._render_now)
+
+        # size of a screen pixel at the focal point, in path units
+        if self.camera.GetParallelProjection():
+            view_height = 2.0 * self.camera.GetParallelScale()
+        else:
+            view_height = 2.0 * self.camera.GetDistance() * \
+                math.tan(math.radians(self.camera.GetViewAngle()) / 2.0)
+
+        pixel_size = view_height / height
+        for path_actor in self.path_actors.values():
+            path_actor.update_lods(pixel_size)
+
+    def _request_render(self, source='view'):
+        self._render_scheduler.request(source)
 
     def _render_frame(self, interactive=False):
         if interactive:
-            self._render_scheduled = False
-            self.renderer_window.Render()
+            self.renderer_window.SetDesiredUpdateRate(self.interactive_update_rate)
+            self._render_scheduler.renderNow('interactive')
+            self._still_render_timer.start()
             return
         self._request_render()
 
+    def _render_still(self):
+        self.renderer_window.SetDesiredUpdateRate(self.still_update_rate)
+        self._render_scheduler.renderNow('still')
+
+    def renderStats(self):
+        """Render scheduler counters, see :meth:`RenderScheduler.stats`."""
+        return self._render_scheduler.stats()
+
+    def resetRenderStats(self):
+        self._render_scheduler.resetStats()
+
+    def _log_render_stats(self):
+        stats = self._render_scheduler.stats()
+        LOG.info("Backplot: {frames} frames ({fps:.1f} fps), {requests} requests, "
+                 "{coalesced} coalesced, render {avg_render_ms:.1f} ms avg / "
+                 "{max_render_ms:.1f} ms max, cpu {cpu_time:.2f} s in {elapsed:.1f} s"
+                 .format(**stats))
+        self._render_scheduler.resetStats()
+
     def _sync_program_bounds_actor(self, wcs_index, path_actor):
         program_bounds_actor = self.program_bounds_actors.get(wcs_index)
 
@@ -2021,12 +1990,17 @@ class VTKBackPlot(QVTKRenderWindowInteractor, VCPWidget, BaseBackPlot):
     def printView(self):
         pass
 
+    def _new_path_cache_actor(self):
+        return PathCacheActor(self.tooltip_position,
+                              max_points=self._datasource.getBreadcrumbMaxPoints(),
+                              min_distance=self._datasource.getBreadcrumbMinDistance())
+
     @Slot()
     def clearLivePlot(self):
         self.renderer.RemoveActor(self.path_cache_actor)
-        self.path_cache_actor = PathCacheActor(self.tooltip_position)
+        self.path_cache_actor = self._new_path_cache_actor()
         self.renderer.AddActor(self.path_cache_actor)
-        self._request_render()
+        self._request_render('live_plot')
 
     @Slot(bool)
     def enableBreadcrumbs(self, enable):
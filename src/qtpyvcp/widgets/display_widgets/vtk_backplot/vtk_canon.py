@@ -2,10 +2,15 @@ from collections import OrderedDict
 
 import math
 
+import numpy as np
+
 import vtk
 import vtk.qt
+from vtkmodules.util import numpy_support
+
 from .linuxcnc_datasource import LinuxCncDataSource
 from .path_actor import PathActor
+from .program_analysis import SegmentBuffer, LINE_TYPES, LINE_TYPE_CODES, TRAVERSE
 
 from qtpy.QtGui import QColor
 from qtpy.QtWidgets import QApplication
@@ -80,13 +85,13 @@ class VTKCanon(StatCanon):
         super().set_g5x_offset(index, x, y, z, a, b, c, u, v, w)
         new_wcs = index - 1  # this index counts also G53 so we need to do -1
         
-        if new_wcs not in list(self.path_points.keys()):
+        if new_wcs not in self.path_points:
             #self.path_actors[new_wcs] = PathActor(self._datasource)
-            self.path_points[new_wcs] = list()
+            self.path_points[new_wcs] = SegmentBuffer()
             self.initial_wcs_offsets[new_wcs] = (x, y, z, a, b, c, u, v, w)
 
         if len(self.path_segments) == 0 or self.path_segments[-1]['wcs_index'] != new_wcs:
-            self.path_segments.append({'wcs_index': new_wcs, 'lines': list()})
+            self.path_segments.append({'wcs_index': new_wcs, 'lines': SegmentBuffer()})
 
         self.active_wcs_index = new_wcs
 
@@ -97,46 +102,84 @@ class VTKCanon(StatCanon):
         self.rotation_sin = math.sin(theta)
 
 
-    def add_path_point(self, line_type, start_point, end_point):
-        # As the points come through with the active wcs offsets baked in
-        # remove them to allow vtk setusertransforms to work correctly.
-        # These transforms apply wcs offsets for us in VTK
+    def load_analysis(self, analysis):
+        """Build the path points from a shared program analysis.
+
+        Each recorded run is adjusted and appended as a whole, so no per
+        segment Python objects are created.
 
-        adj_start_point = list(start_point)
-        adj_end_point = list(end_point)
+        Args:
+            analysis (ProgramAnalysis) : the recorded interpreter output.
+        """
+        for run in analysis.runs:
+            if run.g5x_index is not None:
+                self.set_g5x_offset(run.g5x_index, *run.g5x_offset)
 
-        for i in range(9):
-            if i == 2:
-                adj_start_point[i] -= self.tool_offsets[i]
-                adj_end_point[i] -= self.tool_offsets[i]
-            else:
-                adj_start_point[i] += self.tool_offsets[i]
-                adj_end_point[i] += self.tool_offsets[i]
+            self.tool_offsets = run.tool_offsets
 
+            segments = run.segments
+            if len(segments) == 0:
+                continue
+
+            self._prepareActiveWcs()
+
+            adjustment = self._pointAdjustment()
+            starts = segments.starts + adjustment
+            ends = segments.ends + adjustment
+
+            self.path_points[self.active_wcs_index].extend(segments.types, starts, ends)
+            self.path_segments[-1]['lines'].extend(segments.types, starts, ends)
+
+        self.foam_z = analysis.foam_z
+        self.foam_w = analysis.foam_w
+
+    def _prepareActiveWcs(self):
         # check to see if active wcs is in the path_actor list.
-        if self.active_wcs_index not in list(self.path_actors.keys()):
+        if self.active_wcs_index not in self.path_actors:
             self.path_actors[self.active_wcs_index] = PathActor(self._datasource)
 
         if len(self.path_segments) == 0 or self.path_segments[-1]['wcs_index'] != self.active_wcs_index:
-            self.path_segments.append({'wcs_index': self.active_wcs_index, 'lines': list()})
+            self.path_segments.append({'wcs_index': self.active_wcs_index, 'lines': SegmentBuffer()})
 
-        for count, value in enumerate(self.initial_wcs_offsets[self.active_wcs_index]):
-            adj_start_point[count] -= value
-            adj_end_point[count] -= value
-        
+    def _pointAdjustment(self):
+        # As the points come through with the active wcs offsets baked in
+        # remove them to allow vtk setusertransforms to work correctly.
+        # These transforms apply wcs offsets for us in VTK
+        adjustment = np.array(self.tool_offsets, dtype=np.float64)
+        adjustment[2] = -adjustment[2]
+        adjustment -= self.initial_wcs_offsets[self.active_wcs_index]
+        return adjustment
+
+    def add_path_point(self, line_type, start_point, end_point):
+        self._prepareActiveWcs()
+
+        adjustment = self._pointAdjustment()
+        start_point = np.add(start_point, adjustment)
+        end_point = np.add(end_point, adjustment)
+        type_code = LINE_TYPE_CODES[line_type]
+
+        self.path_points[self.active_wcs_index].append(type_code, start_point, end_point)
+        self.path_segments[-1]['lines'].append(type_code, start_point, end_point)
 
-        line = [tuple(adj_start_point), tuple(adj_end_point)]
-        self.path_points.get(self.active_wcs_index).append((line_type, line))
-        self.path_segments[-1]['lines'].append((line_type, line))
+    def _colorTable(self):
+        return np.array([self.path_colors.get(line_type).getRgb()[:4]
+                         for line_type in LINE_TYPES], dtype=np.uint8)
 
     def draw_lines(self):
         # Used to draw the lines of the loaded program
         # Metric programs require this scale factor so VTK path points render in machine units.
         multiplication_factor = 25.4 if self._datasource.isMachineMetric() else 1
 
+        color_table = self._colorTable()
+        is_foam = self._datasource.isMachineFoam()
+
+        # decimated copies for interactive rendering, only worth it on big paths
+        lod_min_segments = self._datasource.getPathLodMinSegments()
+        build_lods = self._datasource.getPathLod() and not is_foam
+
         first_cut_wcs_index = None
         for segment in self.path_segments:
-            if any(line_type != "traverse" for line_type, _ in segment['lines']):
+            if np.any(segment['lines'].types != TRAVERSE):
                 first_cut_wcs_index = segment['wcs_index']
                 break
 
@@ -145,128 +188,79 @@ class VTKCanon(StatCanon):
             path_actor = self.path_actors.get(wcs_index)
 
             if path_actor is not None:
-                last_point = None
-                point_count = 0
-
-                for line_type, line_data in data:
-                    
-                    start_point = line_data[0]
-                    end_point = line_data[1]
-
-                    if self._datasource.isMachineFoam():
-
-                        path_actor.points.InsertNextPoint(start_point[0] * multiplication_factor,
-                                                          start_point[1] * multiplication_factor,
-                                                          (start_point[8]+(self.foam_z/25.4)) * multiplication_factor)
-
-                        path_actor.points.InsertNextPoint(end_point[0] * multiplication_factor,
-                                                          end_point[1] * multiplication_factor,
-                                                          (start_point[8]+(self.foam_z/25.4)) * multiplication_factor)
-
-
-                        path_actor.colors.InsertNextTypedTuple(self.path_colors.get(line_type).getRgb()[:4])
-
-                        line = vtk.vtkLine()
-                        line.GetPointIds().SetId(0, point_count)
-                        line.GetPointIds().SetId(1, point_count + 1)
-
-                        path_actor.lines.InsertNextCell(line)
-
-                        point_count += 2
-
-                        path_actor.points.InsertNextPoint(start_point[6] * multiplication_factor,
-                                                          start_point[7] * multiplication_factor,
-                                                          (start_point[8]+(self.foam_w/25.4)) * multiplication_factor)
-
-                        path_actor.points.InsertNextPoint(end_point[6] * multiplication_factor,
-                                                          end_point[7] * multiplication_factor,
-                                                          (start_point[8]+(self.foam_w/25.4)) * multiplication_factor)
-
-                        path_actor.colors.InsertNextTypedTuple(self.path_colors.get(line_type).getRgb()[:4])
-
-                        line2 = vtk.vtkLine()
-                        line2.GetPointIds().SetId(0, point_count)
-                        line2.GetPointIds().SetId(1, point_count + 1)
-
-                        path_actor.lines.InsertNextCell(line2)
-
-                        point_count += 2
-
-                    else:
-                        if len(self.path_actors) > 1:
-                            if (point_count == 0) and (line_type == "traverse") and (wcs_index != first_cut_wcs_index):
-                                continue
-
-                        path_actor.points.InsertNextPoint(end_point[0] * multiplication_factor,
-                                                          end_point[1] * multiplication_factor,
-                                                          end_point[2] * multiplication_factor)
-
-                        path_actor.points.InsertNextPoint(start_point[0] * multiplication_factor,
-                                                          start_point[1] * multiplication_factor,
-                                                          start_point[2] * multiplication_factor)
-
-                        path_actor.colors.InsertNextTypedTuple(self.path_colors.get(line_type).getRgb())
-
-                        line = vtk.vtkLine()
-                        line.GetPointIds().SetId(0, point_count)
-                        line.GetPointIds().SetId(1, point_count + 1)
-
-                        path_actor.lines.InsertNextCell(line)
-
-                        point_count += 2
-
-                    last_point = end_point
+                types = data.types
+                starts = data.starts
+                ends = data.ends
+
+                if is_foam:
+                    # two lines per move, XY at the foam Z and UV at the foam W height
+                    count = len(types)
+                    xy_z = (starts[:, 8] + (self.foam_z / 25.4)) * multiplication_factor
+                    uv_w = (starts[:, 8] + (self.foam_w / 25.4)) * multiplication_factor
+
+                    points = np.empty((count * 4, 3), dtype=np.float64)
+                    points[0::4, :2] = starts[:, 0:2] * multiplication_factor
+                    points[1::4, :2] = ends[:, 0:2] * multiplication_factor
+                    points[0::4, 2] = xy_z
+                    points[1::4, 2] = xy_z
+                    points[2::4, :2] = starts[:, 6:8] * multiplication_factor
+                    points[3::4, :2] = ends[:, 6:8] * multiplication_factor
+                    points[2::4, 2] = uv_w
+                    points[3::4, 2] = uv_w
+
+                    colors = np.repeat(color_table[types], 2, axis=0)
+
+                else:
+                    if len(self.path_actors) > 1 and wcs_index != first_cut_wcs_index:
+                        # skip the leading rapids into this WCS
+                        cuts = np.flatnonzero(types != TRAVERSE)
+                        first = cuts[0] if len(cuts) else len(types)
+                        types = types[first:]
+                        starts = starts[first:]
+                        ends = ends[first:]
+
+                    points = np.empty((len(types) * 2, 3), dtype=np.float64)
+                    points[0::2] = ends[:, :3] * multiplication_factor
+                    points[1::2] = starts[:, :3] * multiplication_factor
+
+                    colors = color_table[types]
+
+                self._setPolyData(path_actor, points, colors)
+
+                if build_lods and len(types) >= lod_min_segments:
+                    path_actor.prepare_lods(points[1::2], points[0::2], types, color_table)
+                else:
+                    path_actor.clear_lods()
 
                 # free up memory, lots of it for big files
-
-                self.path_points[wcs_index].clear()
+                self.path_points[wcs_index] = SegmentBuffer()
                 QApplication.processEvents()
 
-                path_actor.poly_data.SetPoints(path_actor.points)
-                path_actor.poly_data.SetLines(path_actor.lines)
-                path_actor.poly_data.GetCellData().SetScalars(path_actor.colors)
-                path_actor.data_mapper.SetInputData(path_actor.poly_data)
-                path_actor.data_mapper.Update()
-                path_actor.SetMapper(path_actor.data_mapper)
-
         self.offset_transitions = list()
 
-        if (not self._datasource.isMachineFoam()) and (len(self.path_segments) > 1):
+        if (not is_foam) and (len(self.path_segments) > 1):
             segment_summaries = list()
 
             for segment_index, segment in enumerate(self.path_segments):
-                segment_wcs_index = segment['wcs_index']
-                segment_data = segment['lines']
-                segment_start = None
-                segment_end = None
-                segment_point_count = 0
-                segment_has_cut_motion = False
-
-                for segment_line_type, segment_line_data in segment_data:
-                    segment_start_point = segment_line_data[0]
-                    segment_end_point = segment_line_data[1]
-
-                    if segment_line_type != "traverse":
-                        segment_has_cut_motion = True
-
-                    if (segment_index > 0) and (segment_point_count == 0) and (segment_line_type == "traverse"):
-                        continue
-
-                    if segment_start is None:
-                        segment_start = [
-                            segment_start_point[0] * multiplication_factor,
-                            segment_start_point[1] * multiplication_factor,
-                            segment_start_point[2] * multiplication_factor,
-                        ]
-
-                    segment_end = [
-                        segment_end_point[0] * multiplication_factor,
-                        segment_end_point[1] * multiplication_factor,
-                        segment_end_point[2] * multiplication_factor,
-                    ]
-                    segment_point_count += 2
-
-                segment_summaries.append((segment_wcs_index, segment_start, segment_end, segment_has_cut_motion))
+                types = segment['lines'].types
+                starts = segment['lines'].starts
+                ends = segment['lines'].ends
+
+                segment_has_cut_motion = bool(np.any(types != TRAVERSE))
+
+                first = 0
+                if segment_index > 0:
+                    cuts = np.flatnonzero(types != TRAVERSE)
+                    first = cuts[0] if len(cuts) else len(types)
+
+                if first < len(types):
+                    segment_start = (starts[first, :3] * multiplication_factor).tolist()
+                    segment_end = (ends[-1, :3] * multiplication_factor).tolist()
+                else:
+                    segment_start = None
+                    segment_end = None
+
+                segment_summaries.append((segment['wcs_index'], segment_start, segment_end, segment_has_cut_motion))
 
             for transition_index in range(1, len(segment_summaries)):
                 prev_wcs_index, _, prev_end, prev_has_cut_motion = segment_summaries[transition_index - 1]
@@ -288,6 +282,26 @@ class VTKCanon(StatCanon):
                     'to_start': next_start,
                 })
 
+    def _setPolyData(self, path_actor, points, colors):
+        # hand the arrays to VTK in one go, each consecutive pair of
+        # points is one line cell
+        num_points = len(points)
+        connectivity = np.arange(num_points, dtype=numpy_support.ID_TYPE_CODE)
+        offsets = np.arange(0, num_points + 1, 2, dtype=numpy_support.ID_TYPE_CODE)
+
+        path_actor.points.SetData(numpy_support.numpy_to_vtk(points, deep=True))
+        path_actor.lines.SetData(numpy_support.numpy_to_vtkIdTypeArray(offsets, deep=True),
+                                 numpy_support.numpy_to_vtkIdTypeArray(connectivity, deep=True))
+        path_actor.colors = numpy_support.numpy_to_vtk(colors, deep=True,
+                                                       array_type=vtk.VTK_UNSIGNED_CHAR)
+
+        path_actor.poly_data.SetPoints(path_actor.points)
+        path_actor.poly_data.SetLines(path_actor.lines)
+        path_actor.poly_data.GetCellData().SetScalars(path_actor.colors)
+        path_actor.data_mapper.SetInputData(path_actor.poly_data)
+        path_actor.data_mapper.Update()
+        path_actor.SetMapper(path_actor.data_mapper)
+
     def get_path_actors(self):
         return self.path_actors
 
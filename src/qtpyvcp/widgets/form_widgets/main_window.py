@@ -2,7 +2,6 @@ import os
 import sys
 import linuxcnc
 
-from qtpy import uic
 from qtpy.QtGui import QKeySequence
 from qtpy.QtCore import Qt, Slot, QTimer
 from qtpy.QtWidgets import QMainWindow, QApplication, QAction, QMessageBox, \
@@ -10,7 +9,7 @@ from qtpy.QtWidgets import QMainWindow, QApplication, QAction, QMessageBox, \
 
 import qtpyvcp
 from qtpyvcp import actions
-from qtpyvcp.utilities import logger
+from qtpyvcp.utilities import logger, ui_cache
 from qtpyvcp.utilities.info import Info
 from qtpyvcp.plugins import getPlugin
 from qtpyvcp.utilities.settings import getSetting
@@ -118,11 +117,12 @@ class VCPMainWindow(QMainWindow):
     def loadUi(self, ui_file):
         """Loads a window layout from a QtDesigner .ui file.
 
+        The compiled .ui file is cached, see :mod:`qtpyvcp.utilities.ui_cache`.
+
         Args:
             ui_file (str) : Path to a .ui file to load.
         """
-        # TODO: Check for compiled *_ui.py files and load from that if exists
-        uic.loadUi(ui_file, self)
+        ui_cache.loadUi(ui_file, self)
 
     def loadStylesheet(self, stylesheet):
         """Loads a QSS stylesheet containing styles to be applied
@@ -17,9 +17,11 @@ import os  # For file path manipulation
 import linuxcnc  # For commanding linuxcnc
 
 
-from qtpy import uic, QtWidgets
+from qtpy import QtWidgets
 
+from qtpyvcp.utilities import ui_cache
 from qtpyvcp.utilities.info import Info
+from qtpyvcp.utilities.command_dispatcher import CommandDispatcher
 from qtpyvcp.plugins import getPlugin
 
 NOTIFICATIONS = getPlugin('notifications')
@@ -31,6 +33,7 @@ INFO = Info()
 SUBROUTINE_PATH = INFO.getSubroutinePath()
 
 CMD = linuxcnc.command()
+DISPATCHER = CommandDispatcher()
 STAT = linuxcnc.stat()
 
 
@@ -44,7 +47,7 @@ class SubCaller(QtWidgets.QWidget):
         if parent is None:
             return
 
-        self.ui = uic.loadUi(os.path.join(PARENT_DIR, "probe.ui"), self)
+        self.ui = ui_cache.loadUi(os.path.join(PARENT_DIR, "probe.ui"), self)
 
         self.notification = NOTIFICATIONS
 
@@ -77,12 +80,18 @@ class SubCaller(QtWidgets.QWidget):
 
         self.notification.setNotify("Probe", "Probing...")
 
-        # Set the LinuxCNC mode to MDI
-        CMD.mode(linuxcnc.MODE_MDI)
+        def probe(cmd):
+            # Set the LinuxCNC mode to MDI
+            cmd.mode(linuxcnc.MODE_MDI)
 
-        # Issue the MDI command to call the sub
-        CMD.mdi(cmd_str)
-        CMD.wait_complete(10000)
+            # Issue the MDI command to call the sub
+            cmd.mdi(cmd_str)
+            return cmd.wait_complete(10000)
+
+        # run on the dispatcher thread so the GUI stays responsive while probing
+        DISPATCHER.call(probe, callback=self.onProbeDone)
+
+    def onProbeDone(self, future):
         print('Done')
         STAT.poll()
         if STAT.probe_tripped:
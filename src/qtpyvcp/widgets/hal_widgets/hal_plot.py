@@ -1,19 +1,25 @@
 
 import os
+import time
 
 from qtpy.QtGui import QColor
 from qtpy.QtWidgets import *
 from qtpy.QtCore import Property, Signal, Slot, QTime, QTimer, Qt
-from collections import deque
 
 import pyqtgraph as pg
 import numpy as np
 
 from qtpyvcp import hal
 from qtpyvcp.widgets import HALWidget, VCPWidget
+from qtpyvcp.utilities.logger import getLogger
+
+LOG = getLogger(__name__)
 
 IN_DESIGNER = os.getenv('DESIGNER', False)
 
+# max plot redraws per second, samples are taken at the plot frequency
+MAX_RENDER_RATE = 30
+
 
 class TimeAxisItem(pg.AxisItem):
     """Internal timestamp for x-axis"""
@@ -25,11 +31,141 @@ class TimeAxisItem(pg.AxisItem):
         return [QTime().currentTime().addMSecs(int(value)).toString('mm:ss') for value in values]
 
 
+class RingBuffer(object):
+    """Fixed size buffer of samples backed by a numpy array.
+
+    Samples are stored as columns of a ``(rows, 2 * size)`` array and each
+    one is written twice, ``size`` columns apart. The newest ``size`` samples
+    are therefore always a contiguous slice, so reading them never copies.
+
+    Args:
+        initial (numpy.ndarray) : ``(rows, size)`` array of initial samples,
+            oldest first.
+    """
+    def __init__(self, initial):
+        self.size = initial.shape[1]
+        self._data = np.concatenate((initial, initial), axis=1)
+        self._head = 0
+
+        # samples appended since the buffer was created
+        self.count = 0
+
+    def append(self, sample):
+        """Replace the oldest sample with `sample`."""
+        head = self._head
+        self._data[:, head] = sample
+        self._data[:, head + self.size] = sample
+        self._head = (head + 1) % self.size
+        self.count += 1
+
+    def view(self):
+        """All samples, oldest first. The view changes as samples are added."""
+        return self._data[:, self._head:self._head + self.size]
+
+    def last(self, count):
+        """The newest `count` samples, oldest first."""
+        count = min(count, self.size)
+        end = self._head + self.size
+        return self._data[:, end - count:end]
+
+
+def decimate(x, y, width):
+    """Reduce curves to the min and max of each of `width` bins.
+
+    Keeps the peaks that plain subsampling would drop, so a curve drawn from
+    the result looks the same at `width` pixels.
+
+    Args:
+        x (numpy.ndarray) : The x values.
+        y (numpy.ndarray) : ``(curves, len(x))`` array of y values.
+        width (int) : Number of bins, usually the plot width in pixels.
+
+    Returns:
+        tuple : The x values and the y values, two per bin. These are always
+            new arrays, so they stay valid when the input is changed.
+    """
+    count = len(x)
+    if width < 1 or count <= 2 * width:
+        return x.copy(), y.copy()
+
+    # drop the oldest samples that don't fill a bin
+    per_bin = count // width
+    start = count - per_bin * width
+
+    x_bins = x[start:].reshape(width, per_bin)
+    y_bins = y[:, start:].reshape(len(y), width, per_bin)
+
+    x_out = np.empty(2 * width)
+    x_out[0::2] = x_bins[:, 0]
+    x_out[1::2] = x_bins[:, -1]
+
+    y_out = np.empty((len(y), 2 * width))
+    y_out[:, 0::2] = y_bins.min(axis=2)
+    y_out[:, 1::2] = y_bins.max(axis=2)
+
+    return x_out, y_out
+
+
+class SampleRecorder(object):
+    """Writes the samples of a RingBuffer to a CSV file.
+
+    Args:
+        fname (str) : The file to write.
+        names (list) : Column names, the first column is the sample time.
+        buffer (RingBuffer) : The buffer to record, from its current sample.
+    """
+    def __init__(self, fname, names, buffer):
+        self.fname = fname
+        self._file = open(fname, 'w')
+        self._file.write('# {}\n'.format(time.strftime('%Y-%m-%d %H:%M:%S')))
+        self._file.write(','.join(names) + '\n')
+        self._buffer = buffer
+        self._written = buffer.count
+
+    def write(self, buffer):
+        """Write the samples added to `buffer` since the last write."""
+        if buffer is not self._buffer:
+            # the buffer was replaced, e.g. the plot frequency changed
+            self._buffer = buffer
+            self._written = 0
+
+        count = buffer.count - self._written
+        if count <= 0:
+            return
+
+        if count > buffer.size:
+            LOG.warning("Recorder fell behind, %i samples not written to %s",
+                        count - buffer.size, self.fname)
+
+        np.savetxt(self._file, buffer.last(count).T, fmt='%.9g', delimiter=',')
+        self._file.flush()
+        self._written = buffer.count
+
+    def close(self):
+        self._file.close()
+
+
+class PlotSeries(object):
+    """A plotted HAL pin."""
+    def __init__(self, name, colour, width=1, style=Qt.SolidLine):
+        self.name = name
+        self.colour = QColor(colour)
+        self.width = width
+        self.style = style
+        self.pin = None
+        self.curve = None
+
+
 class HalPlot(QWidget, HALWidget, VCPWidget):
     """HAL Plot
 
     Plots HAL pin values over time, similar to HAL scope.
-    Up to four HAL pin values can be plotted.
+    Up to four HAL pin values can be set up in QtDesigner, more can be
+    added with :meth:`addSeries`.
+
+    Samples are taken at the plot frequency into a ring buffer and the plot
+    is redrawn at up to ``MAX_RENDER_RATE`` Hz, reduced to the min and max
+    per pixel. Set ``recordFile`` to also write all samples to a CSV file.
 
     .. table:: Generated HAL Pins
 
@@ -65,28 +201,37 @@ class HalPlot(QWidget, HALWidget, VCPWidget):
         self._s1colour = QColor('red')
         self._s1width = 1
         self._s1style = Qt.SolidLine
-        self._s1_pin = None
 
         self._s2enable = False
         self._s2name = "Series 2"
         self._s2colour = QColor('blue')
         self._s2width = 1
         self._s2style = Qt.SolidLine
-        self._s2_pin = None
 
         self._s3enable = False
         self._s3name = "Series 3"
         self._s3colour = QColor('green')
         self._s3width = 1
         self._s3style = Qt.SolidLine
-        self._s3_pin = None
 
         self._s4enable = False
         self._s4name = "Series 4"
         self._s4colour = QColor('yellow')
         self._s4width = 1
         self._s4style = Qt.SolidLine
-        self._s4_pin = None
+
+        # series added with addSeries()
+        self._extra_series = []
+        self.series = []
+
+        self.buffer = None
+        self._sample = None
+
+        self._recordFile = ''
+        self.recorder = None
+
+        self.updatetimer = None
+        self.rendertimer = None
 
         # PyQtGraph stuff
         self.graph = pg.GraphicsLayoutWidget()
@@ -100,13 +245,7 @@ class HalPlot(QWidget, HALWidget, VCPWidget):
 
         self.legend = self.plot.addLegend()
 
-        self.p1 = pg.PlotCurveItem(name=self._s1name)
-        self.p2 = pg.PlotCurveItem(name=self._s2name)
-        self.p3 = pg.PlotCurveItem(name=self._s3name)
-        self.p4 = pg.PlotCurveItem(name=self._s4name)
-
         self.setSeries()
-        self.setData()
 
         self.Vlayout = QVBoxLayout(self)
         self.Vlayout.addWidget(self.graph)
@@ -120,8 +259,33 @@ class HalPlot(QWidget, HALWidget, VCPWidget):
 
         # QTimer
         self.updatetimer = QTimer(self)
+        self.updatetimer.setTimerType(Qt.PreciseTimer)
         self.updatetimer.timeout.connect(self.updateplot)
-        self.updatetimer.start(self._refreshRate)
+
+        self.rendertimer = QTimer(self)
+        self.rendertimer.timeout.connect(self.redraw)
+
+        self.startTimers()
+
+    def addSeries(self, name, colour, width=1, style=Qt.SolidLine):
+        """Add a series to the plot.
+
+        Must be called before the widget is initialized, as that is when the
+        HAL pins are created.
+
+        Args:
+            name (str) : Series name, also used for the HAL pin name.
+            colour (QColor | str) : Line colour.
+            width (int) : Line width.
+            style (Qt.PenStyle) : Line style.
+
+        Returns:
+            PlotSeries : The new series.
+        """
+        series = PlotSeries(name, colour, width, style)
+        self._extra_series.append(series)
+        self.setSeries()
+        return series
 
     def setSeries(self):
         # first remove the legend as it does not update correnctly
@@ -137,25 +301,28 @@ class HalPlot(QWidget, HALWidget, VCPWidget):
         if self._legend:
             self.legend = self.plot.addLegend()
 
-        if self._s1enable:
-            self.p1 = pg.PlotCurveItem(name=self._s1name)
-            self.plot.addItem(self.p1)
-            self.p1.setPen(QColor(self._s1colour), width=self._s1width, style=self._s1style)
-
-        if self._s2enable:
-            self.p2 = pg.PlotCurveItem(name=self._s2name)
-            self.plot.addItem(self.p2)
-            self.p2.setPen(QColor(self._s2colour), width=self._s2width, style=self._s2style)
-
-        if self._s3enable:
-            self.p3 = pg.PlotCurveItem(name=self._s3name)
-            self.plot.addItem(self.p3)
-            self.p3.setPen(QColor(self._s3colour), width=self._s3width, style=self._s3style)
-
-        if self._s4enable:
-            self.p4 = pg.PlotCurveItem(name=self._s4name)
-            self.plot.addItem(self.p4)
-            self.p4.setPen(QColor(self._s4colour), width=self._s4width, style=self._s4style)
+        pins = {series.name: series.pin for series in self.series}
+
+        self.series = []
+        for n in range(1, 5):
+            if getattr(self, '_s{}enable'.format(n)):
+                self.series.append(PlotSeries(getattr(self, '_s{}name'.format(n)),
+                                              getattr(self, '_s{}colour'.format(n)),
+                                              getattr(self, '_s{}width'.format(n)),
+                                              getattr(self, '_s{}style'.format(n))))
+        self.series.extend(self._extra_series)
+
+        for series in self.series:
+            series.pin = series.pin or pins.get(series.name)
+            series.curve = pg.PlotCurveItem(name=series.name)
+            self.plot.addItem(series.curve)
+            series.curve.setPen(series.colour, width=series.width, style=series.style)
+
+        # keep the samples unless series were added or removed
+        if self._sample is None or len(self._sample) != len(self.series) + 1:
+            self.setData()
+        else:
+            self._rendered = -1
 
     def setData(self):
         # Data stuff
@@ -164,46 +331,75 @@ class HalPlot(QWidget, HALWidget, VCPWidget):
         self._timeWindowMS = self._timeWindow * 1000      # time window in milliseconds
         self._bufsize = int(self._timeWindowMS / self._refreshRate)
 
-        # Data containers: collections.deque is list-like container with fast appends and pops on either end
-        self.x = np.linspace(-self.timeWindow, 0.0, self._bufsize)
+        # Data container: one row for the sample times and one per series
         self.now = self.timestamp.elapsed()
-        self.x_data = deque(np.linspace(self.now-self._timeWindowMS, self.now, self._bufsize),self._bufsize)
+        initial = np.zeros((len(self.series) + 1, self._bufsize))
+        initial[0] = np.linspace(self.now-self._timeWindowMS, self.now, self._bufsize)
+        self.buffer = RingBuffer(initial)
+        self._sample = np.zeros(len(self.series) + 1)
+        self._rendered = -1
 
-        self.s1 = np.zeros(self._bufsize, dtype=float)
-        self.s1_data = deque([0.0] * self._bufsize, self._bufsize)
+        if self.updatetimer is not None and self.updatetimer.isActive():
+            self.startTimers()
 
-        self.s2 = np.zeros(self._bufsize, dtype=float)
-        self.s2_data = deque([0.0] * self._bufsize, self._bufsize)
-
-        self.s3 = np.zeros(self._bufsize, dtype=float)
-        self.s3_data = deque([0.0] * self._bufsize, self._bufsize)
-
-        self.s4 = np.zeros(self._bufsize, dtype=float)
-        self.s4_data = deque([0.0] * self._bufsize, self._bufsize)
+    def startTimers(self):
+        self.updatetimer.start(self._refreshRate)
+        self.rendertimer.start(max(self._refreshRate, 1000 // MAX_RENDER_RATE))
 
     def updateplot(self):
-        self.x_data.append(self.timestamp.elapsed())
-        self.x[:] = self.x_data
+        sample = self._sample
+        sample[0] = self.timestamp.elapsed()
+        for column, series in enumerate(self.series, 1):
+            sample[column] = series.pin.value
+        self.buffer.append(sample)
 
-        if self._s1enable:
-            self.s1_data.append(self._s1_pin.value)
-            self.s1[:] = self.s1_data
-            self.p1.setData(self.x, self.s1)
+    def redraw(self):
+        if self.recorder is not None:
+            self.recorder.write(self.buffer)
 
-        if self._s2enable:
-            self.s2_data.append(self._s2_pin.value)
-            self.s2[:] = self.s2_data
-            self.p2.setData(self.x, self.s2)
+        if self.buffer.count == self._rendered or not self.isVisible():
+            return
+        self._rendered = self.buffer.count
+
+        data = self.buffer.view()
+        width = int(self.plot.getViewBox().width())
+        x, y = decimate(data[0], data[1:], width)
+        for column, series in enumerate(self.series):
+            series.curve.setData(x, y[column])
+
+    @Slot()
+    @Slot(str)
+    def startRecording(self, fname=None):
+        """Start writing samples to a CSV file.
+
+        Args:
+            fname (str, optional) : The file to write, defaults to
+                ``recordFile``. ``time.strftime`` format codes are expanded,
+                so each recording can get its own file.
+        """
+        self.stopRecording()
+
+        fname = fname or self._recordFile
+        if not fname:
+            return
 
-        if self._s3enable:
-            self.s3_data.append(self._s3_pin.value)
-            self.s3[:] = self.s3_data
-            self.p3.setData(self.x, self.s3)
+        fname = time.strftime(os.path.expanduser(fname))
+        names = ['time_ms'] + [series.name for series in self.series]
+        try:
+            self.recorder = SampleRecorder(fname, names, self.buffer)
+        except OSError:
+            LOG.exception("Could not open HalPlot record file: %s", fname)
+            return
+        LOG.info("Recording %s to %s", self.objectName(), fname)
 
-        if self._s4enable:
-            self.s4_data.append(self._s4_pin.value)
-            self.s4[:] = self.s4_data
-            self.p4.setData(self.x, self.s4)
+    @Slot()
+    def stopRecording(self):
+        """Write pending samples and close the record file."""
+        if self.recorder is None:
+            return
+        self.recorder.write(self.buffer)
+        self.recorder.close()
+        self.recorder = None
 
     def setyAxis(self):
         self.yAxis.setLabel(self._yAxisLabel, units=self._yAxisUnits)
@@ -268,6 +464,19 @@ class HalPlot(QWidget, HALWidget, VCPWidget):
         return self.setYRange()
 
 
+    @Property(str)
+    def recordFile(self):
+        """File to write all samples to as CSV, recording is off if empty.
+
+        ``time.strftime`` format codes are expanded when recording starts,
+        e.g. ``~/thc_%Y%m%d_%H%M%S.csv``.
+        """
+        return self._recordFile
+
+    @recordFile.setter
+    def recordFile(self, fname):
+        self._recordFile = fname
+
     # Legend propterties
     @Property(bool)
     def legendenable(self):
@@ -471,14 +680,11 @@ class HalPlot(QWidget, HALWidget, VCPWidget):
         obj_name = self.getPinBaseName()
 
         # add HAL pins
-        if self._s1enable:
-            self._s1_pin = comp.addPin(obj_name + "." + self._s1name.replace(' ', ''), self._typ, "in")
-
-        if self._s2enable:
-            self._s2_pin = comp.addPin(obj_name + "." + self._s2name.replace(' ', ''), self._typ, "in")
+        for series in self.series:
+            series.pin = comp.addPin(obj_name + "." + series.name.replace(' ', ''), self._typ, "in")
 
-        if self._s3enable:
-            self._s3_pin = comp.addPin(obj_name + "." + self._s3name.replace(' ', ''), self._typ, "in")
+        if self._recordFile:
+            self.startRecording()
 
-        if self._s4enable:
-            self._s4_pin = comp.addPin(obj_name + "." + self._s4name.replace(' ', ''), self._typ, "in")
+    def terminate(self):
+        self.stopRecording()
@@ -6,16 +6,25 @@ QPlainTextEdit based G-code editor with syntax highlighting.
 """
 
 import os
+import time
 import yaml
+import bisect
+import itertools
+import threading
+
+from array import array
+from collections import OrderedDict
 
 from qtpy.QtCore import (Qt, QRect, QRegularExpression, QEvent, Slot, Signal,
-                         Property, QFile, QTextStream, QSize)
+                         Property, QFile, QTextStream, QSize, QObject, QTimer,
+                         QPoint)
 
-from qtpy.QtGui import (QFont, QColor, QPainter, QSyntaxHighlighter,
+from qtpy.QtGui import (QFont, QColor, QPainter,
                         QTextDocument, QTextOption, QTextFormat,
-                        QTextCharFormat, QTextCursor, QPalette, QKeySequence)
+                        QTextCharFormat, QTextCursor, QPalette, QKeySequence,
+                        QTextLayout)
 
-from qtpy.QtWidgets import (QApplication, QInputDialog, QTextEdit, QLineEdit,
+from qtpy.QtWidgets import (QInputDialog, QTextEdit, QLineEdit,
                             QPlainTextEdit, QWidget, QMenu,
                             QPlainTextDocumentLayout, QFileDialog,
                             QStyledItemDelegate, QTreeView, QListView)
@@ -117,6 +126,7 @@ from qtpyvcp.actions import program_actions
 from qtpyvcp.utilities.info import Info
 from qtpyvcp.utilities.logger import getLogger
 from qtpyvcp.utilities.encode_utils import allEncodings
+from qtpyvcp.utilities.line_index import LineIndex
 
 from qtpyvcp.widgets.dialogs.find_replace_dialog import FindReplaceDialog
 
@@ -133,19 +143,74 @@ PROGRAM_PREFIX = INI_FILE.find('DISPLAY', 'PROGRAM_PREFIX') or '~/linuxcnc/nc_fi
 PROGRAM_PREFIX = os.path.expandvars(os.path.expanduser(PROGRAM_PREFIX))
 
 
-class GcodeSyntaxHighlighter(QSyntaxHighlighter):
-    def __init__(self, document, font):
-        super(GcodeSyntaxHighlighter, self).__init__(document)
+# blocks above and below the viewport highlighted along with the visible ones
+VISIBLE_MARGIN = 50
+# edits touching more blocks than this restart highlighting from the viewport
+EDIT_LIMIT = 500
+# max time (s) spent highlighting per idle slice
+BACKFILL_SLICE = 0.01
+# documents with more blocks are only highlighted around the viewport
+BACKFILL_MAX_BLOCKS = 100000
+
+_HIGHLIGHT_STATES = itertools.count(1)
+
+# program files larger than this (bytes) are opened in the read only paged view
+LARGE_FILE_SIZE = 32 * 1024 * 1024
+# lines in the document at a time in the paged view
+PAGE_LINES = 5000
+# lines from either end of the page at which the next page is loaded
+PAGE_MARGIN = 500
+
+# max time (s) a find call waits for a new search, after that the result
+# comes later through GcodeTextEdit.searchUpdated
+SEARCH_WAIT = 0.05
+# characters searched per call into the regex engine, which holds the GIL
+SEARCH_CHUNK = 1024 * 1024
+# search results kept per document
+SEARCH_CACHE_SIZE = 8
+
+
+class GcodeSyntaxHighlighter(QObject):
+    """G-code syntax highlighter.
+
+    All the syntax rules are combined into a single pattern so each line is
+    tokenized in one pass. Where rules overlap the rule defined last in the
+    syntax file wins. Only the blocks in view of `editor`, plus a margin, are
+    highlighted right away. The rest of the document is highlighted in short
+    time slices while the event loop is idle.
+
+    Args:
+        document (QTextDocument) : The document to highlight.
+        font (callable) : Returns the font to base the text formats on.
+        editor (QPlainTextEdit, optional) : Editor showing the document.
+    """
+    def __init__(self, document, font, editor=None):
+        super(GcodeSyntaxHighlighter, self).__init__(editor or document)
 
         self.font = font
 
         self.rules = []
         self.char_fmt = QTextCharFormat()
+        self.pattern = None
 
-        self._abort = False
+        self._formats = {}
+        self._document = None
+        self._editor = editor
+        self._state = next(_HIGHLIGHT_STATES)
+        self._next_block = 0
+        self._reformatting = False
+
+        self._backfill_timer = QTimer(self)
+        self._backfill_timer.setSingleShot(True)
+        self._backfill_timer.timeout.connect(self._backfill)
 
         self.loadSyntaxFromYAML()
 
+        if editor is not None:
+            editor.updateRequest.connect(self._onUpdateRequest)
+
+        self.setDocument(document)
+
     def loadSyntaxFromYAML(self):
 
         if INFO.getGcodeSyntaxFile() is not None:
@@ -158,7 +223,7 @@ class GcodeSyntaxHighlighter(QSyntaxHighlighter):
         with open(os.path.join(YAML_DIR, gcode_syntax_file)) as fh:
             syntax_specs = yaml.load(fh, Loader=yaml.FullLoader)
 
-        cio = QRegularExpression.CaseInsensitiveOption
+        self.rules = []
 
         for lang_name, language in list(syntax_specs.items()):
 
@@ -178,7 +243,37 @@ class GcodeSyntaxHighlighter(QSyntaxHighlighter):
 
                 patterns = spec.get('match', [])
                 for pattern in patterns:
-                    self.rules.append([QRegularExpression(pattern, cio), char_fmt])
+                    self.rules.append([pattern, char_fmt])
+
+        self.compileRules()
+
+    def compileRules(self):
+        """Combine the rules into a single pattern.
+
+        Later rules come first in the alternation, so they win where rules
+        match at the same position.
+        """
+        alternatives = []
+        # format for each capture group, by group number
+        self._formats = [None]
+
+        for pattern, char_fmt in reversed(self.rules):
+            regex = QRegularExpression(pattern)
+            if not regex.isValid():
+                LOG.warning("Skipping invalid G-code syntax pattern '%s': %s",
+                            pattern, regex.errorString())
+                continue
+
+            alternatives.append('({})'.format(pattern))
+            # the pattern's own groups are numbered after its outer group
+            self._formats.extend([char_fmt] * (regex.captureCount() + 1))
+
+        if alternatives:
+            self.pattern = QRegularExpression('|'.join(alternatives),
+                                              QRegularExpression.CaseInsensitiveOption)
+            self.pattern.optimize()
+        else:
+            self.pattern = None
 
     def charFormatFromSpec(self, fmt_spec):
 
@@ -204,30 +299,495 @@ class GcodeSyntaxHighlighter(QSyntaxHighlighter):
         char_fmt.setFont(self.font())
         return char_fmt
 
-    def highlightBlock(self, text):
-        """Apply syntax highlighting to the given block of text.
+    def document(self):
+        return self._document
+
+    def setDocument(self, document):
+        """Highlight `document` instead of the current document."""
+        if self._document is not None:
+            try:
+                self._document.contentsChange.disconnect(self._onContentsChange)
+            except (TypeError, RuntimeError):
+                pass
+
+        self._document = document
+
+        if document is not None:
+            document.contentsChange.connect(self._onContentsChange)
+            self.rehighlight()
+        else:
+            self._backfill_timer.stop()
+
+    def rehighlight(self):
+        """Highlight the whole document again, starting with the visible blocks."""
+        if self._document is None:
+            return
+
+        # blocks highlighted before now carry a stale state
+        self._state = next(_HIGHLIGHT_STATES)
+        self._next_block = 0
+
+        self.highlightVisible()
+
+        if self._document.blockCount() <= BACKFILL_MAX_BLOCKS:
+            self._backfill_timer.start(0)
+        else:
+            self._backfill_timer.stop()
+
+    def highlightVisible(self):
+        """Highlight the blocks in view of the editor, plus a margin."""
+        if self._document is None:
+            return
+
+        editor = self._editor
+        if editor is None or editor.document() is not self._document:
+            self._highlightRange(0, VISIBLE_MARGIN)
+            return
+
+        first = editor.firstVisibleBlock().blockNumber()
+        line_height = max(editor.fontMetrics().height(), 1)
+        last = first + editor.viewport().height() // line_height
+
+        self._highlightRange(max(first - VISIBLE_MARGIN, 0), last + VISIBLE_MARGIN)
+
+    def highlightBlock(self, block):
+        """Apply syntax highlighting to the given block."""
+        ranges = []
+
+        if self.pattern is not None:
+            formats = self._formats
+            matches = self.pattern.globalMatch(block.text())
+            while matches.hasNext():
+                match = matches.next()
+                length = match.capturedLength()
+                if length == 0:
+                    continue
+                # only one alternative matches, the highest group that
+                # captured belongs to it
+                fmt_range = QTextLayout.FormatRange()
+                fmt_range.start = match.capturedStart()
+                fmt_range.length = length
+                fmt_range.format = formats[match.lastCapturedIndex()]
+                ranges.append(fmt_range)
+
+        layout = block.layout()
+        if hasattr(layout, 'setFormats'):
+            layout.setFormats(ranges)
+        else:
+            layout.setAdditionalFormats(ranges)
+
+        block.setUserState(self._state)
+
+    def _highlightRange(self, first, last, deadline=None, force=False):
+        """Highlight blocks `first` to `last` that are not done yet.
+
+        Returns:
+            QTextBlock : The first block not looked at.
         """
+        block = self._document.findBlockByNumber(first)
+        dirty_start = dirty_end = None
+
+        while block.isValid() and block.blockNumber() <= last:
+            if force or block.userState() != self._state:
+                self.highlightBlock(block)
+                if dirty_start is None:
+                    dirty_start = block.position()
+                dirty_end = block.position() + block.length()
+
+            block = block.next()
+
+            if deadline is not None and time.monotonic() > deadline:
+                break
+
+        if dirty_start is not None:
+            self._reformatting = True
+            try:
+                self._document.markContentsDirty(dirty_start, dirty_end - dirty_start)
+            finally:
+                self._reformatting = False
+
+        return block
+
+    def _backfill(self):
+        if self._document is None:
+            return
+
+        deadline = time.monotonic() + BACKFILL_SLICE
+        block = self._highlightRange(self._next_block, self._document.blockCount(), deadline)
+
+        if block.isValid():
+            self._next_block = block.blockNumber()
+            self._backfill_timer.start(0)
+
+    def _onContentsChange(self, position, removed, added):
+        if self._reformatting:
+            return
+
+        document = self._document
+        first = document.findBlock(position).blockNumber()
+        last = document.findBlock(position + added).blockNumber()
+        if last < first:
+            # change at the end of the document
+            last = document.blockCount() - 1
+
+        if last - first > EDIT_LIMIT:
+            self.rehighlight()
+        else:
+            self._highlightRange(first, last, force=True)
+
+    def _onUpdateRequest(self, rect, dy):
+        if self._editor.document() is self._document:
+            self.highlightVisible()
 
-        QApplication.processEvents()
-        LOG.debug(f'Highlight light block:  {text}')
 
+def _searchRegex(text, case_sensitive, whole_words, use_regex):
+    # regex matching the same text as QTextDocument.find() with these options
+    options = QRegularExpression.MultilineOption
+    if not case_sensitive:
+        options |= QRegularExpression.CaseInsensitiveOption
 
-        for regex, fmt in self.rules:
+    if use_regex:
+        pattern = text
+    else:
+        pattern = QRegularExpression.escape(text)
+        if whole_words:
+            pattern = r'(?<![\p{L}\p{N}])' + pattern + r'(?![\p{L}\p{N}])'
+
+    regex = QRegularExpression(pattern, options)
+    if not regex.isValid():
+        LOG.warning(f"Invalid regex pattern: {text}")
+        return None
+
+    regex.optimize()
+    return regex
+
+
+def _utf16Length(text):
+    if text.isascii():
+        return len(text)
+    return len(text.encode('utf-16-le')) // 2
+
+
+def _findInLines(regex, text, offset, starts, lengths):
+    # one line at a time, for text where positions can't be mapped cheaply
+    for line in text.split('\n'):
+        matches = regex.globalMatch(line)
+        while matches.hasNext():
+            match = matches.next()
+            length = match.capturedLength()
+            if length:
+                starts.append(offset + match.capturedStart())
+                lengths.append(length)
+        offset += _utf16Length(line) + 1
+
+
+def _findAll(regex, text, offset=0, job=None):
+    """Start positions and lengths of the matches of `regex` in `text`.
+
+    Positions are in UTF-16 code units, like document positions, plus
+    `offset`. Like QTextDocument.find() matches don't span lines and empty
+    matches are skipped. Returns None if `job` is cancelled.
+    """
+    starts = array('q')
+    lengths = array('l')
+
+    chunk_start = 0
+    while chunk_start < len(text):
+        # whole lines, so the GIL is released between chunks
+        chunk_end = text.find('\n', chunk_start + SEARCH_CHUNK) + 1 or len(text)
+        chunk = text[chunk_start:chunk_end]
+
+        if not chunk.isascii():
+            _findInLines(regex, chunk, offset, starts, lengths)
+
+        else:
+            # positions in the chunk are plain indexes
+            matches = regex.globalMatch(chunk)
+            while matches.hasNext():
+                match = matches.next()
+                length = match.capturedLength()
+                if not length:
+                    continue
+
+                start = match.capturedStart()
+                if chunk.find('\n', start, start + length) < 0:
+                    starts.append(offset + start)
+                    lengths.append(length)
+                    continue
+
+                # The match spans lines, so it used up text that a match
+                # within the line could have used. Search the rest of the
+                # chunk line by line, from the start of this line.
+                line_start = chunk.rfind('\n', 0, start) + 1
+                while starts and starts[-1] >= offset + line_start:
+                    starts.pop()
+                    lengths.pop()
+                _findInLines(regex, chunk[line_start:], offset + line_start,
+                             starts, lengths)
+                break
+
+        if job is not None and job.cancelled:
+            return None
+
+        offset += _utf16Length(chunk)
+        chunk_start = chunk_end
+
+    return starts, lengths
+
+
+class SearchResult(object):
+    """Matches of a search in a revision of a document, sorted by position."""
+    def __init__(self, regex, revision, starts=None, lengths=None):
+        self.regex = regex
+        self.revision = revision
+        self.starts = starts if starts is not None else array('q')
+        self.lengths = lengths if lengths is not None else array('l')
+
+    @property
+    def count(self):
+        return len(self.starts)
+
+    def indexOf(self, start, end):
+        """Index of the match spanning `start` to `end`, or -1."""
+        index = bisect.bisect_left(self.starts, start)
+        if index < len(self.starts) and self.starts[index] == start \
+                and start + self.lengths[index] == end:
+            return index
+        return -1
+
+    def next(self, position):
+        """Index of the first match starting at or after `position`, or -1."""
+        index = bisect.bisect_left(self.starts, position)
+        return index if index < len(self.starts) else -1
+
+    def previous(self, position):
+        """Index of the last match starting before `position`, or -1."""
+        return bisect.bisect_left(self.starts, position) - 1
+
+    def span(self, first, last):
+        """Range of the indexes of the matches starting from `first` to `last`."""
+        return range(bisect.bisect_left(self.starts, first),
+                     bisect.bisect_right(self.starts, last))
+
+    def update(self, start, old_end, new_end, starts, lengths):
+        # replace the matches in the edited lines and move the ones after
+        first = bisect.bisect_left(self.starts, start)
+        last = bisect.bisect_right(self.starts, old_end)
+
+        delta = new_end - old_end
+        if delta:
+            self.starts[last:] = array('q', map(delta.__add__, self.starts[last:]))
+
+        self.starts[first:last] = starts
+        self.lengths[first:last] = lengths
+
+
+class _SearchJob(object):
+    def __init__(self, key, regex, text, revision):
+        self.key = key
+        self.regex = regex
+        self.text = text
+        self.revision = revision
+        self.result = None
+        self.cancelled = False
+        self.handled = False
+        self.done = threading.Event()
+
+
+class GcodeSearchIndex(QObject):
+    """Find matches in a document, searched on a worker thread.
+
+    Results are cached per search text, options and document revision. On
+    edits the lines that changed are searched again and the positions of the
+    matches after them are moved, so a search is only run over the whole
+    document again when a large part of it changes.
+
+    Args:
+        parent (QObject) : The editor showing the document.
+    """
+    # emitted with the search key when a search finished in the background
+    finished = Signal(object)
+
+    _found = Signal(object)
+
+    def __init__(self, parent=None):
+        super(GcodeSearchIndex, self).__init__(parent)
+
+        self._document = None
+        self._revision = 0
+        self._text = None
+        self._results = OrderedDict()
+
+        self._job = None
+        self._pending = None
+        self._condition = threading.Condition()
+        self._thread = None
+
+        self._found.connect(self._onFound)
+
+    def setDocument(self, document):
+        """Search `document` from now on, dropping all cached results."""
+        if self._document is not None:
+            try:
+                self._document.contentsChange.disconnect(self._onContentsChange)
+            except (TypeError, RuntimeError):
+                pass
+
+        self._document = document
+        self._results.clear()
+        self._text = None
+        self._cancel()
+
+        if document is not None:
+            self._revision = document.revision()
+            document.contentsChange.connect(self._onContentsChange)
+
+    def document(self):
+        return self._document
+
+    def result(self, text, case_sensitive=False, whole_words=False, use_regex=False):
+        """Matches of a search in the current document.
+
+        Returns:
+            SearchResult : The matches, or None while the search is running.
+                An invalid regex has no matches.
+        """
+        key = (text, bool(case_sensitive), bool(whole_words), bool(use_regex))
+
+        result = self._results.get(key)
+        if result is not None and result.revision == self._revision:
+            self._results.move_to_end(key)
+            return result
+
+        job = self._job
+        if job is not None and job.key == key and job.revision == self._revision:
+            # already searching
+            return self._collect(job) if job.done.is_set() else None
+
+        regex = _searchRegex(text, case_sensitive, whole_words, use_regex)
+        if regex is None:
+            result = SearchResult(None, self._revision)
+            self._store(key, result)
+            return result
+
+        if self._text is None:
+            self._text = self._document.toPlainText()
+
+        job = _SearchJob(key, regex, self._text, self._revision)
+        self._submit(job)
+
+        if job.done.wait(SEARCH_WAIT):
+            return self._collect(job)
+        return None
+
+    def _store(self, key, result):
+        self._results[key] = result
+        self._results.move_to_end(key)
+        while len(self._results) > SEARCH_CACHE_SIZE:
+            self._results.popitem(last=False)
+
+    def _collect(self, job):
+        # store the result of a finished job, returns it if still current
+        if not job.handled:
+            job.handled = True
+            if job is self._job:
+                self._job = None
+            if job.result is not None and job.revision == self._revision:
+                self._store(job.key, SearchResult(job.regex, job.revision, *job.result))
+
+        result = self._results.get(job.key)
+        if result is not None and result.revision == self._revision:
+            return result
+        return None
+
+    def _onFound(self, job):
+        if job.handled:
+            # collected by result() already
+            return
+        if self._collect(job) is not None:
+            self.finished.emit(job.key)
+
+    def _submit(self, job):
+        self._cancel()
+        self._job = job
+
+        with self._condition:
+            self._pending = job
+            self._condition.notify()
+
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run,
+                                            name='gcode-search',
+                                            daemon=True)
+            self._thread.start()
+
+    def _cancel(self):
+        # only the latest search is of interest
+        if self._job is not None:
+            self._job.cancelled = True
+            self._job = None
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._pending is None:
+                    self._condition.wait()
+                job, self._pending = self._pending, None
 
-            nth = 0
-            match = regex.match(text, offset=0)
-            index = match.capturedStart()
+            if not job.cancelled:
+                try:
+                    job.result = _findAll(job.regex, job.text, job=job)
+                except Exception:
+                    LOG.exception("Error searching the document")
+            job.done.set()
+
+            try:
+                self._found.emit(job)
+            except RuntimeError:
+                # the index has been deleted
+                return
+
+    def _onContentsChange(self, position, removed, added):
+        document = self._document
+        revision = document.revision()
+        previous, self._revision = self._revision, revision
+        self._text = None
+        self._cancel()
+
+        first = document.findBlock(position)
+        last = document.findBlock(position + added)
+        if not last.isValid():
+            # change at the end of the document
+            last = document.lastBlock()
+
+        current = [key for key, result in self._results.items()
+                   if result.revision == previous and result.regex is not None]
+        if not current or last.blockNumber() - first.blockNumber() > EDIT_LIMIT:
+            self._results.clear()
+            return
 
-            while index >= 0:
+        # matches don't span lines, so only the edited lines are searched again
+        start = first.position()
+        new_end = last.position() + last.length() - 1
+        old_end = new_end - added + removed
 
-                # We actually want the index of the nth match
-                index = match.capturedStart(nth)
-                length = match.capturedLength(nth)
-                self.setFormat(index, length, fmt)
+        lines = []
+        block = first
+        while block.isValid():
+            lines.append(block.text())
+            if block == last:
+                break
+            block = block.next()
+        text = '\n'.join(lines)
 
-                # check the rest of the string
-                match = regex.match(text, offset=index + length)
-                index = match.capturedStart()
+        for key in list(self._results):
+            result = self._results[key]
+            if key not in current:
+                del self._results[key]
+                continue
+            result.update(start, old_end, new_end,
+                          *_findAll(result.regex, text, start))
+            result.revision = revision
 
 
 class GcodeTextEdit(QPlainTextEdit):
@@ -236,6 +796,8 @@ class GcodeTextEdit(QPlainTextEdit):
     QPlainTextEdit based G-code editor with syntax heightening.
     """
     focusLine = Signal(int)
+    # a find that returned no result yet has finished
+    searchUpdated = Signal()
 
     def __init__(self, parent=None):
         super(GcodeTextEdit, self).__init__(parent)
@@ -252,7 +814,16 @@ class GcodeTextEdit(QPlainTextEdit):
         self.readonly = False
         self.syntax_highlighting = False
 
-        self.old_docs = []
+        # only the current document is kept, the highlighter is moved to a new
+        # document before the old one is released
+        self._doc = self.document()
+
+        # large file mode, see loadLargeFile()
+        self.line_index = None
+        self.line_offset = 0
+        self._paging = False
+        self.verticalScrollBar().valueChanged.connect(self._onScroll)
+
         # set the custom margin
         self.margin = NumberMargin(self)
 
@@ -270,6 +841,13 @@ class GcodeTextEdit(QPlainTextEdit):
         # For highlighting matches
         self.highlight_selections = []
         self._find_palette_backup = None
+        self._find_highlight = None
+        self._find_range = None
+        self.updateRequest.connect(self._onFindUpdateRequest)
+
+        self.search_index = GcodeSearchIndex(self)
+        self.search_index.setDocument(self.document())
+        self.search_index.finished.connect(self._onSearchFinished)
 
         # context menu
         self.menu = QMenu(self)
@@ -377,6 +955,10 @@ class GcodeTextEdit(QPlainTextEdit):
         """
         if not text:
             return False
+
+        result = self._searchResult(text, case_sensitive, whole_words, use_regex)
+        if result is not None:
+            return self._findIndexed(result, backward=False, wrap=wrap)
         
         # Try to find from current position
         result_cursor = self._findInDocument(text, case_sensitive, whole_words, use_regex, backward=False)
@@ -405,6 +987,10 @@ class GcodeTextEdit(QPlainTextEdit):
         """
         if not text:
             return False
+
+        result = self._searchResult(text, case_sensitive, whole_words, use_regex)
+        if result is not None:
+            return self._findIndexed(result, backward=True, wrap=wrap)
         
         # Try to find from current position
         result_cursor = self._findInDocument(text, case_sensitive, whole_words, use_regex, backward=True)
@@ -629,35 +1215,47 @@ class GcodeTextEdit(QPlainTextEdit):
         
         return count
     
+    def _searchResult(self, text, case_sensitive, whole_words, use_regex):
+        """SearchResult for the document, None while it is being searched."""
+        if self.search_index.document() is not self.document():
+            self.search_index.setDocument(self.document())
+        return self.search_index.result(text, case_sensitive, whole_words, use_regex)
+
+    def _findIndexed(self, result, backward, wrap):
+        """Select the next or previous match from a search result."""
+        cursor = self.textCursor()
+        if backward:
+            index = result.previous(cursor.selectionStart())
+            if index < 0 and wrap:
+                index = result.count - 1
+        else:
+            index = result.next(cursor.selectionEnd())
+            if index < 0 and wrap and result.count:
+                index = 0
+
+        if index < 0:
+            return False
+
+        start = result.starts[index]
+        cursor.setPosition(start)
+        cursor.setPosition(start + result.lengths[index], QTextCursor.KeepAnchor)
+        self.setTextCursor(cursor)
+        self.ensureCursorVisible()
+        return True
+
     def getMatchCount(self, text, case_sensitive=False, whole_words=False, use_regex=False):
         """
         Count the total number of matches in the document.
+        Returns -1 while a large document is still being searched,
+        searchUpdated is emitted once the count is known.
         """
         if not text:
             return 0
-        
-        count = 0
-        cursor = QTextCursor(self.document())
-        cursor.movePosition(QTextCursor.Start)
-        
-        while True:
-            if use_regex:
-                pattern_options = QRegularExpression.PatternOption(0)
-                if not case_sensitive:
-                    pattern_options |= QRegularExpression.CaseInsensitiveOption
-                regex = QRegularExpression(text, pattern_options)
-                if not regex.isValid():
-                    break
-                cursor = self.document().find(regex, cursor)
-            else:
-                flags = self._buildFindFlags(case_sensitive, whole_words)
-                cursor = self.document().find(text, cursor, flags)
-            
-            if cursor.isNull():
-                break
-            count += 1
-        
-        return count
+
+        result = self._searchResult(text, case_sensitive, whole_words, use_regex)
+        if result is None:
+            return -1
+        return result.count
     
     def getCurrentMatchIndex(self, text, case_sensitive=False, whole_words=False, use_regex=False):
         """
@@ -670,47 +1268,46 @@ class GcodeTextEdit(QPlainTextEdit):
         current_cursor = self.textCursor()
         if not current_cursor.hasSelection():
             return 0
-        
-        # Count matches before current position
-        index = 0
-        cursor = QTextCursor(self.document())
-        cursor.movePosition(QTextCursor.Start)
-        
-        while True:
-            if use_regex:
-                pattern_options = QRegularExpression.PatternOption(0)
-                if not case_sensitive:
-                    pattern_options |= QRegularExpression.CaseInsensitiveOption
-                regex = QRegularExpression(text, pattern_options)
-                if not regex.isValid():
-                    break
-                cursor = self.document().find(regex, cursor)
-            else:
-                flags = self._buildFindFlags(case_sensitive, whole_words)
-                cursor = self.document().find(text, cursor, flags)
-            
-            if cursor.isNull():
-                break
-            
-            index += 1
-            
-            # Check if this match is the current selection
-            if cursor.selectionStart() == current_cursor.selectionStart() and \
-               cursor.selectionEnd() == current_cursor.selectionEnd():
-                return index
-        
-        return 0
+
+        result = self._searchResult(text, case_sensitive, whole_words, use_regex)
+        if result is None:
+            return 0
+        return result.indexOf(current_cursor.selectionStart(), current_cursor.selectionEnd()) + 1
     
     def highlightAllMatches(self, text, case_sensitive=False, whole_words=False, use_regex=False, highlight_current=True):
         """
         Highlight all matches in the document, with an optional distinct highlight
         for the current match.
+
+        Only the matches around the viewport are highlighted, the highlights
+        follow the view as it scrolls.
         """
         self.clearHighlights()
         
         if not text:
             return
-        
+
+        self._find_highlight = (text, case_sensitive, whole_words, use_regex, highlight_current)
+        self._updateFindHighlights()
+
+    def _visibleRange(self):
+        # document positions of the blocks in view, plus a margin
+        document = self.document()
+        top = self.firstVisibleBlock().blockNumber()
+        bottom = self.cursorForPosition(QPoint(0, self.viewport().height() - 1)).blockNumber()
+
+        first = document.findBlockByNumber(max(0, top - VISIBLE_MARGIN))
+        last = document.findBlockByNumber(min(bottom + VISIBLE_MARGIN, document.blockCount() - 1))
+        return first.position(), last.position() + last.length()
+
+    def _updateFindHighlights(self):
+        text, case_sensitive, whole_words, use_regex, highlight_current = self._find_highlight
+
+        result = self._searchResult(text, case_sensitive, whole_words, use_regex)
+        if result is None:
+            # highlighted when the search is done
+            return
+
         # Create highlight formats
         highlight_format = QTextCharFormat()
         highlight_format.setBackground(QColor("#8691FF"))
@@ -718,77 +1315,63 @@ class GcodeTextEdit(QPlainTextEdit):
         current_format.setBackground(QColor("#1402FC"))
         current_format.setForeground(QColor("#FFFFFF"))
         current_format.setFontWeight(QFont.Bold)
-        
-        # Find all matches
-        cursor = QTextCursor(self.document())
-        cursor.movePosition(QTextCursor.Start)
-        
+
+        first, last = self._visibleRange()
+        self._find_range = (first, last)
+
         selections = []
-        match_found = False
-        while True:
-            if use_regex:
-                pattern_options = QRegularExpression.PatternOption(0)
-                if not case_sensitive:
-                    pattern_options |= QRegularExpression.CaseInsensitiveOption
-                regex = QRegularExpression(text, pattern_options)
-                if not regex.isValid():
-                    break
-                cursor = self.document().find(regex, cursor)
-            else:
-                flags = self._buildFindFlags(case_sensitive, whole_words)
-                cursor = self.document().find(text, cursor, flags)
-            
-            if cursor.isNull():
-                break
-            
+        document = self.document()
+        for index in result.span(first, last):
+            start = result.starts[index]
+            cursor = QTextCursor(document)
+            cursor.setPosition(start)
+            cursor.setPosition(start + result.lengths[index], QTextCursor.KeepAnchor)
+
             # Create selection for this match
             selection = QTextEdit.ExtraSelection()
             selection.format = highlight_format
             selection.cursor = cursor
             selections.append(selection)
-            match_found = True
-        
-        if highlight_current and match_found:
+
+        if highlight_current and result.count:
             current_cursor = self.textCursor()
-            if current_cursor.hasSelection():
-                selected_text = current_cursor.selectedText()
-                matches_selection = False
-                if use_regex:
-                    pattern_options = QRegularExpression.PatternOption(0)
-                    if not case_sensitive:
-                        pattern_options |= QRegularExpression.CaseInsensitiveOption
-                    regex = QRegularExpression(text, pattern_options)
-                    if regex.isValid():
-                        match = regex.match(selected_text)
-                        matches_selection = match.hasMatch() and match.capturedStart() == 0 and match.capturedLength() == len(selected_text)
-                else:
-                    if case_sensitive:
-                        matches_selection = selected_text == text
-                    else:
-                        matches_selection = selected_text.lower() == text.lower()
-
-                if matches_selection:
-                    if self._find_palette_backup is None:
-                        self._find_palette_backup = self.palette()
-                    find_palette = self.palette()
-                    find_palette.setColor(QPalette.Highlight, QColor("#1402FC"))
-                    find_palette.setColor(QPalette.HighlightedText, QColor("#FFFFFF"))
-                    self.setPalette(find_palette)
-
-                    current_selection = QTextEdit.ExtraSelection()
-                    current_selection.format = current_format
-                    current_selection.cursor = current_cursor
-                    selections.append(current_selection)
-
-        if not selections:
-            self.clearHighlights()
-            return
+            if current_cursor.hasSelection() and \
+                    result.indexOf(current_cursor.selectionStart(), current_cursor.selectionEnd()) >= 0:
+                if self._find_palette_backup is None:
+                    self._find_palette_backup = self.palette()
+                find_palette = self.palette()
+                find_palette.setColor(QPalette.Highlight, QColor("#1402FC"))
+                find_palette.setColor(QPalette.HighlightedText, QColor("#FFFFFF"))
+                self.setPalette(find_palette)
+
+                current_selection = QTextEdit.ExtraSelection()
+                current_selection.format = current_format
+                current_selection.cursor = current_cursor
+                selections.append(current_selection)
 
         self.highlight_selections = selections
         self.setExtraSelections(selections)
+
+    def _onFindUpdateRequest(self, rect, dy):
+        if self._find_highlight is None or self._find_range is None:
+            return
+
+        first, last = self._find_range
+        top = self.firstVisibleBlock().position()
+        bottom = self.cursorForPosition(QPoint(0, self.viewport().height() - 1)).position()
+        if top < first or bottom > last:
+            # scrolled out of the highlighted range
+            self._updateFindHighlights()
+
+    def _onSearchFinished(self, key):
+        if self._find_highlight is not None:
+            self._updateFindHighlights()
+        self.searchUpdated.emit()
     
     def clearHighlights(self):
         """Clear all search highlights."""
+        self._find_highlight = None
+        self._find_range = None
         self.highlight_selections = []
         self.setExtraSelections([])  # Explicitly clear editor's extra selections
         if self._find_palette_backup is not None:
@@ -892,6 +1475,12 @@ class GcodeTextEdit(QPlainTextEdit):
 
     @Slot()
     def saveFile(self, save_file_name = None):
+        if self.line_index is not None:
+            # only a page of the file is in the editor
+            LOG.error("Large files are opened read only and can't be saved "
+                      "from the editor: %s", self.line_index.fname)
+            return
+
         if save_file_name == None:
             save_file = QFile(str(STATUS.file))
         else:
@@ -1128,9 +1717,13 @@ class GcodeTextEdit(QPlainTextEdit):
             super(GcodeTextEdit, self).keyPressEvent(event)
 
     def changeEvent(self, event):
-        if event.type() == QEvent.FontChange:
+        if event.type() == QEvent.FontChange and self.syntax_highlighting:
             # Update syntax highlighter with new font
-            self.gCodeHighlighter = GcodeSyntaxHighlighter(self.document(), self.font)
+            if self.gCodeHighlighter is None:
+                self.gCodeHighlighter = GcodeSyntaxHighlighter(self.document(), self.font, self)
+            else:
+                self.gCodeHighlighter.loadSyntaxFromYAML()
+                self.gCodeHighlighter.rehighlight()
 
         super(GcodeTextEdit, self).changeEvent(event)
 
@@ -1148,28 +1741,41 @@ class GcodeTextEdit(QPlainTextEdit):
         self.syntax_highlighting = state
 
     def setPlainText(self, p_str):
-        # FixMe: Keep a reference to old QTextDocuments form previously loaded
-        # files. This is needed to prevent garbage collection which results in a
-        # seg fault if the document is discarded while still being highlighted.
-        self.old_docs.append(self.document())
-
         LOG.debug('setPlanText')
+        self._closeLineIndex()
+
         doc = QTextDocument()
         doc.setDocumentLayout(QPlainTextDocumentLayout(doc))
         doc.setPlainText(p_str)
 
-        # start syntax highlighting
+        self.setDocument(doc)
+
+        # start syntax highlighting, once the document is in the editor so
+        # the visible blocks are highlighted first
         if self.syntax_highlighting == True:
-            self.gCodeHighlighter = GcodeSyntaxHighlighter(doc, self.font)
+            if self.gCodeHighlighter is None:
+                self.gCodeHighlighter = GcodeSyntaxHighlighter(doc, self.font, self)
+            else:
+                self.gCodeHighlighter.setDocument(doc)
             LOG.debug('Syntax highlighting enabled.')
+        elif self.gCodeHighlighter is not None:
+            self.gCodeHighlighter.setDocument(None)
+
+        self.search_index.setDocument(doc)
+
+        # release the previous document
+        self._doc = doc
 
-        self.setDocument(doc)
         self.margin.updateWidth()
         LOG.debug('Document set with text.')
 
         # start syntax highlighting
         # self.gCodeHighlighter = GcodeSyntaxHighlighter(self)
 
+    def setReadOnly(self, state):
+        # the large file view is always read only
+        super(GcodeTextEdit, self).setReadOnly(state or self.line_index is not None)
+
     @Slot(bool)
     def EditorReadOnly(self, state):
         """Set to Read Only to disable editing"""
@@ -1257,32 +1863,148 @@ class GcodeTextEdit(QPlainTextEdit):
     @Slot(object)
     def loadProgramFile(self, fname=None):
         if fname:
-            encodings = allEncodings()
-            enc = None
-            for enc in encodings:
+            try:
+                with open(fname, 'rb') as f:
+                    size = os.fstat(f.fileno()).st_size
+                    if size > LARGE_FILE_SIZE:
+                        self.loadLargeFile(fname)
+                        return
+                    data = f.read()
+            except OSError:
+                LOG.exception("Could not read program file: %s", fname)
+                return
+
+            # the file is read once, then decoded until an encoding fits
+            for enc in allEncodings():
                 try:
-                    with open(fname,  'r', encoding=enc) as f:
-                        gcode = f.read()
-                        break
-                except Exception as e:
-                    # LOG.debug(e)
+                    gcode = data.decode(enc)
+                    break
+                except (UnicodeDecodeError, LookupError):
                     LOG.info(f"File encoding doesn't match {enc}, trying others")
+            else:
+                enc = 'utf-8'
+                gcode = data.decode(enc, errors='replace')
             LOG.info(f"File encoding: {enc}")
-            # set the syntax highlighter
+
+            # universal newlines, as when reading in text mode
+            gcode = gcode.replace('\r\n', '\n').replace('\r', '\n')
             self.setPlainText(gcode)
-            # self.gCodeHighlighter = GcodeSyntaxHighlighter(self.document(), self.font)
+
+    def loadLargeFile(self, fname):
+        """Show `fname` in the read only large file view.
+
+        Files over ``LARGE_FILE_SIZE`` are not loaded into the editor, the file
+        is memory mapped and indexed by line and a page of ``PAGE_LINES`` lines
+        around the current line is shown. Scrolling or following the running
+        line near either end of the page loads the next page.
+        """
+        self.setPlainText('')
+
+        try:
+            index = LineIndex(fname)
+        except OSError:
+            LOG.exception("Could not read program file: %s", fname)
+            return
+
+        LOG.info("Large program file (%i lines, %s), opening read only: %s",
+                 index.line_count, index.encoding, fname)
+
+        self.line_index = index
+        self.setReadOnly(True)
+        self._showPage(0)
+
+    def _closeLineIndex(self):
+        if self.line_index is None:
+            return
+        self.line_index.close()
+        self.line_index = None
+        self.line_offset = 0
+        self.setReadOnly(self.readonly)
+
+    def _showPage(self, first_line, cursor_line=None):
+        # put lines `first_line` to `first_line + PAGE_LINES` in the document
+        index = self.line_index
+        if index.changed():
+            # the file was rewritten in place, re-index before reading from it
+            fname = index.fname
+            index.close()
+            self.line_index = index = LineIndex(fname)
+
+        if cursor_line is None:
+            cursor_line = self.getCurrentLine() - 1
+
+        first_line = max(0, min(first_line, index.line_count - PAGE_LINES))
+        text = index.lines(first_line, PAGE_LINES)
+        if text.endswith('\n'):
+            # don't add an empty block after the last line
+            text = text[:-1]
+        text = text.replace('\r\n', '\n')
+
+        self._paging = True
+        try:
+            self.line_offset = first_line
+            self.block_number = None
+            self.document().setPlainText(text)
+
+            block = min(max(cursor_line - first_line, 0), self.blockCount() - 1)
+            self.setTextCursor(QTextCursor(self.document().findBlockByNumber(block)))
+        finally:
+            self._paging = False
+
+        self.onCursorChanged()
+        self.margin.updateWidth()
+
+    def _needsPage(self, block_number):
+        # whether a block is close to an end of the page which isn't
+        # the end of the file
+        if block_number < PAGE_MARGIN:
+            return self.line_offset > 0
+        if block_number >= self.blockCount() - PAGE_MARGIN:
+            return self.line_offset + self.blockCount() < self.line_index.line_count
+        return False
+
+    def _onScroll(self, value):
+        if self.line_index is None or self._paging:
+            return
+
+        block_number = self.firstVisibleBlock().blockNumber()
+        if not self._needsPage(block_number):
+            return
+
+        # keep the same line at the top of the view
+        top_line = self.line_offset + block_number
+        self._showPage(top_line - PAGE_LINES // 2)
+        self._paging = True
+        try:
+            self.verticalScrollBar().setValue(top_line - self.line_offset)
+        finally:
+            self._paging = False
+
+    def lineCount(self):
+        """Number of lines in the program, not only the lines in the document."""
+        if self.line_index is not None:
+            return self.line_index.line_count
+        return self.blockCount()
 
     @Slot(int)
     @Slot(object)
     def setCurrentLine(self, line):
+        if self.line_index is not None:
+            # motion_line is a file line, move the page if it is close to the edge
+            if self._needsPage(line - 1 - self.line_offset):
+                self._showPage(line - 1 - PAGE_LINES // 2, line - 1)
+            line -= self.line_offset
         cursor = QTextCursor(self.document().findBlockByLineNumber(line - 1))
         self.setTextCursor(cursor)
         self.centerCursor()
 
     def getCurrentLine(self):
-        return self.textCursor().blockNumber() + 1
+        return self.textCursor().blockNumber() + 1 + self.line_offset
 
     def onCursorChanged(self):
+        if self._paging:
+            return
+
         # highlights current line, find a way not to use QTextEdit
         block_number = self.textCursor().blockNumber()
         if block_number != self.block_number:
@@ -1298,7 +2020,7 @@ class GcodeTextEdit(QPlainTextEdit):
             self.setExtraSelections(selections)
 
         # emit signals for backplot etc.
-        self.focused_line = block_number + 1
+        self.focused_line = block_number + 1 + self.line_offset
         self.focusLine.emit(self.focused_line)
 
     def contextMenuEvent(self, event):
@@ -1332,8 +2054,8 @@ class NumberMargin(QWidget):
         self.highlight_color = QColor('#000000')
 
     def getWidth(self):
-        blocks = self.parent.blockCount()
-        return self.parent.fontMetrics().width(str(blocks)) + 5
+        lines = self.parent.lineCount()
+        return self.parent.fontMetrics().width(str(lines)) + 5
 
     def updateWidth(self):  # check the number column width and adjust
         width = self.getWidth()
@@ -1381,7 +2103,8 @@ class NumberMargin(QWidget):
             text_rec = QRect(0, int(block_top), self.width() -
                              4, self.parent.fontMetrics().height())
             painter.fillRect(paint_rec, background)
-            painter.drawText(text_rec, Qt.AlignRight, str(block_num + 1))
+            painter.drawText(text_rec, Qt.AlignRight,
+                             str(block_num + 1 + self.parent.line_offset))
             block = block.next()
 
         painter.end()
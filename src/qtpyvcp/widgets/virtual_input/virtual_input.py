@@ -1,11 +1,13 @@
 import os
 
 import linuxcnc
-from qtpy import uic, QtWidgets
+from qtpy import QtWidgets
 from qtpy.QtCore import Slot, Qt, QEvent, QPoint
 from qtpy.QtGui import QInputMethodEvent, QGuiApplication, QKeyEvent
 from qtpy.QtWidgets import QWidget, QAbstractButton, QAbstractSpinBox
 
+from qtpyvcp.utilities import ui_cache
+
 
 class VirtualInput(QWidget):
     """VirtualInput
@@ -25,7 +27,7 @@ class VirtualInput(QWidget):
         self.caps_on = False
         self.focus_object = None
         self.setWindowFlags(Qt.Tool | Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint | Qt.BypassWindowManagerHint)
-        uic.loadUi(ui_file, self)
+        ui_cache.loadUi(ui_file, self)
 
     @Slot(QAbstractButton)
     def on_buttonGroup_buttonPressed(self, btn):